@@ -3,16 +3,58 @@ Advanced AI Vision capabilities for desktop automation
 Extends the basic vision analyzer with specialized automation functions
 """
 
-import json
+import io
+import asyncio
 import time
 import base64
-from typing import Dict, List, Tuple, Optional, Any
-from dataclasses import dataclass
+import hashlib
+import threading
+from typing import Dict, List, Tuple, Optional, Any, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields, replace
 
-from vision_analyzer import VisionAnalyzer
+from PIL import Image
+
+# NumPy is optional; template matching and the pixel-diff kernel need it
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# OpenCV is optional; it lets find_element_smart re-locate known elements without the VLM
+try:
+    import cv2
+    CV2_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    CV2_AVAILABLE = False
+
+# Numba is optional; it compiles an early-exit pixel comparison for verify_action_result
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def _any_pixel_diff(a, b):
+        """True as soon as two flat uint8 buffers differ"""
+        for i in range(a.size):
+            if a[i] != b[i]:
+                return True
+        return False
+
+from vision_analyzer import VisionAnalyzer, InferenceServer
 from logger_config import setup_logger
+from utils import EncodedImage, encode_for_vlm, dhash
+import fast_json
 
-@dataclass
+# Screenshots may be passed as raw PNG bytes, base64 text, or an EncodedImage
+ScreenshotInput = Union[bytes, str, EncodedImage]
+
+@dataclass(slots=True, frozen=True)
 class DetectedElement:
     element_type: str
     description: str
@@ -23,17 +65,252 @@ class DetectedElement:
     confidence: float
     clickable: bool
     text_content: Optional[str] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **defaults) -> 'DetectedElement':
+        """Build from a VLM element dict, filling missing keys from defaults"""
+        return cls(**{
+            **_DETECTED_ELEMENT_DEFAULTS,
+            **defaults,
+            **{key: data[key] for key in data.keys() & _DETECTED_ELEMENT_FIELDS}
+        })
 
-@dataclass
+_DETECTED_ELEMENT_FIELDS = frozenset(f.name for f in fields(DetectedElement))
+_DETECTED_ELEMENT_DEFAULTS = {
+    'element_type': 'unknown',
+    'description': '',
+    'x': 0,
+    'y': 0,
+    'width': 0,
+    'height': 0,
+    'confidence': 0.0,
+    'clickable': False,
+    'text_content': None
+}
+
+@dataclass(slots=True, frozen=True)
 class UIState:
     window_title: str
     application_name: str
-    elements: List[DetectedElement]
+    elements: Tuple[DetectedElement, ...]
     dialog_present: bool
     error_present: bool
     state_description: str
     confidence: float
 
+# Prompt templates are built once at import time; the dynamic ones are
+# filled in with str.format (doubled braces are literal JSON braces)
+
+_PROMPT_DESKTOP_STATE = """
+    Analyze this desktop screenshot comprehensively and provide a detailed UI state analysis.
+    
+    Return JSON with:
+    {
+        "window_title": "main window title if visible",
+        "application_name": "primary application name",
+        "elements": [
+            {
+                "element_type": "button|menu|window|dialog|textbox|icon|label",
+                "description": "clear description of the element",
+                "x": center_x_coordinate,
+                "y": center_y_coordinate,
+                "width": estimated_width,
+                "height": estimated_height,
+                "confidence": 0.0-1.0,
+                "clickable": true/false,
+                "text_content": "visible text if any"
+            }
+        ],
+        "dialog_present": true/false,
+        "error_present": true/false,
+        "state_description": "overall description of what's visible",
+        "confidence": 0.0-1.0
+    }
+    
+    Focus on interactive elements and provide accurate coordinates.
+    """
+
+_PROMPT_FIND_ELEMENT = """
+    Find the UI element described as: "{element_description}"{type_filter}
+    
+    Return JSON with:
+    {{
+        "found": true/false,
+        "element": {{
+            "element_type": "detected type",
+            "description": "what you found",
+            "x": center_x_coordinate,
+            "y": center_y_coordinate,
+            "width": estimated_width,
+            "height": estimated_height,
+            "confidence": 0.0-1.0,
+            "clickable": true/false,
+            "text_content": "visible text if any"
+        }},
+        "reasoning": "why you think this is the correct element",
+        "alternatives": ["other possible matches if any"]
+    }}
+    
+    Be precise with coordinates and only return high-confidence matches.
+    """
+
+_PROMPT_ERRORS = """
+    Analyze this screenshot for error conditions, problems, or unexpected states.
+    
+    Return JSON with:
+    {
+        "has_error": true/false,
+        "error_type": "dialog|crash|hang|permission|network|file|unknown",
+        "error_message": "visible error text if any",
+        "severity": "low|medium|high|critical",
+        "suggested_action": "ok|cancel|retry|close|restart|ignore",
+        "dialog_buttons": ["list of visible dialog buttons"],
+        "recovery_possible": true/false,
+        "confidence": 0.0-1.0,
+        "description": "detailed description of the error state"
+    }
+    
+    Look for error dialogs, crash reports, unresponsive applications, permission requests, etc.
+    """
+
+_PROMPT_GUIDE_ACTION = """
+    Analyze this screenshot and provide guidance for achieving the goal: "{goal}"
+    {context_info}
+    
+    Return JSON with:
+    {{
+        "action_type": "click|type|key_press|scroll|wait|navigate",
+        "target_element": "description of element to interact with",
+        "target_coordinates": {{"x": coordinate, "y": coordinate}},
+        "action_details": "specific text to type or key to press",
+        "reasoning": "why this action is recommended",
+        "confidence": 0.0-1.0,
+        "estimated_success": 0.0-1.0,
+        "alternative_actions": [
+            {{"action": "alternative approach", "confidence": 0.0-1.0}}
+        ],
+        "warnings": ["potential issues or risks"],
+        "prerequisites": ["conditions that should be met first"]
+    }}
+    
+    Consider the current state and provide the most logical next step.
+    """
+
+_PROMPT_VERIFY_ACTION = """
+    Compare these before and after screenshots to verify if the intended action succeeded.
+    Intended action: "{intended_action}"
+    
+    Return JSON with:
+    {{
+        "action_succeeded": true/false,
+        "changes_detected": true/false,
+        "change_description": "what changed between the screenshots",
+        "success_indicators": ["signs that action worked"],
+        "failure_indicators": ["signs that action failed"],
+        "confidence": 0.0-1.0,
+        "needs_retry": true/false,
+        "suggested_next_action": "what to do next"
+    }}
+    
+    Look for visual changes that indicate the action was successful.
+    """
+
+_PROMPT_EXTRACT_TEXT = """
+    Extract and analyze all visible text content from this screenshot.
+    
+    Return JSON with:
+    {
+        "text_elements": [
+            {
+                "text": "extracted text",
+                "x": approximate_x_coordinate,
+                "y": approximate_y_coordinate,
+                "font_size": "small|medium|large",
+                "element_type": "title|button|label|menu|input|error|info",
+                "confidence": 0.0-1.0
+            }
+        ],
+        "structured_content": {
+            "titles": ["main titles/headings"],
+            "buttons": ["button labels"],
+            "labels": ["form labels"],
+            "errors": ["error messages"],
+            "info": ["informational text"]
+        },
+        "overall_confidence": 0.0-1.0
+    }
+    
+    Be thorough in extracting all readable text.
+    """
+
+_PROMPT_LOADING_STATES = """
+    Analyze this screenshot for loading indicators and wait states.
+    
+    Return JSON with:
+    {
+        "is_loading": true/false,
+        "loading_indicators": [
+            {
+                "type": "spinner|progress_bar|throbber|dialog|text",
+                "description": "what loading indicator is visible",
+                "progress_percent": 0-100,
+                "x": coordinate,
+                "y": coordinate
+            }
+        ],
+        "estimated_completion_time": "seconds estimate or 'unknown'",
+        "can_interact": true/false,
+        "loading_text": "any visible loading message",
+        "confidence": 0.0-1.0
+    }
+    
+    Look for spinners, progress bars, "Loading..." text, disabled interfaces, etc.
+    """
+
+_PROMPT_FORM_FIELDS = """
+    Identify and analyze all form fields in this screenshot.
+    
+    Return JSON with:
+    {
+        "form_fields": [
+            {
+                "field_type": "textbox|dropdown|checkbox|radio|button|file",
+                "label": "field label if visible",
+                "placeholder": "placeholder text if any",
+                "current_value": "current content if visible",
+                "required": true/false,
+                "enabled": true/false,
+                "x": center_x_coordinate,
+                "y": center_y_coordinate,
+                "width": estimated_width,
+                "height": estimated_height
+            }
+        ],
+        "form_state": "empty|partially_filled|complete|invalid",
+        "submit_button": {"x": coord, "y": coord, "enabled": true/false},
+        "validation_errors": ["visible error messages"],
+        "confidence": 0.0-1.0
+    }
+    
+    Focus on interactive form elements and their current states.
+    """
+
+# Fixed prompts get small integer ids so response cache keys don't hash the prompt text
+_STATIC_PROMPTS = (_PROMPT_DESKTOP_STATE, _PROMPT_ERRORS, _PROMPT_LOADING_STATES, _PROMPT_FORM_FIELDS)
+PROMPT_IDS = {prompt: prompt_id for prompt_id, prompt in enumerate(_STATIC_PROMPTS)}
+
+# Returned by verify_action_result when the screen did not change at all
+_NO_CHANGE_RESULT = {
+    "action_succeeded": False,
+    "changes_detected": False,
+    "change_description": "Screenshots before and after the action are identical",
+    "success_indicators": [],
+    "failure_indicators": ["No visual change after the action"],
+    "confidence": 0.95,
+    "needs_retry": True,
+    "suggested_next_action": "retry"
+}
+
 class AIVision:
     """
     Advanced AI vision system for intelligent desktop automation
@@ -43,64 +320,135 @@ class AIVision:
     def __init__(self):
         self.logger = setup_logger(__name__)
         self.vision_analyzer = VisionAnalyzer()
+        self.inference_server = InferenceServer.get_instance()
+        
+        # Runs independent analyses of one screenshot concurrently
+        self._executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="ai_vision")
         
-        # Cache for frequent operations
-        self.element_cache = {}
+        # Cache for frequent operations (LRU ordered, bounded, swept for stale entries)
+        self.element_cache = OrderedDict()
         self.cache_ttl = 5  # seconds
+        self.cache_max_size = 256
+        self.cache_sweep_interval = 60  # seconds
+        self._last_sweep = time.monotonic()
+        self._cache_lock = threading.RLock()
+        
+        # Response caches: exact image content for every prompt, then (for the fixed
+        # whole-screen prompts only) a perceptual hash so near-identical screenshots still hit
+        self._response_cache = OrderedDict()
+        self._perceptual_cache = OrderedDict()
+        
+        # Greyscale crops of previously found elements, tried before the VLM
+        self._template_library = OrderedDict()
+        self.template_library_size = 64
+        self.template_match_threshold = 0.9
         
         self.logger.info("AI Vision system initialized")
     
-    def analyze_desktop_state(self, screenshot_b64: str) -> UIState:
+    def _analyze(self, screenshot: ScreenshotInput, prompt: str) -> Dict[str, Any]:
         """
-        Comprehensive analysis of current desktop state
+        Run a vision prompt through the shared batching inference server
+        Repeated screenshot/prompt pairs are served from cache within the TTL
         """
-        try:
-            prompt = """
-            Analyze this desktop screenshot comprehensively and provide a detailed UI state analysis.
+        image = EncodedImage.coerce(screenshot)
+        image_bytes = image.data
+        prompt_key = self._prompt_key(prompt)
+        
+        content_key = (hashlib.blake2b(image_bytes, digest_size=16).digest(), prompt_key)
+        cached = self._get_cached_response(self._response_cache, content_key)
+        if cached is not None:
+            return cached
+        
+        # Near-identical screens only share answers for the fixed whole-screen prompts; a tiny change
+        # (typed text, a toggled checkbox) can matter to targeted prompts but leaves the dHash unchanged
+        perceptual_key = None
+        if prompt in PROMPT_IDS:
+            try:
+                perceptual_key = (self._phash(image_bytes), prompt_key)
+                cached = self._get_cached_response(self._perceptual_cache, perceptual_key)
+                if cached is not None:
+                    self._cache_store(self._response_cache, content_key, cached)
+                    return cached
+            except Exception as e:
+                self.logger.debug(f"Perceptual hash unavailable: {e}")
+        
+        response = self.inference_server.submit(image.b64, prompt, self.vision_analyzer).result()
+        
+        # Don't cache failed requests so the next call retries
+        if 'error' not in response:
+            self._cache_store(self._response_cache, content_key, response)
+            if perceptual_key is not None:
+                self._cache_store(self._perceptual_cache, perceptual_key, response)
+        
+        return response
+    
+    @staticmethod
+    def _prompt_key(prompt: str) -> Union[int, bytes]:
+        """Cache key part for a prompt: its id if static, else a digest of the formatted text"""
+        prompt_id = PROMPT_IDS.get(prompt)
+        if prompt_id is not None:
+            return prompt_id
+        return hashlib.blake2b(prompt.encode(), digest_size=8).digest()
+    
+    def _get_cached_response(self, cache: OrderedDict, key) -> Optional[Dict[str, Any]]:
+        """Return a cached response if present and fresh"""
+        entry = self._cache_lookup(cache, key)
+        if entry is None:
+            return None
+        
+        self.logger.debug("Vision response served from cache")
+        return entry[0]
+    
+    def _cache_lookup(self, cache: OrderedDict, key) -> Optional[Tuple[Any, float]]:
+        """Return the fresh (result, timestamp) entry for key, evicting it if stale"""
+        with self._cache_lock:
+            entry = cache.get(key)
+            if entry is None:
+                return None
             
-            Return JSON with:
-            {
-                "window_title": "main window title if visible",
-                "application_name": "primary application name",
-                "elements": [
-                    {
-                        "element_type": "button|menu|window|dialog|textbox|icon|label",
-                        "description": "clear description of the element",
-                        "x": center_x_coordinate,
-                        "y": center_y_coordinate,
-                        "width": estimated_width,
-                        "height": estimated_height,
-                        "confidence": 0.0-1.0,
-                        "clickable": true/false,
-                        "text_content": "visible text if any"
-                    }
-                ],
-                "dialog_present": true/false,
-                "error_present": true/false,
-                "state_description": "overall description of what's visible",
-                "confidence": 0.0-1.0
-            }
+            if time.monotonic() - entry[1] < self.cache_ttl:
+                cache.move_to_end(key)
+                return entry
             
-            Focus on interactive elements and provide accurate coordinates.
-            """
+            cache.pop(key, None)
+            return None
+    
+    def _cache_store(self, cache: OrderedDict, key, result):
+        """Insert a result, evicting the least recently used entries beyond the size bound"""
+        now = time.monotonic()
+        with self._cache_lock:
+            cache[key] = (result, now)
+            cache.move_to_end(key)
+            while len(cache) > self.cache_max_size:
+                cache.popitem(last=False)
+            
+            if now - self._last_sweep >= self.cache_sweep_interval:
+                self._sweep_caches(now)
+    
+    def _sweep_caches(self, now: float):
+        """Drop every expired entry from all caches"""
+        self._last_sweep = now
+        for cache in (self.element_cache, self._response_cache, self._perceptual_cache):
+            for key in [k for k, (_, timestamp) in cache.items() if now - timestamp >= self.cache_ttl]:
+                cache.pop(key, None)
+    
+    @staticmethod
+    def _phash(image_bytes: bytes) -> int:
+        """64-bit difference hash of an encoded image (9x8 greyscale, adjacent pixel compare)"""
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            return dhash(img)
+    
+    def analyze_desktop_state(self, screenshot: ScreenshotInput) -> UIState:
+        """
+        Comprehensive analysis of current desktop state
+        """
+        try:
+            prompt = _PROMPT_DESKTOP_STATE
             
-            response = self.vision_analyzer.analyze_screenshot_general(screenshot_b64, prompt)
+            response = self._analyze(screenshot, prompt)
             
             # Parse response into UIState object
-            elements = []
-            for elem_data in response.get('elements', []):
-                element = DetectedElement(
-                    element_type=elem_data.get('element_type', 'unknown'),
-                    description=elem_data.get('description', ''),
-                    x=elem_data.get('x', 0),
-                    y=elem_data.get('y', 0),
-                    width=elem_data.get('width', 0),
-                    height=elem_data.get('height', 0),
-                    confidence=elem_data.get('confidence', 0.0),
-                    clickable=elem_data.get('clickable', False),
-                    text_content=elem_data.get('text_content')
-                )
-                elements.append(element)
+            elements = tuple(DetectedElement.from_dict(elem_data) for elem_data in response.get('elements', []))
             
             ui_state = UIState(
                 window_title=response.get('window_title', ''),
@@ -117,72 +465,58 @@ class AIVision:
             
         except Exception as e:
             self.logger.error(f"Failed to analyze desktop state: {e}")
-            return UIState("", "", [], False, False, "Analysis failed", 0.0)
+            return UIState("", "", (), False, False, "Analysis failed", 0.0)
     
-    def find_element_smart(self, screenshot_b64: str, element_description: str, 
+    def find_element_smart(self, screenshot: ScreenshotInput, element_description: str, 
                           element_type: Optional[str] = None) -> Optional[DetectedElement]:
         """
         Smart element detection with caching and confidence scoring
         """
         try:
-            cache_key = f"{element_description}_{element_type}_{hash(screenshot_b64[:100])}"
+            # Hash the whole screenshot - a prefix is mostly identical PNG header bytes
+            screenshot = EncodedImage.coerce(screenshot)
+            key_hash = hashlib.blake2b(screenshot.data, digest_size=16).hexdigest()
+            cache_key = f"{element_description}|{element_type}|{key_hash}"
             
             # Check cache
-            if cache_key in self.element_cache:
-                cached_result, timestamp = self.element_cache[cache_key]
-                if time.time() - timestamp < self.cache_ttl:
-                    return cached_result
+            cached = self._cache_lookup(self.element_cache, cache_key)
+            if cached is not None:
+                return cached[0]
+            
+            # Elements seen before can usually be found by template matching alone
+            template_key = f"{element_description}|{element_type}"
+            element = self._match_template(screenshot, template_key)
+            if element is not None:
+                self._cache_store(self.element_cache, cache_key, element)
+                self.logger.debug(f"Template matched '{element_description}' at ({element.x}, {element.y})")
+                return element
             
             type_filter = f" of type '{element_type}'" if element_type else ""
             
-            prompt = f"""
-            Find the UI element described as: "{element_description}"{type_filter}
-            
-            Return JSON with:
-            {{
-                "found": true/false,
-                "element": {{
-                    "element_type": "detected type",
-                    "description": "what you found",
-                    "x": center_x_coordinate,
-                    "y": center_y_coordinate,
-                    "width": estimated_width,
-                    "height": estimated_height,
-                    "confidence": 0.0-1.0,
-                    "clickable": true/false,
-                    "text_content": "visible text if any"
-                }},
-                "reasoning": "why you think this is the correct element",
-                "alternatives": ["other possible matches if any"]
-            }}
-            
-            Be precise with coordinates and only return high-confidence matches.
-            """
-            
-            response = self.vision_analyzer.analyze_screenshot_general(screenshot_b64, prompt)
+            prompt = _PROMPT_FIND_ELEMENT.format(
+                element_description=element_description,
+                type_filter=type_filter
+            )
+            
+            response = self._analyze(screenshot, prompt)
             
             if response.get('found', False):
                 elem_data = response.get('element', {})
-                element = DetectedElement(
-                    element_type=elem_data.get('element_type', 'unknown'),
-                    description=elem_data.get('description', element_description),
-                    x=elem_data.get('x', 0),
-                    y=elem_data.get('y', 0),
-                    width=elem_data.get('width', 0),
-                    height=elem_data.get('height', 0),
-                    confidence=elem_data.get('confidence', 0.0),
-                    clickable=elem_data.get('clickable', True),
-                    text_content=elem_data.get('text_content')
+                element = DetectedElement.from_dict(
+                    elem_data,
+                    description=element_description,
+                    clickable=True
                 )
                 
                 # Cache the result
-                self.element_cache[cache_key] = (element, time.time())
+                self._cache_store(self.element_cache, cache_key, element)
+                self._store_template(screenshot, template_key, element)
                 
                 self.logger.debug(f"Found element '{element_description}' at ({element.x}, {element.y}) with confidence {element.confidence}")
                 return element
             else:
                 # Cache negative result
-                self.element_cache[cache_key] = (None, time.time())
+                self._cache_store(self.element_cache, cache_key, None)
                 self.logger.debug(f"Element '{element_description}' not found")
                 return None
                 
@@ -190,31 +524,80 @@ class AIVision:
             self.logger.error(f"Smart element detection failed: {e}")
             return None
     
-    def detect_application_errors(self, screenshot_b64: str) -> Dict[str, Any]:
+    @staticmethod
+    def _decode_grayscale(screenshot: EncodedImage):
+        """Decode a screenshot to a 2D uint8 array"""
+        with Image.open(io.BytesIO(screenshot.data)) as img:
+            return np.asarray(img.convert('L'))
+    
+    def _match_template(self, screenshot: EncodedImage, template_key: str) -> Optional[DetectedElement]:
+        """Re-locate a previously detected element by normalised cross-correlation"""
+        if not CV2_AVAILABLE:
+            return None
+        
+        with self._cache_lock:
+            entry = self._template_library.get(template_key)
+        if entry is None:
+            return None
+        
+        template, element = entry
+        height, width = template.shape
+        try:
+            screen = self._decode_grayscale(screenshot)
+            if height > screen.shape[0] or width > screen.shape[1]:
+                return None
+            
+            scores = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+            _, max_score, _, (left, top) = cv2.minMaxLoc(scores)
+        except Exception as e:
+            self.logger.debug(f"Template match failed for '{template_key}': {e}")
+            return None
+        
+        if max_score < self.template_match_threshold:
+            return None
+        
+        with self._cache_lock:
+            if template_key in self._template_library:
+                self._template_library.move_to_end(template_key)
+        
+        return replace(element, x=left + width // 2, y=top + height // 2, confidence=float(max_score))
+    
+    def _store_template(self, screenshot: EncodedImage, template_key: str, element: DetectedElement):
+        """Keep a crop of a VLM-detected element for later template matching"""
+        if not CV2_AVAILABLE:
+            return
+        
+        try:
+            screen = self._decode_grayscale(screenshot)
+            left = max(0, int(element.x - element.width / 2))
+            top = max(0, int(element.y - element.height / 2))
+            right = min(screen.shape[1], left + int(element.width))
+            bottom = min(screen.shape[0], top + int(element.height))
+            if right - left < 4 or bottom - top < 4:
+                return
+            
+            template = np.ascontiguousarray(screen[top:bottom, left:right])
+            # Flat crops match anywhere, so they are useless as templates
+            if template.std() < 1.0:
+                return
+        except Exception as e:
+            self.logger.debug(f"Could not store template for '{template_key}': {e}")
+            return
+        
+        with self._cache_lock:
+            self._template_library[template_key] = (template, element)
+            self._template_library.move_to_end(template_key)
+            while len(self._template_library) > self.template_library_size:
+                self._template_library.popitem(last=False)
+    
+    def detect_application_errors(self, screenshot: ScreenshotInput) -> Dict[str, Any]:
         """
         Detect error conditions, dialogs, and problematic states
         """
         try:
-            prompt = """
-            Analyze this screenshot for error conditions, problems, or unexpected states.
-            
-            Return JSON with:
-            {
-                "has_error": true/false,
-                "error_type": "dialog|crash|hang|permission|network|file|unknown",
-                "error_message": "visible error text if any",
-                "severity": "low|medium|high|critical",
-                "suggested_action": "ok|cancel|retry|close|restart|ignore",
-                "dialog_buttons": ["list of visible dialog buttons"],
-                "recovery_possible": true/false,
-                "confidence": 0.0-1.0,
-                "description": "detailed description of the error state"
-            }
-            
-            Look for error dialogs, crash reports, unresponsive applications, permission requests, etc.
-            """
+            prompt = _PROMPT_ERRORS
             
-            response = self.vision_analyzer.analyze_screenshot_general(screenshot_b64, prompt)
+            response = self._analyze(screenshot, prompt)
             
             if response.get('has_error', False):
                 self.logger.warning(f"Error detected: {response.get('error_type', 'unknown')} - {response.get('description', '')}")
@@ -225,39 +608,21 @@ class AIVision:
             self.logger.error(f"Error detection failed: {e}")
             return {"has_error": False, "confidence": 0.0}
     
-    def guide_next_action(self, screenshot_b64: str, goal: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def guide_next_action(self, screenshot: ScreenshotInput, goal: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Provide intelligent guidance for the next automation action
         """
         try:
             context_info = ""
             if context:
-                context_info = f"\nContext: {json.dumps(context, indent=2)}"
-            
-            prompt = f"""
-            Analyze this screenshot and provide guidance for achieving the goal: "{goal}"
-            {context_info}
-            
-            Return JSON with:
-            {{
-                "action_type": "click|type|key_press|scroll|wait|navigate",
-                "target_element": "description of element to interact with",
-                "target_coordinates": {{"x": coordinate, "y": coordinate}},
-                "action_details": "specific text to type or key to press",
-                "reasoning": "why this action is recommended",
-                "confidence": 0.0-1.0,
-                "estimated_success": 0.0-1.0,
-                "alternative_actions": [
-                    {{"action": "alternative approach", "confidence": 0.0-1.0}}
-                ],
-                "warnings": ["potential issues or risks"],
-                "prerequisites": ["conditions that should be met first"]
-            }}
+                context_info = f"\nContext: {fast_json.dumps(context, indent=True)}"
             
-            Consider the current state and provide the most logical next step.
-            """
+            prompt = _PROMPT_GUIDE_ACTION.format(
+                goal=goal,
+                context_info=context_info
+            )
             
-            response = self.vision_analyzer.analyze_screenshot_general(screenshot_b64, prompt)
+            response = self._analyze(screenshot, prompt)
             
             action_type = response.get('action_type', 'wait')
             confidence = response.get('confidence', 0.0)
@@ -274,33 +639,26 @@ class AIVision:
                 "confidence": 0.0
             }
     
-    def verify_action_result(self, before_screenshot_b64: str, after_screenshot_b64: str, 
+    def verify_action_result(self, before_screenshot: ScreenshotInput, after_screenshot: ScreenshotInput, 
                            intended_action: str) -> Dict[str, Any]:
         """
         Verify if an action had the intended effect by comparing before/after screenshots
         """
         try:
-            prompt = f"""
-            Compare these before and after screenshots to verify if the intended action succeeded.
-            Intended action: "{intended_action}"
-            
-            Return JSON with:
-            {{
-                "action_succeeded": true/false,
-                "changes_detected": true/false,
-                "change_description": "what changed between the screenshots",
-                "success_indicators": ["signs that action worked"],
-                "failure_indicators": ["signs that action failed"],
-                "confidence": 0.0-1.0,
-                "needs_retry": true/false,
-                "suggested_next_action": "what to do next"
-            }}
+            before_screenshot = EncodedImage.coerce(before_screenshot)
+            after_screenshot = EncodedImage.coerce(after_screenshot)
             
-            Look for visual changes that indicate the action was successful.
-            """
+            # Nothing changed on screen, so the action had no visible effect
+            if self._screenshots_identical(before_screenshot, after_screenshot):
+                self.logger.info(f"Action verification: no visual change after '{intended_action}'")
+                return dict(_NO_CHANGE_RESULT)
+            
+            prompt = _PROMPT_VERIFY_ACTION.format(
+                intended_action=intended_action
+            )
             
             # For now, analyze the after screenshot (multi-image comparison would need special handling)
-            response = self.vision_analyzer.analyze_screenshot_general(after_screenshot_b64, prompt)
+            response = self._analyze(after_screenshot, prompt)
             
             success = response.get('action_succeeded', False)
             confidence = response.get('confidence', 0.0)
@@ -317,46 +675,68 @@ class AIVision:
                 "suggested_next_action": "retry"
             }
     
-    def extract_text_content(self, screenshot_b64: str, region: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _screenshots_identical(before: EncodedImage, after: EncodedImage) -> bool:
+        """True if two screenshots are byte-identical or decode to the same pixels"""
+        if before.data == after.data:
+            return True
+        
+        try:
+            with Image.open(io.BytesIO(before.data)) as img_a, Image.open(io.BytesIO(after.data)) as img_b:
+                if img_a.size != img_b.size:
+                    return False
+                pixels_a = img_a.convert('RGB').tobytes()
+                pixels_b = img_b.convert('RGB').tobytes()
+        except Exception:
+            return False
+        
+        # Both paths stop at the first differing byte instead of building a diff image
+        if NUMBA_AVAILABLE:
+            return not _any_pixel_diff(np.frombuffer(pixels_a, dtype=np.uint8),
+                                       np.frombuffer(pixels_b, dtype=np.uint8))
+        return pixels_a == pixels_b
+    
+    @staticmethod
+    def _crop_screenshot(screenshot: ScreenshotInput, region: Tuple[int, int, int, int]) -> EncodedImage:
+        """Crop a screenshot to (x, y, width, height) and re-encode it for the VLM"""
+        x, y, width, height = region
+        with Image.open(io.BytesIO(EncodedImage.coerce(screenshot).data)) as img:
+            cropped = img.crop((x, y, x + width, y + height))
+        
+        return encode_for_vlm(cropped)
+    
+    @staticmethod
+    def _offset_coordinates(items: List[Dict[str, Any]], dx: int, dy: int) -> List[Dict[str, Any]]:
+        """Translate x/y of region-relative results back to full-screen coordinates"""
+        translated = []
+        for item in items:
+            item = dict(item)
+            if isinstance(item.get('x'), (int, float)):
+                item['x'] += dx
+            if isinstance(item.get('y'), (int, float)):
+                item['y'] += dy
+            translated.append(item)
+        return translated
+    
+    def extract_text_content(self, screenshot: ScreenshotInput, region: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, Any]:
         """
         Extract and structure text content from screenshot
         """
         try:
-            region_info = ""
+            # Send only the region's pixels rather than asking the model to focus on it
             if region:
-                x, y, width, height = region
-                region_info = f"\nFocus on the region from ({x}, {y}) with size {width}x{height}"
-            
-            prompt = f"""
-            Extract and analyze all visible text content from this screenshot.
-            {region_info}
-            
-            Return JSON with:
-            {{
-                "text_elements": [
-                    {{
-                        "text": "extracted text",
-                        "x": approximate_x_coordinate,
-                        "y": approximate_y_coordinate,
-                        "font_size": "small|medium|large",
-                        "element_type": "title|button|label|menu|input|error|info",
-                        "confidence": 0.0-1.0
-                    }}
-                ],
-                "structured_content": {{
-                    "titles": ["main titles/headings"],
-                    "buttons": ["button labels"],
-                    "labels": ["form labels"],
-                    "errors": ["error messages"],
-                    "info": ["informational text"]
-                }},
-                "overall_confidence": 0.0-1.0
-            }}
-            
-            Be thorough in extracting all readable text.
-            """
-            
-            response = self.vision_analyzer.analyze_screenshot_general(screenshot_b64, prompt)
+                screenshot = self._crop_screenshot(screenshot, region)
+            
+            response = self._analyze(screenshot, _PROMPT_EXTRACT_TEXT)
+            
+            if region:
+                # Copy rather than mutate - the response object is shared with the cache
+                response = {
+                    **response,
+                    'text_elements': self._offset_coordinates(
+                        response.get('text_elements', []), region[0], region[1]
+                    )
+                }
             
             text_count = len(response.get('text_elements', []))
             self.logger.debug(f"Extracted {text_count} text elements")
@@ -367,36 +747,14 @@ class AIVision:
             self.logger.error(f"Text extraction failed: {e}")
             return {"text_elements": [], "structured_content": {}, "overall_confidence": 0.0}
     
-    def detect_loading_states(self, screenshot_b64: str) -> Dict[str, Any]:
+    def detect_loading_states(self, screenshot: ScreenshotInput) -> Dict[str, Any]:
         """
         Detect loading indicators, progress bars, and wait states
         """
         try:
-            prompt = """
-            Analyze this screenshot for loading indicators and wait states.
-            
-            Return JSON with:
-            {
-                "is_loading": true/false,
-                "loading_indicators": [
-                    {
-                        "type": "spinner|progress_bar|throbber|dialog|text",
-                        "description": "what loading indicator is visible",
-                        "progress_percent": 0-100,
-                        "x": coordinate,
-                        "y": coordinate
-                    }
-                ],
-                "estimated_completion_time": "seconds estimate or 'unknown'",
-                "can_interact": true/false,
-                "loading_text": "any visible loading message",
-                "confidence": 0.0-1.0
-            }
+            prompt = _PROMPT_LOADING_STATES
             
-            Look for spinners, progress bars, "Loading..." text, disabled interfaces, etc.
-            """
-            
-            response = self.vision_analyzer.analyze_screenshot_general(screenshot_b64, prompt)
+            response = self._analyze(screenshot, prompt)
             
             is_loading = response.get('is_loading', False)
             if is_loading:
@@ -408,40 +766,14 @@ class AIVision:
             self.logger.error(f"Loading state detection failed: {e}")
             return {"is_loading": False, "confidence": 0.0}
     
-    def analyze_form_fields(self, screenshot_b64: str) -> Dict[str, Any]:
+    def analyze_form_fields(self, screenshot: ScreenshotInput) -> Dict[str, Any]:
         """
         Analyze and identify form fields and their states
         """
         try:
-            prompt = """
-            Identify and analyze all form fields in this screenshot.
-            
-            Return JSON with:
-            {
-                "form_fields": [
-                    {
-                        "field_type": "textbox|dropdown|checkbox|radio|button|file",
-                        "label": "field label if visible",
-                        "placeholder": "placeholder text if any",
-                        "current_value": "current content if visible",
-                        "required": true/false,
-                        "enabled": true/false,
-                        "x": center_x_coordinate,
-                        "y": center_y_coordinate,
-                        "width": estimated_width,
-                        "height": estimated_height
-                    }
-                ],
-                "form_state": "empty|partially_filled|complete|invalid",
-                "submit_button": {"x": coord, "y": coord, "enabled": true/false},
-                "validation_errors": ["visible error messages"],
-                "confidence": 0.0-1.0
-            }
-            
-            Focus on interactive form elements and their current states.
-            """
+            prompt = _PROMPT_FORM_FIELDS
             
-            response = self.vision_analyzer.analyze_screenshot_general(screenshot_b64, prompt)
+            response = self._analyze(screenshot, prompt)
             
             field_count = len(response.get('form_fields', []))
             self.logger.debug(f"Analyzed {field_count} form fields")
@@ -452,15 +784,64 @@ class AIVision:
             self.logger.error(f"Form analysis failed: {e}")
             return {"form_fields": [], "confidence": 0.0}
     
+    def _analysis_calls(self, screenshot: ScreenshotInput, goal: Optional[str],
+                        context: Optional[Dict[str, Any]]) -> Dict[str, Tuple[Any, tuple]]:
+        """Independent analyses run by analyze_all, keyed by result name"""
+        calls = {
+            'desktop_state': (self.analyze_desktop_state, (screenshot,)),
+            'errors': (self.detect_application_errors, (screenshot,)),
+            'loading': (self.detect_loading_states, (screenshot,)),
+            'form_fields': (self.analyze_form_fields, (screenshot,)),
+            'text_content': (self.extract_text_content, (screenshot,))
+        }
+        if goal:
+            calls['next_action'] = (self.guide_next_action, (screenshot, goal, context))
+        return calls
+    
+    def analyze_all(self, screenshot: ScreenshotInput, goal: Optional[str] = None,
+                    context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run every analysis of a screenshot in parallel and merge the results
+        Wall time is roughly the slowest single call rather than the sum
+        """
+        # Decode once up front so the worker threads share the bytes
+        image = EncodedImage.coerce(screenshot).ensure_decoded()
+        
+        futures = {
+            name: self._executor.submit(func, *args)
+            for name, (func, args) in self._analysis_calls(image, goal, context).items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+    
+    async def analyze_all_async(self, screenshot: ScreenshotInput, goal: Optional[str] = None,
+                                context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Awaitable version of analyze_all for asyncio callers"""
+        loop = asyncio.get_running_loop()
+        image = EncodedImage.coerce(screenshot).ensure_decoded()
+        
+        calls = self._analysis_calls(image, goal, context)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, func, *args) for func, args in calls.values()
+        ))
+        return dict(zip(calls.keys(), results))
+    
     def clear_cache(self):
-        """Clear the element detection cache"""
-        self.element_cache.clear()
+        """Clear the element detection and response caches"""
+        with self._cache_lock:
+            self.element_cache.clear()
+            self._response_cache.clear()
+            self._perceptual_cache.clear()
+            self._template_library.clear()
         self.logger.debug("Vision cache cleared")
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
         return {
             "cache_size": len(self.element_cache),
-            "cache_ttl": self.cache_ttl
+            "response_cache_size": len(self._response_cache),
+            "perceptual_cache_size": len(self._perceptual_cache),
+            "template_library_size": len(self._template_library),
+            "cache_ttl": self.cache_ttl,
+            "cache_max_size": self.cache_max_size
         }
 
@@ -4,17 +4,53 @@ Main Flask application for the web interface
 """
 
 from flask import Flask, render_template, jsonify, request
+import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from challenge_manager import ChallengeManager
 from logger_config import setup_logger
-from config import config
+from config import config, validate_values
+from fast_json import install_json_provider
+from system_detector import get_default_detector
+from utils import screenshot_grabber
 
 app = Flask(__name__)
+install_json_provider(app)
 logger = setup_logger(__name__)
 
-# Initialize challenge manager
-challenge_manager = ChallengeManager()
+# Challenge manager is created on first use so importing the app (e.g. in a
+# WSGI server worker) doesn't load every challenge up front
+_challenge_manager = None
+_challenge_manager_lock = threading.Lock()
+
+def get_challenge_manager():
+    """Get the shared challenge manager, creating it on first use"""
+    global _challenge_manager
+    with _challenge_manager_lock:
+        if _challenge_manager is None:
+            _challenge_manager = ChallengeManager()
+        return _challenge_manager
+
+# Challenges are not meant to overlap, so runs queue on a single worker thread
+_challenge_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='challenge')
+_running_futures = {}
+_running_futures_lock = threading.Lock()  # makes the "already running?" check and the submit one step
+
+# One detector serves every request, sharing its installation scans with the challenges
+_detector = get_default_detector()
+
+def _run_state(level):
+    """Describe the latest submitted run of a level: queued, running, finished, error or None"""
+    future = _running_futures.get(level)
+    if future is None:
+        return None, None
+    if future.running():
+        return 'running', None
+    if not future.done():
+        return 'queued', None
+    error = future.exception()
+    return ('error', str(error)) if error else ('finished', None)
 
 @app.route('/')
 def index():
@@ -25,7 +61,7 @@ def index():
 def get_challenges():
     """Get all available challenges and their status"""
     try:
-        challenges = challenge_manager.get_all_challenges()
+        challenges = get_challenge_manager().get_all_challenges()
         return jsonify({
             'success': True,
             'challenges': challenges
@@ -41,13 +77,19 @@ def get_challenges():
 def start_challenge(level):
     """Start a specific challenge level"""
     try:
-        # Run challenge in background thread to avoid blocking
-        def run_challenge():
-            challenge_manager.run_challenge(level)
+        manager = get_challenge_manager()
         
-        thread = threading.Thread(target=run_challenge)
-        thread.daemon = True
-        thread.start()
+        # Requests are served on several threads, so two starts must not both pass the check
+        with _running_futures_lock:
+            future = _running_futures.get(level)
+            if future is not None and not future.done():
+                return jsonify({
+                    'success': False,
+                    'error': f'Challenge level {level} is already queued or running'
+                }), 409
+            
+            # Run challenge on the background worker to avoid blocking
+            _running_futures[level] = _challenge_executor.submit(manager.run_challenge, level)
         
         return jsonify({
             'success': True,
@@ -64,7 +106,8 @@ def start_challenge(level):
 def get_challenge_status(level):
     """Get the current status of a challenge"""
     try:
-        status = challenge_manager.get_challenge_status(level)
+        status = get_challenge_manager().get_challenge_status(level)
+        status['run_state'], status['run_error'] = _run_state(level)
         return jsonify({
             'success': True,
             'status': status
@@ -80,7 +123,7 @@ def get_challenge_status(level):
 def get_logs():
     """Get recent automation logs"""
     try:
-        logs = challenge_manager.get_recent_logs()
+        logs = get_challenge_manager().get_recent_logs()
         return jsonify({
             'success': True,
             'logs': logs
@@ -96,21 +139,16 @@ def get_logs():
 def get_screenshot():
     """Get current desktop screenshot for debugging"""
     try:
-        from PIL import ImageGrab
-        import base64
-        import io
-        
-        # Take screenshot
-        screenshot = ImageGrab.grab()
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        screenshot.save(buffer, format='PNG')
-        screenshot_b64 = base64.b64encode(buffer.getvalue()).decode()
+        # Captured on a background thread and shared by requests within 200ms;
+        # PNG by default, ?format=jpeg&quality=N gives a smaller preview
+        image = screenshot_grabber.get(
+            image_format=request.args.get('format', 'PNG'),
+            quality=request.args.get('quality', 75, type=int)
+        )
         
         return jsonify({
             'success': True,
-            'screenshot': f'data:image/png;base64,{screenshot_b64}'
+            'screenshot': image.data_url
         })
     except Exception as e:
         logger.error(f"Error taking screenshot: {e}")
@@ -123,13 +161,10 @@ def get_screenshot():
 def get_system_info():
     """Get system information"""
     try:
-        from system_detector import SystemDetector
-        detector = SystemDetector()
-        
         info = {
-            'platform': detector.get_platform(),
-            'installed_software': detector.get_installed_software(),
-            'system_paths': detector.get_system_paths()
+            'platform': _detector.get_platform(),
+            'installed_software': _detector.get_installed_software(),
+            'system_paths': _detector.get_system_paths()
         }
         
         return jsonify({
@@ -173,18 +208,7 @@ def save_config():
             }), 400
         
         # Validate configuration
-        issues = []
-        
-        # Validate API key format
-        if 'openai_api_key' in data:
-            api_key = data['openai_api_key']
-            if api_key and not api_key.startswith('sk-'):
-                issues.append('OpenAI API key must start with "sk-"')
-        
-        # Validate numeric ranges
-        speed = data.get('automation_speed', 1.0)
-        if not isinstance(speed, (int, float)) or speed < 0.1 or speed > 10:
-            issues.append('Automation speed must be between 0.1 and 10.0')
+        issues = validate_values(data)
         
         if issues:
             return jsonify({
@@ -241,4 +265,14 @@ def validate_config():
 
 if __name__ == '__main__':
     logger.info("Starting Progressive Desktop Automation Challenge System")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    
+    # FLASK_DEBUG=1 keeps the Werkzeug dev server with the debugger and reloader
+    if os.environ.get('FLASK_DEBUG') == '1':
+        app.run(host='0.0.0.0', port=5000, debug=True)
+    else:
+        try:
+            from waitress import serve
+            serve(app, host='0.0.0.0', port=5000, threads=8)
+        except ImportError:
+            logger.warning("waitress not installed - falling back to threaded Flask server")
+            app.run(host='0.0.0.0', port=5000, threaded=True)
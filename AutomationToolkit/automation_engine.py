@@ -1,21 +1,186 @@
 """
 Core automation engine for desktop interactions
-Handles PyAutoGUI operations with AI vision guidance
+Handles PyAutoGUI operations with AI vision guidance, using a native input
+backend (pydirectinput / XTest) when one is installed
 """
 
 import pyautogui
+import asyncio
+import functools
+import hashlib
+import os
+import platform
+import random
+import threading
 import time
-import base64
-import io
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from PIL import ImageGrab, Image
 from vision_analyzer import VisionAnalyzer
 from logger_config import setup_logger
+from utils import encode_for_vlm
+
+# mss is optional; it captures through the native screen API and is faster than ImageGrab
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+# OpenCV is optional; it re-locates elements seen before without a vision call
+try:
+    import numpy as np
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# pydirectinput is optional; on Windows it injects input with SendInput directly
+try:
+    import pydirectinput
+    PYDIRECTINPUT_AVAILABLE = True
+except ImportError:
+    PYDIRECTINPUT_AVAILABLE = False
+
+# python-xlib is optional; on Linux it moves and clicks through XTest without pyautogui's overhead
+try:
+    from Xlib import X, display as xdisplay
+    from Xlib.ext import xtest
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+# Display setup touches the filesystem, so it runs once per process rather than per engine
+_XAUTHORITY_PATH = Path.home() / '.Xauthority'
+_display_setup_done = False
+
+class PyAutoGUIBackend:
+    """Input backend using pyautogui for everything"""
+    name = 'pyautogui'
+    
+    def move(self, x, y, duration=0.0):
+        pyautogui.moveTo(x, y, duration=duration)
+    
+    def click(self):
+        pyautogui.click()
+    
+    def write(self, text, interval=0.0):
+        pyautogui.write(text, interval=interval)
+    
+    def press(self, key):
+        pyautogui.press(key)
+    
+    def hotkey(self, *keys):
+        pyautogui.hotkey(*keys)
+
+class DirectInputBackend(PyAutoGUIBackend):
+    """Windows input backend using pydirectinput (SendInput scan codes)"""
+    name = 'pydirectinput'
+    
+    def __init__(self):
+        pydirectinput.PAUSE = 0
+    
+    def move(self, x, y, duration=0.0):
+        # pydirectinput only jumps; a timed glide goes through pyautogui's tweening
+        if duration > 0:
+            super().move(x, y, duration)
+            return
+        pydirectinput.moveTo(x, y)
+    
+    def click(self):
+        pydirectinput.click()
+    
+    def write(self, text, interval=0.0):
+        pydirectinput.write(text, interval=interval)
+    
+    def press(self, key):
+        pydirectinput.press(key)
+    
+    def hotkey(self, *keys):
+        for key in keys:
+            pydirectinput.keyDown(key)
+        for key in reversed(keys):
+            pydirectinput.keyUp(key)
+
+class XlibBackend(PyAutoGUIBackend):
+    """Linux backend that warps and clicks the pointer through XTest; keyboard stays on pyautogui"""
+    name = 'xlib'
+    
+    def __init__(self):
+        self._display = xdisplay.Display()
+        self._root = self._display.screen().root
+    
+    def move(self, x, y, duration=0.0):
+        # A warp is instant; a timed glide goes through pyautogui's tweening
+        if duration > 0:
+            super().move(x, y, duration)
+            return
+        self._root.warp_pointer(int(x), int(y))
+        self._display.sync()
+    
+    def click(self):
+        xtest.fake_input(self._display, X.ButtonPress, 1)
+        xtest.fake_input(self._display, X.ButtonRelease, 1)
+        self._display.sync()
+
+def _select_backend(logger):
+    """Pick the lowest-overhead input backend available on this platform"""
+    system = platform.system().lower()
+    
+    try:
+        if system == 'windows' and PYDIRECTINPUT_AVAILABLE:
+            return DirectInputBackend()
+        if system == 'linux' and XLIB_AVAILABLE:
+            return XlibBackend()
+    except Exception as e:
+        logger.warning(f"Native input backend unavailable, using pyautogui: {e}")
+    
+    return PyAutoGUIBackend()
 
 class AutomationEngine:
     def __init__(self):
         self.logger = setup_logger(__name__)
         self.vision = VisionAnalyzer()
         self.headless_mode = False
+        self._sct = None  # mss capture handle, opened on first screenshot
+        
+        # (description, frame digest, recorded_at) of the last screenshot where an element
+        # wasn't found; an identical frame within miss_ttl seconds skips the vision call
+        self._last_miss = None
+        self.miss_ttl = 3.0
+        
+        # (screenshot, base64) for the most recently encoded frame, so retries and
+        # several lookups on the same frame encode it once
+        self._last_encoded = None
+        
+        # description -> (x, y, width, height) around where it was last found;
+        # click_element searches there first before grabbing the whole desktop
+        self._element_regions = {}
+        self.region_padding = 200
+        self._screen_dims = None  # (width, height) of the desktop, looked up on first use
+        
+        # description -> greyscale crop around the last vision hit, most recent last
+        self._templates = OrderedDict()
+        self._templates_lock = threading.Lock()
+        self.template_half_size = 40
+        self.template_library_size = 64
+        self.template_match_threshold = 0.9
+        
+        # Extra delay after each input action; pyautogui's own PAUSE is disabled
+        self.action_pause = 0.0
+        
+        # While click_element backs off after a miss, the retry's frame is captured
+        # prefetch_lead seconds before it wakes and encoded in the background; frames
+        # older than prefetch_max_age when the retry takes them are discarded
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshot-prefetch')
+        self._next_shot = None  # Future of (captured_at, screenshot)
+        self.prefetch_lead = 0.1
+        self.prefetch_max_age = 0.2
+        
+        # wait_for_element's vision lookups run here rather than on asyncio's default executor,
+        # which asyncio.run waits for, so a lookup still in flight can't hold a wait past its timeout
+        self._lookup_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='element-lookup')
         
         # Setup display environment
         self._setup_display_environment()
@@ -23,7 +188,10 @@ class AutomationEngine:
         # Configure PyAutoGUI
         try:
             pyautogui.FAILSAFE = False  # Disable for headless operation
-            pyautogui.PAUSE = 0.5
+            # Vision lookups already serialize actions, so don't sleep after every call
+            pyautogui.PAUSE = 0
+            pyautogui.MINIMUM_DURATION = 0
+            pyautogui.MINIMUM_SLEEP = 0
             # Test if we can access the display
             pyautogui.size()
             self.logger.info("GUI environment detected")
@@ -31,31 +199,34 @@ class AutomationEngine:
             self.logger.warning(f"GUI environment not available: {e}")
             self.headless_mode = True
         
-        self.logger.info(f"Automation engine initialized (headless: {self.headless_mode})")
+        self._backend = _select_backend(self.logger)
+        
+        self.logger.info(f"Automation engine initialized (headless: {self.headless_mode}, input: {self._backend.name})")
     
     def _setup_display_environment(self):
-        """Setup display environment for automation"""
-        import os
-        from pathlib import Path
+        """Setup display environment for automation (once per process)"""
+        global _display_setup_done
+        if _display_setup_done:
+            return
         
         try:
             # Set DISPLAY if not already set
-            if 'DISPLAY' not in os.environ:
-                os.environ['DISPLAY'] = ':0'
+            os.environ.setdefault('DISPLAY', ':0')
             
             # Create Xauthority file if it doesn't exist
-            xauth_path = Path.home() / '.Xauthority'
-            if not xauth_path.exists():
-                xauth_path.touch()
-                self.logger.info(f"Created {xauth_path}")
+            if not _XAUTHORITY_PATH.exists():
+                _XAUTHORITY_PATH.touch()
+                self.logger.info(f"Created {_XAUTHORITY_PATH}")
+            
+            _display_setup_done = True
                 
         except Exception as e:
             self.logger.warning(f"Could not setup display environment: {e}")
     
-    def take_screenshot(self, save_path=None):
-        """Take a screenshot of the desktop"""
+    def take_screenshot(self, save_path=None, region=None):
+        """Take a screenshot of the desktop, or of region=(x, y, width, height)"""
         try:
-            screenshot = ImageGrab.grab()
+            screenshot = self._grab_screen(region)
             if save_path:
                 screenshot.save(save_path)
             return screenshot
@@ -63,22 +234,81 @@ class AutomationEngine:
             self.logger.error(f"Failed to take screenshot: {e}")
             raise
     
+    def _grab_screen(self, region=None):
+        """Capture the desktop or a region of it, via mss when available"""
+        if MSS_AVAILABLE:
+            try:
+                if self._sct is None:
+                    self._sct = mss.mss()
+                if region is None:
+                    monitor = self._sct.monitors[0]
+                else:
+                    x, y, width, height = region
+                    monitor = {'left': x, 'top': y, 'width': width, 'height': height}
+                raw = self._sct.grab(monitor)
+                return Image.frombytes("RGB", raw.size, raw.rgb)
+            except Exception as e:
+                self.logger.warning(f"mss capture failed, falling back to ImageGrab: {e}")
+                self._sct = None
+        
+        if region is None:
+            return ImageGrab.grab()
+        x, y, width, height = region
+        return ImageGrab.grab(bbox=(x, y, x + width, y + height))
+    
     def screenshot_to_base64(self, screenshot=None):
-        """Convert screenshot to base64 string"""
+        """Convert screenshot to base64 string (JPEG, for upload to the vision model)"""
         if screenshot is None:
             screenshot = self.take_screenshot()
         
-        buffer = io.BytesIO()
-        screenshot.save(buffer, format='PNG')
-        return base64.b64encode(buffer.getvalue()).decode()
+        last_encoded = self._last_encoded
+        if last_encoded is not None and last_encoded[0] is screenshot:
+            return last_encoded[1]
+        
+        screenshot_b64 = encode_for_vlm(screenshot).b64
+        self._last_encoded = (screenshot, screenshot_b64)
+        return screenshot_b64
+    
+    @staticmethod
+    def _frame_digest(screenshot):
+        """Exact content hash of a frame; any changed pixel gives a different digest"""
+        return hashlib.blake2b(screenshot.tobytes(), digest_size=16).digest()
     
-    def find_element_coordinates(self, description, screenshot=None):
-        """Use AI vision to find element coordinates on screen"""
+    def _unchanged_since_miss(self, key, frame_digest):
+        """True if the last lookup for key, at most miss_ttl seconds ago, found nothing on this exact frame"""
+        last_miss = self._last_miss
+        return (last_miss is not None and last_miss[0] == key and last_miss[1] == frame_digest
+                and time.monotonic() - last_miss[2] <= self.miss_ttl)
+    
+    @staticmethod
+    def _still_wanted(abandoned):
+        """False once the caller that started a lookup has stopped waiting for it"""
+        return abandoned is None or not abandoned.is_set()
+    
+    def find_element_coordinates(self, description, screenshot=None, region=None, abandoned=None):
+        """
+        Use AI vision to find element coordinates on screen
+        With region=(x, y, width, height) only that area is captured (or screenshot is
+        taken to be a capture of it) and the result is offset back to screen coordinates
+        abandoned is an optional threading.Event; once set, a miss is no longer recorded
+        """
         try:
             if screenshot is None:
-                screenshot = self.take_screenshot()
+                screenshot = self._take_prefetched_screenshot() if region is None else self.take_screenshot(region=region)
             
-            screenshot_b64 = self.screenshot_to_base64(screenshot)
+            offset_x, offset_y = (region[0], region[1]) if region is not None else (0, 0)
+            
+            match = self._match_template(screenshot, description)
+            if match is not None:
+                x, y = match[0] + offset_x, match[1] + offset_y
+                self._element_regions[description] = self._padded_region(x, y)
+                self.logger.info(f"Found element '{description}' at ({x}, {y}) by template match")
+                return x, y
+            
+            frame_digest = self._frame_digest(screenshot)
+            if self._unchanged_since_miss(description, frame_digest):
+                self.logger.debug(f"Screen unchanged since '{description}' was last not found, skipping vision call")
+                return None, None
             
             prompt = f"""
             Analyze this desktop screenshot and find the element described as: "{description}"
@@ -89,12 +319,25 @@ class AutomationEngine:
             If the element is not found or you're not confident, set found to false.
             """
             
-            response = self.vision.analyze_screenshot_for_coordinates(screenshot_b64, prompt)
+            if self.vision.is_local:
+                # Local models take the pixels directly, skipping JPEG and base64
+                response = self.vision.analyze_screenshot_image(screenshot, prompt)
+            else:
+                screenshot_b64 = self.screenshot_to_base64(screenshot)
+                response = self.vision.analyze_screenshot_for_coordinates(screenshot_b64, prompt)
             
             if response.get('found', False):
-                self.logger.info(f"Found element '{description}' at ({response['x']}, {response['y']}) with confidence {response['confidence']}")
-                return response['x'], response['y']
+                self._last_miss = None
+                self._store_template(screenshot, description, response['x'], response['y'])
+                x, y = response['x'] + offset_x, response['y'] + offset_y
+                self._element_regions[description] = self._padded_region(x, y)
+                self.logger.info(f"Found element '{description}' at ({x}, {y}) with confidence {response['confidence']}")
+                return x, y
             else:
+                # A miss from a lookup nobody is waiting for anymore is for an old frame;
+                # recording it could suppress the vision call for a newer one
+                if self._still_wanted(abandoned):
+                    self._last_miss = (description, frame_digest, time.monotonic())
                 self.logger.warning(f"Element '{description}' not found in screenshot")
                 return None, None
                 
@@ -102,28 +345,200 @@ class AutomationEngine:
             self.logger.error(f"Error finding element coordinates: {e}")
             return None, None
     
-    def click_element(self, description, max_attempts=3):
-        """Find and click an element using AI vision"""
+    def _capture_and_encode(self, not_before=0.0):
+        """Capture the full screen at not_before (monotonic) and encode it for upload (runs on the prefetch thread)"""
+        delay = not_before - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        captured_at = time.monotonic()
+        screenshot = self.take_screenshot()
+        self.screenshot_to_base64(screenshot)
+        return captured_at, screenshot
+    
+    def _take_prefetched_screenshot(self):
+        """Use the background capture if it is recent enough, otherwise capture now"""
+        future, self._next_shot = self._next_shot, None
+        if future is not None:
+            try:
+                captured_at, screenshot = future.result()
+                if time.monotonic() - captured_at <= self.prefetch_max_age:
+                    return screenshot
+            except Exception as e:
+                self.logger.debug(f"Prefetched screenshot unavailable: {e}")
+        
+        return self.take_screenshot()
+    
+    def _match_template(self, screenshot, description):
+        """Locate a previously seen element by normalised cross-correlation; (x, y) or None"""
+        if not CV2_AVAILABLE:
+            return None
+        
+        with self._templates_lock:
+            template = self._templates.get(description)
+        if template is None:
+            return None
+        
+        try:
+            screen = np.asarray(screenshot.convert('L'))
+            height, width = template.shape
+            if height > screen.shape[0] or width > screen.shape[1]:
+                return None
+            
+            scores = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+            _, max_score, _, (left, top) = cv2.minMaxLoc(scores)
+        except Exception as e:
+            self.logger.debug(f"Template match failed for '{description}': {e}")
+            return None
+        
+        if max_score < self.template_match_threshold:
+            return None
+        return left + width // 2, top + height // 2
+    
+    def _store_template(self, screenshot, description, x, y):
+        """Keep a crop around a vision hit (in screenshot coordinates) for template matching"""
+        if not CV2_AVAILABLE:
+            return
+        
+        try:
+            screen = np.asarray(screenshot.convert('L'))
+            half = self.template_half_size
+            left, top = max(0, int(x) - half), max(0, int(y) - half)
+            right, bottom = min(screen.shape[1], int(x) + half), min(screen.shape[0], int(y) + half)
+            # The crop must be centred on the hit, so skip ones clipped by the screen edge
+            if right - left != 2 * half or bottom - top != 2 * half:
+                return
+            
+            template = np.ascontiguousarray(screen[top:bottom, left:right])
+            # Flat crops match anywhere, so they are useless as templates
+            if template.std() < 1.0:
+                return
+        except Exception as e:
+            self.logger.debug(f"Could not store template for '{description}': {e}")
+            return
+        
+        with self._templates_lock:
+            self._templates[description] = template
+            self._templates.move_to_end(description)
+            while len(self._templates) > self.template_library_size:
+                self._templates.popitem(last=False)
+    
+    def _screen_size(self):
+        """(width, height) of the whole desktop, or None if it can't be determined"""
+        if self._screen_dims is None:
+            try:
+                if MSS_AVAILABLE:
+                    if self._sct is None:
+                        self._sct = mss.mss()
+                    monitor = self._sct.monitors[0]
+                    self._screen_dims = (monitor['width'], monitor['height'])
+                else:
+                    width, height = pyautogui.size()
+                    self._screen_dims = (width, height)
+            except Exception as e:
+                self.logger.debug(f"Could not read screen size: {e}")
+        return self._screen_dims
+    
+    def _padded_region(self, x, y):
+        """Capture region of region_padding pixels around a point, shifted to lie on the screen"""
+        width = height = self.region_padding * 2
+        left = max(0, int(x) - self.region_padding)
+        top = max(0, int(y) - self.region_padding)
+        
+        screen = self._screen_size()
+        if screen is not None:
+            width, height = min(width, screen[0]), min(height, screen[1])
+            left, top = min(left, screen[0] - width), min(top, screen[1] - height)
+        return (left, top, width, height)
+    
+    def find_elements_coordinates(self, descriptions, screenshot=None, abandoned=None):
+        """
+        Find several elements in one vision call; returns an (x, y) or (None, None) per description
+        abandoned is an optional threading.Event; once set, a miss is no longer recorded
+        """
+        not_found = [(None, None)] * len(descriptions)
+        try:
+            if screenshot is None:
+                screenshot = self.take_screenshot()
+            
+            key = tuple(descriptions)
+            frame_digest = self._frame_digest(screenshot)
+            if self._unchanged_since_miss(key, frame_digest):
+                self.logger.debug("Screen unchanged since these elements were last not found, skipping vision call")
+                return not_found
+            
+            screenshot_b64 = self.screenshot_to_base64(screenshot)
+            
+            numbered = "\n".join(f'{i}: "{description}"' for i, description in enumerate(descriptions))
+            prompt = f"""
+            Analyze this desktop screenshot and find each of these numbered elements:
+            {numbered}
+            
+            Return the pixel coordinates of the CENTER of each element in JSON format:
+            {{"elements": [{{"index": number, "x": coordinate, "y": coordinate, "found": true/false, "confidence": 0.0-1.0}}]}}
+            
+            Include every index. If an element is not found or you're not confident, set found to false.
+            """
+            
+            response = self.vision.analyze_screenshot_general(screenshot_b64, prompt)
+            
+            results = list(not_found)
+            for element in response.get('elements', []):
+                index = element.get('index')
+                if element.get('found', False) and isinstance(index, int) and 0 <= index < len(results):
+                    results[index] = (element['x'], element['y'])
+                    self.logger.info(f"Found element '{descriptions[index]}' at ({element['x']}, {element['y']})")
+            
+            if any(x is not None for x, _ in results):
+                self._last_miss = None
+            else:
+                if self._still_wanted(abandoned):
+                    self._last_miss = (key, frame_digest, time.monotonic())
+                self.logger.warning(f"None of {len(descriptions)} elements found in screenshot")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error finding element coordinates: {e}")
+            return not_found
+    
+    def click_element(self, description, max_attempts=3, human_like=False, region=None):
+        """
+        Find and click an element using AI vision; human_like glides the pointer instead of warping
+        Searches region if given, else around where the element was last found, then the whole screen
+        """
         for attempt in range(max_attempts):
             try:
                 self.logger.info(f"Attempting to click '{description}' (attempt {attempt + 1}/{max_attempts})")
                 
-                x, y = self.find_element_coordinates(description)
+                search_region = region or self._element_regions.get(description)
+                x, y = (None, None)
+                if search_region is not None:
+                    x, y = self.find_element_coordinates(description, region=search_region)
+                    if x is None and region is None:
+                        # The element has moved or gone; later attempts go straight to the whole screen
+                        self._element_regions.pop(description, None)
+                if x is None and region is None:
+                    x, y = self.find_element_coordinates(description)
                 
                 if x is not None and y is not None:
                     # Move to element and click
-                    pyautogui.moveTo(x, y, duration=0.5)
-                    time.sleep(0.2)
-                    pyautogui.click()
+                    self._backend.move(x, y, duration=0.5 if human_like else 0)
+                    self._backend.click()
+                    self._after_action()
                     
                     self.logger.info(f"Successfully clicked '{description}' at ({x}, {y})")
                     return True
                 else:
                     self.logger.warning(f"Could not find '{description}' on attempt {attempt + 1}")
                     
-                # Wait before retry
+                # Wait before retry; a full-screen retry gets its frame captured and encoded
+                # just before the wait ends
                 if attempt < max_attempts - 1:
-                    time.sleep(2)
+                    delay = self._backoff(attempt)
+                    if region is None and description not in self._element_regions:
+                        wake_at = time.monotonic() + delay
+                        self._next_shot = self._prefetch_pool.submit(self._capture_and_encode,
+                                                                     wake_at - self.prefetch_lead)
+                    time.sleep(delay)
                     
             except Exception as e:
                 self.logger.error(f"Error clicking element on attempt {attempt + 1}: {e}")
@@ -131,11 +546,23 @@ class AutomationEngine:
         self.logger.error(f"Failed to click '{description}' after {max_attempts} attempts")
         return False
     
+    @staticmethod
+    def _backoff(attempt, base=0.5, max_delay=8.0):
+        """Exponential backoff with jitter, so concurrent engines don't retry in lockstep"""
+        return min(max_delay, base * 2 ** min(attempt, 32)) * random.uniform(0.5, 1.0)
+    
+    def _after_action(self):
+        """Drop any prefetched frame (the screen just changed) and sleep for action_pause"""
+        self._next_shot = None
+        if self.action_pause > 0:
+            time.sleep(self.action_pause)
+    
     def type_text(self, text, delay=0.1):
         """Type text with specified delay between characters"""
         try:
             self.logger.info(f"Typing text: {text[:50]}{'...' if len(text) > 50 else ''}")
-            pyautogui.write(text, interval=delay)
+            self._backend.write(text, interval=delay)
+            self._after_action()
             return True
         except Exception as e:
             self.logger.error(f"Error typing text: {e}")
@@ -145,7 +572,8 @@ class AutomationEngine:
         """Press a specific key"""
         try:
             self.logger.info(f"Pressing key: {key}")
-            pyautogui.press(key)
+            self._backend.press(key)
+            self._after_action()
             return True
         except Exception as e:
             self.logger.error(f"Error pressing key {key}: {e}")
@@ -155,33 +583,108 @@ class AutomationEngine:
         """Press a combination of keys"""
         try:
             self.logger.info(f"Pressing key combination: {'+'.join(keys)}")
-            pyautogui.hotkey(*keys)
+            self._backend.hotkey(*keys)
+            self._after_action()
             return True
         except Exception as e:
             self.logger.error(f"Error pressing key combination: {e}")
             return False
     
     def wait_for_element(self, description, timeout=30, check_interval=2):
-        """Wait for an element to appear on screen"""
-        start_time = time.time()
+        """
+        Wait for an element (or any of a list of candidate descriptions) to appear on screen
+        Blocks the calling thread; coroutines should await wait_for_element_async instead
+        """
+        waiting = self.wait_for_element_async(description, timeout, check_interval)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(waiting)
         
-        while time.time() - start_time < timeout:
-            self.logger.info(f"Waiting for element '{description}'...")
-            
-            x, y = self.find_element_coordinates(description)
-            if x is not None and y is not None:
-                self.logger.info(f"Element '{description}' appeared after {time.time() - start_time:.1f} seconds")
-                return True
-            
-            time.sleep(check_interval)
+        # asyncio.run can't start inside a running loop, so the wait gets its own thread and loop;
+        # the calling loop is still blocked until it finishes
+        self.logger.warning("wait_for_element called from a running event loop; use wait_for_element_async")
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='wait-for-element') as pool:
+            return pool.submit(asyncio.run, waiting).result()
+    
+    async def wait_for_element_async(self, description, timeout=30, check_interval=2, max_in_flight=3):
+        """
+        Wait for an element to appear on screen
+        Screenshots are taken on a jittered backoff capped at check_interval, even while
+        earlier vision calls are still in flight, with at most max_in_flight calls outstanding
+        
+        Vision calls already sent when this returns can't be stopped: they finish on their
+        worker threads (and are billed), but their misses are no longer recorded on the engine
+        """
+        start_time = time.monotonic()
+        deadline = start_time + timeout
+        in_flight = asyncio.Semaphore(max_in_flight)
+        pending = set()
+        abandoned = threading.Event()
+        
+        loop = asyncio.get_running_loop()
+        
+        async def check(screenshot):
+            try:
+                if isinstance(description, (list, tuple)):
+                    # Candidates are searched together in one vision call
+                    found = await loop.run_in_executor(self._lookup_pool, functools.partial(
+                        self.find_elements_coordinates, description, screenshot, abandoned=abandoned))
+                    return any(x is not None and y is not None for x, y in found)
+                x, y = await loop.run_in_executor(self._lookup_pool, functools.partial(
+                    self.find_element_coordinates, description, screenshot, abandoned=abandoned))
+                return x is not None and y is not None
+            finally:
+                in_flight.release()
+        
+        try:
+            next_capture = start_time
+            attempt = 0
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                
+                if now >= next_capture:
+                    # Waiting for a free slot counts against the timeout too
+                    try:
+                        await asyncio.wait_for(in_flight.acquire(), deadline - now)
+                    except asyncio.TimeoutError:
+                        break
+                    self.logger.info(f"Waiting for element '{description}'...")
+                    try:
+                        screenshot = await asyncio.to_thread(self.take_screenshot)
+                    except Exception:
+                        in_flight.release()
+                        raise
+                    pending.add(asyncio.create_task(check(screenshot)))
+                    next_capture = time.monotonic() + self._backoff(attempt, max_delay=check_interval)
+                    attempt += 1
+                
+                wait_for = max(0, min(next_capture, deadline) - time.monotonic())
+                if pending:
+                    done, pending = await asyncio.wait(pending, timeout=wait_for,
+                                                       return_when=asyncio.FIRST_COMPLETED)
+                    if any(task.result() for task in done):
+                        self.logger.info(f"Element '{description}' appeared after {time.monotonic() - start_time:.1f} seconds")
+                        return True
+                else:
+                    await asyncio.sleep(wait_for)
+        finally:
+            # Results that arrive after we return are not needed; the threads still running them
+            # are told to leave the engine's miss state alone
+            abandoned.set()
+            for task in pending:
+                task.cancel()
         
         self.logger.warning(f"Element '{description}' did not appear within {timeout} seconds")
         return False
     
-    def verify_screen_state(self, expected_description):
-        """Verify that the screen shows expected content"""
+    def verify_screen_state(self, expected_description, screenshot=None):
+        """Verify that the screen (or a screenshot just taken of it) shows expected content"""
         try:
-            screenshot = self.take_screenshot()
+            if screenshot is None:
+                screenshot = self.take_screenshot()
             screenshot_b64 = self.screenshot_to_base64(screenshot)
             
             prompt = f"""
@@ -2,56 +2,224 @@
 Challenge management system for progressive automation tasks
 """
 
+import ast
 import importlib
+import re
+import sqlite3
+import threading
 import time
 from pathlib import Path
+from challenges.base_challenge import ChallengeStatus
+from config import config
 from logger_config import setup_logger
 
+# Challenge files are named level<N>_<words>.py, e.g. level3_application_launch.py
+_LEVEL_RE = re.compile(r'^level(?P<num>\d+)(?:_(?P<rest>.+))?$')
+
+# Event log rows are pruned to max_logs once every this many inserts
+_PRUNE_EVERY = 100
+
+# Challenge results and the event log persist across restarts in the user's config directory,
+# so the same database is used whichever directory the app is started from
+def default_db_path():
+    """Where challenge state and the event log are stored"""
+    return config.config_dir / "challenges.db"
+
+# Challenge attributes saved to and restored from the challenges table
+_STATE_FIELDS = ('status', 'success_count', 'failure_count', 'last_run', 'execution_time', 'last_error')
+
 class ChallengeManager:
-    def __init__(self):
+    def __init__(self, db_path=None):
         self.logger = setup_logger(__name__)
-        self.challenges = {}
-        self.challenge_logs = []
+        self.challenges = {}  # level -> challenge instance, created on first use
+        self._challenge_paths = {}  # level -> (module_name, class_name, file path)
+        self._metadata = {}  # level -> static name/description/prerequisites
+        self._load_lock = threading.Lock()
+        
+        # Progress is tracked as challenges complete or reset, not rescanned per query
+        self._sorted_levels = []
+        self._completed_levels = set()
+        self._max_completed_level = 0
         self.current_challenge = None
+        self.stop_event = None  # threading.Event handed to challenges so they can abort waits
+        
+        # Event log rows beyond max_logs are pruned every _PRUNE_EVERY inserts
+        self.max_logs = 1000
+        self._logs_since_prune = 0
+        self._db_lock = threading.Lock()
+        self._db = self._open_db(db_path if db_path is not None else default_db_path())
+        self._saved_state = self._load_saved_state()  # level -> persisted _STATE_FIELDS
+        for level, state in self._saved_state.items():
+            if state['status'] == ChallengeStatus.COMPLETED.label:
+                self._set_completed(level, True)
         
-        # Load all challenge modules
+        # Discover challenge modules; they are imported on first use
         self._load_challenges()
+        self._refresh_levels()
         
-        self.logger.info(f"Challenge manager initialized with {len(self.challenges)} challenges")
+        self.logger.info(f"Challenge manager initialized with {len(self._levels())} challenges")
+    
+    @staticmethod
+    def _open_db(db_path):
+        """Open the state database in autocommit WAL mode, creating tables as needed"""
+        db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS challenges (
+                level INTEGER PRIMARY KEY, status TEXT, success_count INTEGER, failure_count INTEGER,
+                last_run REAL, execution_time REAL, last_error TEXT
+            )
+        """)
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY, timestamp REAL, level INTEGER, event_type TEXT, message TEXT
+            )
+        """)
+        db.execute("CREATE INDEX IF NOT EXISTS logs_level ON logs (level, id)")
+        return db
+    
+    def _load_saved_state(self):
+        """Read persisted challenge state keyed by level"""
+        with self._db_lock:
+            rows = self._db.execute(f"SELECT level, {', '.join(_STATE_FIELDS)} FROM challenges").fetchall()
+        return {row[0]: dict(zip(_STATE_FIELDS, row[1:])) for row in rows}
+    
+    def _save_state(self, level, challenge):
+        """Persist a challenge's status and statistics"""
+        state = {field: getattr(challenge, field) for field in _STATE_FIELDS}
+        state['status'] = challenge.status.label
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO challenges (level, status, success_count, failure_count, "
+                    "last_run, execution_time, last_error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (level, *state.values())
+                )
+            self._saved_state[level] = state
+        except Exception as e:
+            self.logger.error(f"Failed to save state for challenge level {level}: {e}")
+    
+    def _status(self, level):
+        """Current status of a level, from the loaded challenge or its saved state"""
+        challenge = self.challenges.get(level)
+        if challenge is not None:
+            return challenge.status
+        return ChallengeStatus.from_label(self._saved_state.get(level, {}).get('status'))
     
     def _load_challenges(self):
-        """Dynamically load all challenge modules"""
+        """Discover challenge modules without importing them"""
         challenges_dir = Path("challenges")
         
-        for challenge_file in challenges_dir.glob("level*.py"):
+        for challenge_file in sorted(challenges_dir.glob("level*.py")):
+            match = _LEVEL_RE.match(challenge_file.stem)
+            if not match:
+                continue
+            
             try:
+                level = int(match['num'])
                 module_name = f"challenges.{challenge_file.stem}"
-                module = importlib.import_module(module_name)
                 
                 # Get the challenge class (assumes class name matches pattern)
                 class_name = ''.join(word.capitalize() for word in challenge_file.stem.split('_'))
+                
+                self._challenge_paths[level] = (module_name, class_name, challenge_file)
+                
+            except Exception as e:
+                self.logger.error(f"Failed to register challenge {challenge_file}: {e}")
+    
+    def _refresh_levels(self):
+        """Rebuild the sorted level list after challenges are discovered"""
+        self._sorted_levels = sorted(set(self._challenge_paths) | set(self.challenges))
+    
+    def _levels(self):
+        """All known challenge levels, loaded or not"""
+        return self._sorted_levels
+    
+    def _set_completed(self, level, completed):
+        """Record whether a level is currently completed"""
+        if completed:
+            self._completed_levels.add(level)
+        else:
+            self._completed_levels.discard(level)
+        self._max_completed_level = max(self._completed_levels, default=0)
+    
+    def _get(self, level):
+        """Return the challenge for a level, importing and instantiating it on first use"""
+        challenge = self.challenges.get(level)
+        if challenge is not None:
+            return challenge
+        
+        if level not in self._challenge_paths:
+            raise ValueError(f"Challenge level {level} not found")
+        
+        with self._load_lock:
+            if level not in self.challenges:
+                module_name, class_name, _ = self._challenge_paths[level]
+                module = importlib.import_module(module_name)
                 challenge_class = getattr(module, class_name)
                 
-                # Extract level number from filename
-                level = int(challenge_file.stem.split('_')[0].replace('level', ''))
+                challenge = challenge_class()
+                for field, value in self._saved_state.get(level, {}).items():
+                    setattr(challenge, field, value)
+                challenge.status = ChallengeStatus.from_label(challenge.status)
+                challenge.stop_event = self.stop_event
                 
-                self.challenges[level] = challenge_class()
+                self.challenges[level] = challenge
                 self.logger.info(f"Loaded challenge level {level}: {challenge_class.__name__}")
-                
-            except Exception as e:
-                self.logger.error(f"Failed to load challenge {challenge_file}: {e}")
+        
+        return self.challenges[level]
+    
+    def _get_metadata(self, level):
+        """Read name, description and prerequisites from a challenge's source without importing it"""
+        metadata = self._metadata.get(level)
+        if metadata is not None:
+            return metadata
+        
+        metadata = {'name': f"Level {level}", 'description': "", 'prerequisites': []}
+        try:
+            tree = ast.parse(self._challenge_paths[level][2].read_text())
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == '__init__':
+                    for keyword in node.keywords:
+                        if keyword.arg in ('name', 'description'):
+                            metadata[keyword.arg] = ast.literal_eval(keyword.value)
+                elif isinstance(node, ast.Assign) and any(
+                        getattr(target, 'attr', None) == 'prerequisites' for target in node.targets):
+                    metadata['prerequisites'] = ast.literal_eval(node.value)
+        except Exception as e:
+            self.logger.error(f"Failed to read metadata for challenge level {level}: {e}")
+        
+        self._metadata[level] = metadata
+        return metadata
     
     def get_all_challenges(self):
         """Get information about all available challenges"""
         challenge_info = []
         
-        for level in sorted(self.challenges.keys()):
-            challenge = self.challenges[level]
+        for level in self._levels():
+            challenge = self.challenges.get(level)
+            if challenge is None:
+                # Not loaded yet, so report static metadata and saved state instead of importing it
+                metadata = self._get_metadata(level)
+                state = self._saved_state.get(level, {})
+                challenge_info.append({
+                    'level': level,
+                    'name': metadata['name'],
+                    'description': metadata['description'],
+                    'status': ChallengeStatus.from_label(state.get('status')).label,
+                    'last_run': state.get('last_run'),
+                    'success_count': state.get('success_count', 0),
+                    'failure_count': state.get('failure_count', 0),
+                    'prerequisites': metadata['prerequisites']
+                })
+                continue
+            
             info = {
                 'level': level,
                 'name': challenge.name,
                 'description': challenge.description,
-                'status': challenge.status,
+                'status': challenge.status.label,
                 'last_run': challenge.last_run,
                 'success_count': challenge.success_count,
                 'failure_count': challenge.failure_count,
@@ -63,41 +231,41 @@ class ChallengeManager:
     
     def get_challenge_status(self, level):
         """Get detailed status of a specific challenge"""
-        if level not in self.challenges:
-            raise ValueError(f"Challenge level {level} not found")
-        
-        challenge = self.challenges[level]
+        challenge = self._get(level)
         return {
             'level': level,
             'name': challenge.name,
-            'status': challenge.status,
+            'status': challenge.status.label,
             'progress': challenge.progress,
             'current_step': challenge.current_step,
-            'total_steps': len(challenge.steps),
+            'total_steps': challenge.total_steps,
             'last_error': challenge.last_error,
             'execution_time': challenge.execution_time
         }
     
     def run_challenge(self, level):
         """Execute a specific challenge"""
-        if level not in self.challenges:
-            raise ValueError(f"Challenge level {level} not found")
-        
-        challenge = self.challenges[level]
+        challenge = self._get(level)
         self.current_challenge = challenge
         
         try:
             self.logger.info(f"Starting challenge level {level}: {challenge.name}")
             self._log_challenge_event(level, "started", "Challenge execution started")
+            self._set_completed(level, False)
             
             # Check prerequisites
             if not self._check_prerequisites(level):
                 raise Exception("Prerequisites not met for this challenge")
+            challenge.prerequisite_results = {
+                prereq: self.challenges[prereq].result
+                for prereq in challenge.prerequisites
+                if prereq in self.challenges and self.challenges[prereq].result is not None
+            }
             
             # Execute the challenge
-            start_time = time.time()
+            start_time = time.monotonic()
             success = challenge.execute()
-            execution_time = time.time() - start_time
+            execution_time = time.monotonic() - start_time
             
             # Update challenge statistics
             challenge.execution_time = execution_time
@@ -105,12 +273,13 @@ class ChallengeManager:
             
             if success:
                 challenge.success_count += 1
-                challenge.status = "completed"
+                challenge.status = ChallengeStatus.COMPLETED
+                self._set_completed(level, True)
                 self._log_challenge_event(level, "completed", f"Challenge completed successfully in {execution_time:.2f}s")
                 self.logger.info(f"Challenge level {level} completed successfully")
             else:
                 challenge.failure_count += 1
-                challenge.status = "failed"
+                challenge.status = ChallengeStatus.FAILED
                 self._log_challenge_event(level, "failed", f"Challenge failed after {execution_time:.2f}s")
                 self.logger.error(f"Challenge level {level} failed")
             
@@ -118,26 +287,26 @@ class ChallengeManager:
             
         except Exception as e:
             challenge.failure_count += 1
-            challenge.status = "error"
+            challenge.status = ChallengeStatus.ERROR
             challenge.last_error = str(e)
             self._log_challenge_event(level, "error", str(e))
             self.logger.error(f"Challenge level {level} error: {e}")
             raise
         
         finally:
+            self._save_state(level, challenge)
             self.current_challenge = None
     
     def _check_prerequisites(self, level):
         """Check if prerequisites for a challenge are met"""
-        challenge = self.challenges[level]
+        challenge = self._get(level)
         
         for prereq_level in challenge.prerequisites:
-            if prereq_level not in self.challenges:
+            if prereq_level not in self._levels():
                 self.logger.error(f"Prerequisite level {prereq_level} not found")
                 return False
             
-            prereq_challenge = self.challenges[prereq_level]
-            if prereq_challenge.status != "completed":
+            if self._status(prereq_level) != ChallengeStatus.COMPLETED:
                 self.logger.error(f"Prerequisite level {prereq_level} not completed")
                 return False
         
@@ -145,43 +314,60 @@ class ChallengeManager:
     
     def _log_challenge_event(self, level, event_type, message):
         """Log a challenge event"""
-        log_entry = {
-            'timestamp': time.time(),
-            'level': level,
-            'event_type': event_type,
-            'message': message
-        }
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT INTO logs (timestamp, level, event_type, message) VALUES (?, ?, ?, ?)",
+                    (time.time(), level, event_type, message)
+                )
+                
+                self._logs_since_prune += 1
+                if self._logs_since_prune >= _PRUNE_EVERY:
+                    self._logs_since_prune = 0
+                    self._db.execute("DELETE FROM logs WHERE id <= (SELECT MAX(id) FROM logs) - ?",
+                                     (self.max_logs,))
+        except Exception as e:
+            self.logger.error(f"Failed to record challenge event: {e}")
+    
+    def get_recent_logs(self, limit=50, level=None):
+        """Get recent challenge logs, oldest first, optionally only those for one level"""
+        query = "SELECT timestamp, level, event_type, message FROM logs"
+        params = (limit,)
+        if level is not None:
+            query += " WHERE level = ?"
+            params = (level, limit)
         
-        self.challenge_logs.append(log_entry)
+        with self._db_lock:
+            rows = self._db.execute(query + " ORDER BY id DESC LIMIT ?", params).fetchall()
         
-        # Keep only last 1000 log entries
-        if len(self.challenge_logs) > 1000:
-            self.challenge_logs = self.challenge_logs[-1000:]
+        return [
+            {'timestamp': timestamp, 'level': log_level, 'event_type': event_type, 'message': message}
+            for timestamp, log_level, event_type, message in reversed(rows)
+        ]
     
-    def get_recent_logs(self, limit=50):
-        """Get recent challenge logs"""
-        return self.challenge_logs[-limit:]
+    @property
+    def challenge_logs(self):
+        """The retained event log (up to max_logs entries), oldest first"""
+        return self.get_recent_logs(self.max_logs)
     
     def reset_challenge(self, level):
         """Reset a challenge to initial state"""
-        if level not in self.challenges:
-            raise ValueError(f"Challenge level {level} not found")
-        
-        challenge = self.challenges[level]
+        challenge = self._get(level)
         challenge.reset()
+        self._set_completed(level, False)
+        self._save_state(level, challenge)
         
         self._log_challenge_event(level, "reset", "Challenge reset to initial state")
         self.logger.info(f"Challenge level {level} reset")
     
     def get_overall_progress(self):
         """Get overall progress across all challenges"""
-        total_challenges = len(self.challenges)
-        completed_challenges = sum(1 for c in self.challenges.values() if c.status == "completed")
+        total_challenges = len(self._sorted_levels)
+        completed_challenges = len(self._completed_levels)
         
         return {
             'total_challenges': total_challenges,
             'completed_challenges': completed_challenges,
             'completion_percentage': (completed_challenges / total_challenges * 100) if total_challenges > 0 else 0,
-            'current_level': max([level for level, challenge in self.challenges.items() 
-                                if challenge.status == "completed"], default=0) + 1
+            'current_level': self._max_completed_level + 1
         }
@@ -3,16 +3,22 @@ Main Challenge System Coordinator
 Orchestrates the execution of progressive automation challenges
 """
 
+import os
+import queue
 import threading
 import time
-import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
+from itertools import count, islice
+
+import psutil
 
 from challenge_manager import ChallengeManager
 from automation_engine import AutomationEngine
-from system_detector import SystemDetector
+from system_detector import get_default_detector
 from logger_config import setup_logger
 
 class ChallengeSystemState(Enum):
@@ -22,13 +28,43 @@ class ChallengeSystemState(Enum):
     STOPPING = "stopping"
     ERROR = "error"
 
-@dataclass
+# Allowed (from, to) state changes; anything else is rejected by _transition
+_VALID_TRANSITIONS = frozenset({
+    (ChallengeSystemState.IDLE, ChallengeSystemState.RUNNING),
+    (ChallengeSystemState.ERROR, ChallengeSystemState.RUNNING),
+    (ChallengeSystemState.RUNNING, ChallengeSystemState.PAUSED),
+    (ChallengeSystemState.PAUSED, ChallengeSystemState.RUNNING),
+    (ChallengeSystemState.RUNNING, ChallengeSystemState.STOPPING),
+    (ChallengeSystemState.PAUSED, ChallengeSystemState.STOPPING),
+    (ChallengeSystemState.ERROR, ChallengeSystemState.STOPPING),
+    (ChallengeSystemState.STOPPING, ChallengeSystemState.IDLE),
+    (ChallengeSystemState.RUNNING, ChallengeSystemState.IDLE),
+    (ChallengeSystemState.PAUSED, ChallengeSystemState.IDLE),
+    (ChallengeSystemState.RUNNING, ChallengeSystemState.ERROR),
+    (ChallengeSystemState.PAUSED, ChallengeSystemState.ERROR),
+})
+
+# States in which no challenge is executing, so a status snapshot stays valid until the next change
+_SETTLED_STATES = frozenset({ChallengeSystemState.IDLE, ChallengeSystemState.ERROR})
+
+@dataclass(frozen=True, slots=True)
 class SystemEvent:
     event_type: str
     timestamp: float
     data: Dict[str, Any]
     level: Optional[int] = None
 
+@dataclass(frozen=True, slots=True)
+class MetricsSnapshot:
+    """Immutable system metrics sample; shared by reference between status and events"""
+    timestamp: float
+    cpu_percent: float
+    memory_percent: float
+    memory_available_gb: float
+    disk_percent: float
+    disk_free_gb: float
+    process_count: int
+
 class ChallengeSystem:
     """
     Main coordinator for the progressive automation challenge system
@@ -41,93 +77,143 @@ class ChallengeSystem:
         # Core components
         self.challenge_manager = ChallengeManager()
         self.automation_engine = AutomationEngine()
-        self.system_detector = SystemDetector()
+        self.system_detector = get_default_detector()
         
-        # System state
+        # System state; changes go through _transition under the state lock
         self.state = ChallengeSystemState.IDLE
+        self._state_lock = threading.RLock()
         self.current_challenge_level = None
-        self.execution_thread = None
-        self.event_queue = queue.Queue()
-        self.system_metrics = {}
         
-        # Execution control
-        self.stop_requested = False
-        self.pause_requested = False
+        # Challenges run one at a time on a persistent worker; _current_future tracks the active run
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="challenge")
+        self._current_future = None
+        self._recent_events = deque(maxlen=1000)  # newest first
+        self._events_lock = threading.Lock()
+        self.system_metrics = {}  # latest MetricsSnapshot, replaced on each update; {} until the first sample
+        
+        # Platform details never change; installed software is rescanned at most every TTL
+        self._platform_cache = None
+        self._software_cache = None
+        self._software_cache_ts = 0.0
+        self.software_cache_ttl = 30.0
+        
+        # While settled, get_system_status returns the last result until a transition or event
+        # bumps the version; next() on itertools.count is atomic, so worker threads can bump it
+        self._status_versions = count()
+        self._status_version = next(self._status_versions)
+        self._status_memo = None  # (version, metrics, software, status)
+        
+        # CPU usage is sampled once a second in the background so metric reads never block;
+        # disk usage is refreshed at most every disk_cache_ttl seconds
+        self._shutdown_event = threading.Event()
+        psutil.cpu_percent(interval=None)  # prime: the first non-blocking call returns 0.0
+        self._cpu_sample = 0.0
+        self._cpu_sampler = threading.Thread(target=self._sample_cpu, name="cpu-sampler", daemon=True)
+        self._cpu_sampler.start()
+        self._disk_cache = None
+        self._disk_cache_ts = 0.0
+        self.disk_cache_ttl = 5.0
+        
+        # Execution control: the worker sleeps on these and wakes as soon as they change
+        self._stop_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
         
-        # Event listeners
-        self.event_listeners = []
+        # Challenges check the stop event while waiting so a stop takes effect mid-challenge
+        self.challenge_manager.stop_event = self._stop_event
+        
+        # Event listeners run on a dispatcher thread so slow callbacks don't stall challenges.
+        # Both lists are replaced rather than mutated, so the dispatcher can iterate them unlocked;
+        # listeners registered as safe promise not to raise, so they share one try block per event.
+        self.event_listeners = ()
+        self._safe_listeners = ()
+        self._listeners_lock = threading.Lock()
+        self._dispatch_queue = queue.SimpleQueue()
+        self._dispatcher = threading.Thread(target=self._dispatch_events, name="event-dispatcher", daemon=True)
+        self._dispatcher.start()
         
         self.logger.info("Challenge system initialized")
     
+    def _transition(self, new_state: ChallengeSystemState, expected=None) -> bool:
+        """Move to new_state if allowed from the current state (and it is one of expected, if given)"""
+        with self._state_lock:
+            if expected is not None and self.state not in expected:
+                return False
+            if (self.state, new_state) not in _VALID_TRANSITIONS:
+                return False
+            self.state = new_state
+            self._status_version = next(self._status_versions)
+            return True
+    
     def start_challenge_sequence(self, start_level: int = 1, end_level: int = 7) -> bool:
         """Start executing challenges sequentially from start_level to end_level"""
         try:
-            if self.state != ChallengeSystemState.IDLE:
-                self.logger.error(f"Cannot start challenges - system is {self.state.value}")
-                return False
-            
-            self.logger.info(f"Starting challenge sequence: levels {start_level} to {end_level}")
-            
-            # Reset state
-            self.stop_requested = False
-            self.pause_requested = False
-            
-            # Start execution thread
-            self.execution_thread = threading.Thread(
-                target=self._execute_challenge_sequence,
-                args=(start_level, end_level),
-                daemon=True
-            )
-            self.execution_thread.start()
+            with self._state_lock:
+                if not self._transition(ChallengeSystemState.RUNNING, expected=(ChallengeSystemState.IDLE,)):
+                    self.logger.error(f"Cannot start challenges - system is {self.state.value}")
+                    return False
+                
+                self.logger.info(f"Starting challenge sequence: levels {start_level} to {end_level}")
+                
+                # Reset state
+                self._stop_event.clear()
+                self._resume_event.set()
+                
+                # Run on the challenge worker
+                self._current_future = self._executor.submit(self._execute_challenge_sequence, start_level, end_level)
             
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to start challenge sequence: {e}")
+            self._transition(ChallengeSystemState.ERROR)
             return False
     
     def start_single_challenge(self, level: int) -> bool:
         """Start a single challenge"""
         try:
-            if self.state not in [ChallengeSystemState.IDLE, ChallengeSystemState.ERROR]:
-                self.logger.error(f"Cannot start challenge - system is {self.state.value}")
-                return False
-            
-            self.logger.info(f"Starting single challenge: level {level}")
-            
-            # Reset state
-            self.stop_requested = False
-            self.pause_requested = False
-            
-            # Start execution thread
-            self.execution_thread = threading.Thread(
-                target=self._execute_single_challenge,
-                args=(level,),
-                daemon=True
-            )
-            self.execution_thread.start()
+            with self._state_lock:
+                if not self._transition(ChallengeSystemState.RUNNING,
+                                        expected=(ChallengeSystemState.IDLE, ChallengeSystemState.ERROR)):
+                    self.logger.error(f"Cannot start challenge - system is {self.state.value}")
+                    return False
+                
+                self.logger.info(f"Starting single challenge: level {level}")
+                
+                # Reset state
+                self._stop_event.clear()
+                self._resume_event.set()
+                
+                # Run on the challenge worker
+                self._current_future = self._executor.submit(self._execute_single_challenge, level)
             
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to start challenge {level}: {e}")
+            self._transition(ChallengeSystemState.ERROR)
             return False
     
     def stop_execution(self) -> bool:
         """Stop current challenge execution"""
         try:
-            if self.state in [ChallengeSystemState.IDLE, ChallengeSystemState.STOPPING]:
-                return True
-            
-            self.logger.info("Stopping challenge execution")
-            self.stop_requested = True
-            self.state = ChallengeSystemState.STOPPING
+            with self._state_lock:
+                # Already idle or being stopped by another caller
+                if not self._transition(ChallengeSystemState.STOPPING):
+                    return True
+                
+                self.logger.info("Stopping challenge execution")
+                self._stop_event.set()
+                self._resume_event.set()  # wake a paused worker so it can see the stop
             
-            # Wait for execution thread to finish
-            if self.execution_thread and self.execution_thread.is_alive():
-                self.execution_thread.join(timeout=10)
+            # Wait for the current run to finish
+            if self._current_future is not None and not self._current_future.done():
+                try:
+                    self._current_future.result(timeout=10)
+                except FutureTimeoutError:
+                    self.logger.warning("Challenge did not stop within 10 seconds")
             
-            self.state = ChallengeSystemState.IDLE
+            self._transition(ChallengeSystemState.IDLE)
             self.current_challenge_level = None
             
             self._emit_event("execution_stopped", {"reason": "user_requested"})
@@ -141,12 +227,12 @@ class ChallengeSystem:
     def pause_execution(self) -> bool:
         """Pause current challenge execution"""
         try:
-            if self.state != ChallengeSystemState.RUNNING:
-                return False
-            
-            self.logger.info("Pausing challenge execution")
-            self.pause_requested = True
-            self.state = ChallengeSystemState.PAUSED
+            with self._state_lock:
+                if not self._transition(ChallengeSystemState.PAUSED):
+                    return False
+                
+                self.logger.info("Pausing challenge execution")
+                self._resume_event.clear()
             
             self._emit_event("execution_paused", {})
             
@@ -159,12 +245,12 @@ class ChallengeSystem:
     def resume_execution(self) -> bool:
         """Resume paused challenge execution"""
         try:
-            if self.state != ChallengeSystemState.PAUSED:
-                return False
-            
-            self.logger.info("Resuming challenge execution")
-            self.pause_requested = False
-            self.state = ChallengeSystemState.RUNNING
+            with self._state_lock:
+                if not self._transition(ChallengeSystemState.RUNNING, expected=(ChallengeSystemState.PAUSED,)):
+                    return False
+                
+                self.logger.info("Resuming challenge execution")
+                self._resume_event.set()
             
             self._emit_event("execution_resumed", {})
             
@@ -175,15 +261,22 @@ class ChallengeSystem:
             return False
     
     def get_system_status(self) -> Dict[str, Any]:
-        """Get comprehensive system status"""
+        """Get comprehensive system status; callers get their own copy of the memoized dict"""
         try:
+            version = self._status_version
+            memo = self._status_memo
+            if (memo is not None and memo[0] == version and self.state in _SETTLED_STATES
+                    and memo[1] is self.system_metrics and memo[2] is self._software_cache
+                    and time.monotonic() - self._software_cache_ts <= self.software_cache_ttl):
+                return dict(memo[3])
+            
             # Get challenge progress
             challenges = self.challenge_manager.get_all_challenges()
             overall_progress = self.challenge_manager.get_overall_progress()
             
             # Get system information
-            platform_info = self.system_detector.get_platform()
-            installed_software = self.system_detector.get_installed_software()
+            platform_info = self._get_platform_info()
+            installed_software = self._get_installed_software()
             
             # Current challenge status
             current_challenge_status = None
@@ -192,7 +285,7 @@ class ChallengeSystem:
                     self.current_challenge_level
                 )
             
-            return {
+            status = {
                 "state": self.state.value,
                 "current_challenge_level": self.current_challenge_level,
                 "current_challenge_status": current_challenge_status,
@@ -203,6 +296,8 @@ class ChallengeSystem:
                 "system_metrics": self.system_metrics,
                 "recent_events": self._get_recent_events(10)
             }
+            self._status_memo = (version, status["system_metrics"], installed_software, status)
+            return dict(status)
             
         except Exception as e:
             self.logger.error(f"Failed to get system status: {e}")
@@ -211,34 +306,64 @@ class ChallengeSystem:
                 "error": str(e)
             }
     
-    def add_event_listener(self, callback):
-        """Add an event listener for system events"""
-        self.event_listeners.append(callback)
+    def _get_platform_info(self) -> Dict[str, Any]:
+        """Platform details, detected once"""
+        if self._platform_cache is None:
+            self._platform_cache = self.system_detector.get_platform()
+        return self._platform_cache
+    
+    def _get_installed_software(self) -> Dict[str, Any]:
+        """Installed software, rescanned when older than software_cache_ttl"""
+        now = time.monotonic()
+        if self._software_cache is None or now - self._software_cache_ts > self.software_cache_ttl:
+            # A rescan must look again rather than read the detector's own memo
+            self.system_detector.clear_cache()
+            self._software_cache = self.system_detector.get_installed_software()
+            self._software_cache_ts = now
+        return self._software_cache
+    
+    def invalidate_software_cache(self):
+        """Force the next status call to rescan installed software"""
+        self._software_cache = None
+    
+    def add_event_listener(self, callback, safe=False):
+        """Add an event listener for system events; safe listeners must handle their own errors"""
+        with self._listeners_lock:
+            if safe:
+                self._safe_listeners = (*self._safe_listeners, callback)
+            else:
+                self.event_listeners = (*self.event_listeners, callback)
     
     def remove_event_listener(self, callback):
         """Remove an event listener"""
-        if callback in self.event_listeners:
-            self.event_listeners.remove(callback)
+        with self._listeners_lock:
+            self._safe_listeners = tuple(cb for cb in self._safe_listeners if cb != callback)
+            self.event_listeners = tuple(cb for cb in self.event_listeners if cb != callback)
+    
+    def _sandbox_listener(self, callback):
+        """Move a safe listener that raised to the guarded list"""
+        with self._listeners_lock:
+            if callback in self._safe_listeners:
+                self._safe_listeners = tuple(cb for cb in self._safe_listeners if cb != callback)
+                self.event_listeners = (*self.event_listeners, callback)
     
     def _execute_challenge_sequence(self, start_level: int, end_level: int):
         """Execute challenge sequence in background thread"""
         try:
-            self.state = ChallengeSystemState.RUNNING
             self._emit_event("sequence_started", {
                 "start_level": start_level,
                 "end_level": end_level
             })
             
             for level in range(start_level, end_level + 1):
-                if self.stop_requested:
+                if self._stop_event.is_set():
                     self.logger.info("Challenge sequence stopped by user")
                     break
                 
-                # Handle pause
-                while self.pause_requested and not self.stop_requested:
-                    time.sleep(1)
+                # Handle pause (stop_execution also sets the resume event)
+                self._resume_event.wait()
                 
-                if self.stop_requested:
+                if self._stop_event.is_set():
                     break
                 
                 # Execute challenge
@@ -246,36 +371,35 @@ class ChallengeSystem:
                 
                 if not success:
                     self.logger.error(f"Challenge {level} failed - stopping sequence")
-                    self.state = ChallengeSystemState.ERROR
+                    self._transition(ChallengeSystemState.ERROR)
                     self._emit_event("sequence_failed", {
                         "failed_level": level,
                         "reason": "challenge_failed"
                     })
                     return
                 
-                # Brief pause between challenges
-                if level < end_level:
-                    time.sleep(2)
+                # Brief pause between challenges, cut short by a stop request
+                if level < end_level and self._stop_event.wait(timeout=2):
+                    break
             
-            if not self.stop_requested:
+            if not self._stop_event.is_set():
                 self.logger.info("Challenge sequence completed successfully")
                 self._emit_event("sequence_completed", {
                     "start_level": start_level,
                     "end_level": end_level
                 })
             
-            self.state = ChallengeSystemState.IDLE
+            self._transition(ChallengeSystemState.IDLE)
             self.current_challenge_level = None
             
         except Exception as e:
             self.logger.error(f"Challenge sequence execution failed: {e}")
-            self.state = ChallengeSystemState.ERROR
+            self._transition(ChallengeSystemState.ERROR)
             self._emit_event("sequence_error", {"error": str(e)})
     
     def _execute_single_challenge(self, level: int):
         """Execute a single challenge in background thread"""
         try:
-            self.state = ChallengeSystemState.RUNNING
             self._emit_event("challenge_started", {"level": level})
             
             success = self._execute_challenge_with_monitoring(level)
@@ -285,16 +409,16 @@ class ChallengeSystem:
                 self._emit_event("challenge_completed", {"level": level})
             else:
                 self.logger.error(f"Challenge {level} failed")
-                self.state = ChallengeSystemState.ERROR
+                self._transition(ChallengeSystemState.ERROR)
                 self._emit_event("challenge_failed", {"level": level})
                 return
             
-            self.state = ChallengeSystemState.IDLE
+            self._transition(ChallengeSystemState.IDLE)
             self.current_challenge_level = None
             
         except Exception as e:
             self.logger.error(f"Single challenge execution failed: {e}")
-            self.state = ChallengeSystemState.ERROR
+            self._transition(ChallengeSystemState.ERROR)
             self._emit_event("challenge_error", {"level": level, "error": str(e)})
     
     def _execute_challenge_with_monitoring(self, level: int) -> bool:
@@ -302,16 +426,15 @@ class ChallengeSystem:
         try:
             self.current_challenge_level = level
             
-            # Pre-execution monitoring
-            self._update_system_metrics()
-            
             # Execute challenge
-            start_time = time.time()
+            start_time = time.perf_counter()
             success = self.challenge_manager.run_challenge(level)
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             
-            # Post-execution monitoring
+            # Post-execution monitoring only: the previous sample is this run's baseline.
+            # The challenge may have installed software
             self._update_system_metrics()
+            self.invalidate_software_cache()
             
             # Log execution metrics
             self.logger.info(f"Challenge {level} execution time: {execution_time:.2f}s")
@@ -320,7 +443,7 @@ class ChallengeSystem:
                 "level": level,
                 "execution_time": execution_time,
                 "success": success,
-                "system_metrics": self.system_metrics.copy()
+                "system_metrics": self.system_metrics
             })
             
             return success
@@ -332,33 +455,55 @@ class ChallengeSystem:
     def _update_system_metrics(self):
         """Update system performance metrics"""
         try:
-            import psutil
-            
             # CPU and memory usage
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = self._cpu_sample
             memory = psutil.virtual_memory()
             
             # Disk usage
-            disk = psutil.disk_usage('/')
+            now = time.monotonic()
+            if self._disk_cache is None or now - self._disk_cache_ts > self.disk_cache_ttl:
+                self._disk_cache = psutil.disk_usage('/')
+                self._disk_cache_ts = now
+            disk = self._disk_cache
             
             # Process information
-            processes = len(psutil.pids())
-            
-            self.system_metrics.update({
-                "timestamp": time.time(),
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory.percent,
-                "memory_available_gb": memory.available / (1024**3),
-                "disk_percent": (disk.used / disk.total) * 100,
-                "disk_free_gb": disk.free / (1024**3),
-                "process_count": processes
-            })
+            processes = self._count_processes()
+            
+            self.system_metrics = MetricsSnapshot(
+                timestamp=time.time(),
+                cpu_percent=cpu_percent,
+                memory_percent=memory.percent,
+                memory_available_gb=memory.available / (1024**3),
+                disk_percent=(disk.used / disk.total) * 100,
+                disk_free_gb=disk.free / (1024**3),
+                process_count=processes
+            )
             
         except Exception as e:
             self.logger.debug(f"Failed to update system metrics: {e}")
     
+    @staticmethod
+    def _count_processes() -> int:
+        """Number of running processes, from a single /proc listing where available"""
+        try:
+            with os.scandir('/proc') as entries:
+                return sum(1 for entry in entries if entry.name.isdigit())
+        except OSError:
+            return len(psutil.pids())
+    
+    def _sample_cpu(self):
+        """Record CPU usage over each one-second interval until shutdown"""
+        while not self._shutdown_event.wait(1):
+            try:
+                self._cpu_sample = psutil.cpu_percent(interval=None)
+            except Exception as e:
+                self.logger.debug(f"Failed to sample CPU usage: {e}")
+    
     def _emit_event(self, event_type: str, data: Dict[str, Any]):
         """Emit a system event to all listeners"""
+        self._status_version = next(self._status_versions)
+        has_listeners = bool(self._safe_listeners or self.event_listeners)
+        
         try:
             event = SystemEvent(
                 event_type=event_type,
@@ -367,58 +512,52 @@ class ChallengeSystem:
                 level=self.current_challenge_level
             )
             
-            # Add to event queue
-            self.event_queue.put(event)
+            # Add to recent events
+            with self._events_lock:
+                self._recent_events.appendleft(event)
             
-            # Notify listeners
-            for listener in self.event_listeners:
-                try:
-                    listener(event)
-                except Exception as e:
-                    self.logger.error(f"Event listener failed: {e}")
+            # Listeners are notified by the dispatcher thread
+            if has_listeners:
+                self._dispatch_queue.put_nowait(event)
             
         except Exception as e:
             self.logger.error(f"Failed to emit event: {e}")
     
-    def _get_recent_events(self, count: int) -> List[Dict[str, Any]]:
-        """Get recent events from the queue"""
-        events = []
-        temp_events = []
-        
-        # Get events from queue
-        while not self.event_queue.empty() and len(events) < count:
-            try:
-                event = self.event_queue.get_nowait()
-                events.append({
-                    "event_type": event.event_type,
-                    "timestamp": event.timestamp,
-                    "data": event.data,
-                    "level": event.level
-                })
-                temp_events.append(event)
-            except queue.Empty:
+    def _dispatch_events(self):
+        """Deliver queued events to listeners until a None sentinel arrives"""
+        while True:
+            event = self._dispatch_queue.get()
+            if event is None:
                 break
-        
-        # Put events back in queue (keep recent events)
-        for event in temp_events:
+            
+            safe_listeners, guarded_listeners = self._safe_listeners, self.event_listeners
             try:
-                self.event_queue.put_nowait(event)
-            except queue.Full:
-                break
-        
-        # Return most recent events first
-        return list(reversed(events))
+                for listener in safe_listeners:
+                    listener(event)
+            except Exception as e:
+                self.logger.error(f"Safe event listener failed, guarding it from now on: {e}")
+                self._sandbox_listener(listener)
+                self._notify_guarded(safe_listeners[safe_listeners.index(listener) + 1:], event)
+            
+            self._notify_guarded(guarded_listeners, event)
+    
+    def _notify_guarded(self, listeners, event):
+        """Call each listener, logging rather than propagating its errors"""
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                self.logger.error(f"Event listener failed: {e}")
+    
+    def _get_recent_events(self, count: int) -> List[SystemEvent]:
+        """Get the most recent events, newest first; the JSON provider serializes the dataclasses"""
+        with self._events_lock:
+            return list(islice(self._recent_events, count))
     
     def get_challenge_logs(self, level: Optional[int] = None, count: int = 50) -> List[Dict[str, Any]]:
         """Get logs for a specific challenge or all challenges"""
         try:
-            if level is not None:
-                # Get logs for specific challenge
-                return self.challenge_manager.get_recent_logs(count)
-            else:
-                # Get all recent logs
-                return self.challenge_manager.get_recent_logs(count)
-                
+            return self.challenge_manager.get_recent_logs(count, level=level)
         except Exception as e:
             self.logger.error(f"Failed to get challenge logs: {e}")
             return []
@@ -447,15 +586,24 @@ class ChallengeSystem:
             # Stop any running execution
             self.stop_execution()
             
+            # Release the challenge worker, dropping anything still queued
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            
+            # Stop the CPU sampler
+            self._shutdown_event.set()
+            
+            # Deliver events already emitted, then stop the dispatcher
+            self._dispatch_queue.put(None)
+            self._dispatcher.join(timeout=5)
+            
             # Clear event listeners
-            self.event_listeners.clear()
+            with self._listeners_lock:
+                self.event_listeners = ()
+                self._safe_listeners = ()
             
-            # Clear event queue
-            while not self.event_queue.empty():
-                try:
-                    self.event_queue.get_nowait()
-                except queue.Empty:
-                    break
+            # Clear recent events
+            with self._events_lock:
+                self._recent_events.clear()
             
             self.logger.info("Challenge system shutdown complete")
             
@@ -2,11 +2,46 @@
 Base challenge class that all automation challenges inherit from
 """
 
+import threading
 import time
 import traceback
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+import config
 from logger_config import setup_logger
 
+# ImageGrab is imported once at load; it can be missing on headless or minimal Pillow builds
+try:
+    from PIL import ImageGrab
+    IMAGEGRAB_AVAILABLE = True
+except ImportError:
+    IMAGEGRAB_AVAILABLE = False
+
+# Error screenshots are encoded and written here so a failing step isn't held up by PNG compression
+_SCREENSHOT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+
+class ChallengeStatus(IntEnum):
+    NOT_STARTED = 0
+    RUNNING = 1
+    COMPLETED = 2
+    FAILED = 3
+    ERROR = 4
+    
+    @property
+    def label(self):
+        """String form used in status dictionaries and the database"""
+        return _STATUS_STR[self]
+    
+    @classmethod
+    def from_label(cls, label):
+        """Status for a stored label, defaulting to NOT_STARTED"""
+        return _STATUS_BY_STR.get(label, cls.NOT_STARTED)
+
+# Precomputed so status polls don't build strings
+_STATUS_STR = {status: status.name.lower() for status in ChallengeStatus}
+_STATUS_BY_STR = {label: status for status, label in _STATUS_STR.items()}
+
 class BaseChallenge(ABC):
     def __init__(self, level, name, description):
         self.level = level
@@ -15,10 +50,13 @@ class BaseChallenge(ABC):
         self.logger = setup_logger(f"Challenge{level}")
         
         # Challenge state
-        self.status = "not_started"  # not_started, running, completed, failed, error
+        self.status = ChallengeStatus.NOT_STARTED
         self.progress = 0.0  # 0.0 to 1.0
         self.current_step = 0
-        self.steps = []
+        
+        # Step lists are static, so they are built once rather than on every run
+        self.steps = self.get_steps()
+        self.total_steps = len(self.steps)
         
         # Statistics
         self.success_count = 0
@@ -30,6 +68,14 @@ class BaseChallenge(ABC):
         # Prerequisites (other challenge levels that must be completed first)
         self.prerequisites = []
         
+        # Data a successful run hands to later challenges, and the results of this one's prerequisites
+        # (level -> result), filled in by the challenge manager before each run
+        self.result = None
+        self.prerequisite_results = {}
+        
+        # Set by the challenge system to request an early stop
+        self.stop_event = None
+        
         self.logger.info(f"Initialized challenge: {self.name}")
     
     @abstractmethod
@@ -45,62 +91,60 @@ class BaseChallenge(ABC):
     def execute(self):
         """Execute the complete challenge"""
         try:
-            self.status = "running"
+            self.status = ChallengeStatus.RUNNING
             self.progress = 0.0
             self.current_step = 0
             self.last_error = None
             
-            self.steps = self.get_steps()
-            total_steps = len(self.steps)
+            total_steps = self.total_steps
             
             self.logger.info(f"Starting challenge '{self.name}' with {total_steps} steps")
             
             # Execute pre-challenge setup
             if not self.pre_challenge_setup():
-                raise Exception("Pre-challenge setup failed")
+                return self._fail("Pre-challenge setup failed")
             
             # Execute each step
-            for step_num in range(total_steps):
-                self.current_step = step_num + 1
-                step_description = self.steps[step_num]
+            for step_num, step_description in enumerate(self.steps):
+                if self.stop_event is not None and self.stop_event.is_set():
+                    return self._fail("Challenge stopped by user")
                 
+                self.current_step = step_num + 1
                 self.logger.info(f"Executing step {self.current_step}/{total_steps}: {step_description}")
                 
-                try:
-                    success = self.execute_step(step_num)
-                    if not success:
-                        raise Exception(f"Step {self.current_step} failed: {step_description}")
-                    
-                    # Update progress
-                    self.progress = self.current_step / total_steps
-                    self.logger.info(f"Step {self.current_step} completed successfully")
-                    
-                except Exception as e:
-                    self.logger.error(f"Step {self.current_step} failed: {e}")
-                    raise
+                if not self.execute_step(step_num):
+                    return self._fail(f"Step {self.current_step} failed: {step_description}")
+                
+                # Update progress
+                self.progress = self.current_step / total_steps
+                self.logger.info(f"Step {self.current_step} completed successfully")
             
             # Execute post-challenge cleanup
             self.post_challenge_cleanup()
             
-            self.status = "completed"
+            self.status = ChallengeStatus.COMPLETED
             self.progress = 1.0
             self.logger.info(f"Challenge '{self.name}' completed successfully")
             
             return True
             
         except Exception as e:
-            self.status = "failed"
-            self.last_error = str(e)
-            self.logger.error(f"Challenge '{self.name}' failed: {e}")
             self.logger.debug(f"Challenge error traceback: {traceback.format_exc()}")
-            
-            # Try to cleanup even if challenge failed
-            try:
-                self.post_challenge_cleanup()
-            except Exception as cleanup_error:
-                self.logger.error(f"Cleanup failed: {cleanup_error}")
-            
-            return False
+            return self._fail(str(e))
+    
+    def _fail(self, error):
+        """Mark the challenge failed, run cleanup and return False"""
+        self.status = ChallengeStatus.FAILED
+        self.last_error = error
+        self.logger.error(f"Challenge '{self.name}' failed: {error}")
+        
+        # Try to cleanup even if challenge failed
+        try:
+            self.post_challenge_cleanup()
+        except Exception as cleanup_error:
+            self.logger.error(f"Cleanup failed: {cleanup_error}")
+        
+        return False
     
     def pre_challenge_setup(self):
         """Setup required before challenge execution"""
@@ -120,7 +164,7 @@ class BaseChallenge(ABC):
     
     def reset(self):
         """Reset challenge to initial state"""
-        self.status = "not_started"
+        self.status = ChallengeStatus.NOT_STARTED
         self.progress = 0.0
         self.current_step = 0
         self.last_error = None
@@ -133,34 +177,66 @@ class BaseChallenge(ABC):
     
     def take_error_screenshot(self, description="error"):
         """Take a screenshot for debugging purposes"""
+        if not IMAGEGRAB_AVAILABLE:
+            self.logger.error("Failed to take error screenshot: PIL.ImageGrab is not available")
+            return None
+        
         try:
-            from PIL import ImageGrab
-            from pathlib import Path
-            import config
-            
             timestamp = int(time.time())
             filename = f"challenge_{self.level}_{description}_{timestamp}.png"
             filepath = config.ERROR_SCREENSHOT_DIR / filename
             
+            # Capture now, while the screen still shows the error; the file appears shortly after
             screenshot = ImageGrab.grab()
-            screenshot.save(filepath)
+            _SCREENSHOT_EXECUTOR.submit(self._save_screenshot, screenshot, filepath)
             
-            self.logger.info(f"Error screenshot saved: {filepath}")
             return str(filepath)
             
         except Exception as e:
             self.logger.error(f"Failed to take error screenshot: {e}")
             return None
     
-    def wait_with_progress(self, seconds, description="Waiting"):
-        """Wait with progress updates"""
+    def _save_screenshot(self, screenshot, filepath):
+        """Write an error screenshot with fast, light PNG compression"""
+        try:
+            screenshot.save(filepath, compress_level=1)
+            self.logger.info(f"Error screenshot saved: {filepath}")
+        except Exception as e:
+            self.logger.error(f"Failed to save error screenshot {filepath}: {e}")
+    
+    def wait_with_progress(self, seconds, description="Waiting", stop_event=None):
+        """Wait with progress updates; returns False if a stop was requested during the wait"""
         self.logger.info(f"{description} for {seconds} seconds...")
+        stop_event = stop_event or self.stop_event or threading.Event()
         
-        for i in range(seconds):
-            time.sleep(1)
-            if i % 5 == 0:  # Log every 5 seconds
-                remaining = seconds - i - 1
-                self.logger.debug(f"{description}: {remaining} seconds remaining")
+        # Wake every 5 seconds to log progress; a stop wakes the wait immediately
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            if stop_event.wait(timeout=min(remaining, 5)):
+                self.logger.info(f"{description}: stop requested")
+                return False
+            self.logger.debug(f"{description}: {max(0, int(deadline - time.monotonic()))} seconds remaining")
+    
+    def poll_until(self, predicate, max_wait=15, initial=0.05, max_interval=1.0,
+                   description="Waiting", stop_event=None):
+        """Call predicate with doubling delays until it returns True; False on timeout or stop"""
+        stop_event = stop_event or self.stop_event or threading.Event()
+        deadline = time.monotonic() + max_wait
+        delay = initial
+        while True:
+            if predicate():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.info(f"{description}: gave up after {max_wait} seconds")
+                return False
+            if stop_event.wait(timeout=min(delay, remaining)):
+                self.logger.info(f"{description}: stop requested")
+                return False
+            delay = min(delay * 2, max_interval)
     
     def verify_success_condition(self):
         """Verify that the challenge was completed successfully"""
@@ -173,10 +249,10 @@ class BaseChallenge(ABC):
             'level': self.level,
             'name': self.name,
             'description': self.description,
-            'status': self.status,
+            'status': _STATUS_STR[self.status],
             'progress': self.progress,
             'current_step': self.current_step,
-            'total_steps': len(self.steps),
+            'total_steps': self.total_steps,
             'success_count': self.success_count,
             'failure_count': self.failure_count,
             'last_run': self.last_run,
@@ -3,8 +3,38 @@ Level 1 Challenge: System Detection
 Check if applications are installed by searching system paths and registries
 """
 
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+import psutil
 from challenges.base_challenge import BaseChallenge
-from system_detector import SystemDetector
+from config import config
+from system_detector import get_default_detector
+
+# A saved detection report is reused until it is this old or the machine reboots
+REPORT_MAX_AGE = 24 * 3600
+
+def detection_report_path():
+    """Where the last detection report is cached between runs"""
+    return config.config_dir / "detection_report.json"
+
+def invalidate_detection_report():
+    """Drop the cached report, e.g. after software was installed"""
+    try:
+        detection_report_path().unlink()
+    except FileNotFoundError:
+        pass
+
+def _list_entries(directory):
+    """Normalized names in directory, or None if it can't be listed"""
+    try:
+        with os.scandir(directory) as entries:
+            return {os.path.normcase(entry.name) for entry in entries}
+    except OSError:
+        return None
 
 class Level1SystemDetection(BaseChallenge):
     def __init__(self):
@@ -14,7 +44,7 @@ class Level1SystemDetection(BaseChallenge):
             description="Detect if KiCad and other essential software are installed on the system"
         )
         
-        self.detector = SystemDetector()
+        self.detector = get_default_detector()
         self.required_software = [
             ('KiCad', 'kicad'),
             ('Git', 'git'),
@@ -23,6 +53,24 @@ class Level1SystemDetection(BaseChallenge):
         
         # No prerequisites for level 1
         self.prerequisites = []
+        
+        # Set by step 0 when a fresh cached report makes the remaining steps unnecessary
+        self.report_from_cache = False
+        self.software_index = {}
+        
+        # Detection results; None until the corresponding step has run
+        self.kicad_installed = None
+        self.detection_report = None
+        
+        # One method per entry in get_steps()
+        self._step_methods = (
+            self._start_detection,
+            self._get_platform_info,
+            self._check_system_paths,
+            self._detect_installed_software,
+            self._verify_kicad_installation,
+            self._generate_detection_report
+        )
     
     def get_steps(self):
         """Return list of steps for system detection challenge"""
@@ -38,26 +86,75 @@ class Level1SystemDetection(BaseChallenge):
     def execute_step(self, step_number):
         """Execute a specific step of the system detection challenge"""
         try:
-            if step_number == 0:
-                return self._initialize_detector()
-            elif step_number == 1:
-                return self._get_platform_info()
-            elif step_number == 2:
-                return self._check_system_paths()
-            elif step_number == 3:
-                return self._detect_installed_software()
-            elif step_number == 4:
-                return self._verify_kicad_installation()
-            elif step_number == 5:
-                return self._generate_detection_report()
-            else:
-                self.logger.error(f"Unknown step number: {step_number}")
-                return False
+            if step_number > 0 and self.report_from_cache:
+                return True
+            if 0 <= step_number < len(self._step_methods):
+                return self._step_methods[step_number]()
+            
+            self.logger.error(f"Unknown step number: {step_number}")
+            return False
                 
         except Exception as e:
             self.logger.error(f"Step {step_number} failed: {e}")
             return False
     
+    def _start_detection(self):
+        """Use a fresh cached report if there is one, otherwise initialize the detector"""
+        self.report_from_cache = self._load_cached_report()
+        return self.report_from_cache or self._initialize_detector()
+    
+    def _load_cached_report(self):
+        """Restore results from a report saved since the last boot, if it is fresh and for this platform"""
+        try:
+            with open(detection_report_path(), encoding='utf-8') as f:
+                report = json.load(f)
+            
+            if abs(report.get('_boot_time', 0) - psutil.boot_time()) > 1:
+                return False
+            if time.time() - report.get('_cached_at', 0) > REPORT_MAX_AGE:
+                return False
+            if report.get('platform') != self.detector.get_platform():
+                return False
+            
+            # KiCad may have been installed or removed by hand since the report was saved;
+            # if so the whole report is out of date and detection runs again
+            kicad_installed, _ = self.detector.is_software_installed('KiCad', 'kicad')
+            if kicad_installed != report['kicad_status']['installed']:
+                self.logger.info("KiCad installation changed since the cached detection report - detecting again")
+                return False
+            
+            self.platform_info = report['platform']
+            self.system_paths = report['system_paths']
+            self.installed_software = report['installed_software']
+            self.software_index = {software['name'].lower(): software for software in self.installed_software}
+            self.kicad_installed = report['kicad_status']['installed']
+            self.kicad_details = report['kicad_status']['details']
+            
+            # Whether KiCad is running changes too often to cache
+            self.kicad_running = self.detector.is_process_running('kicad')
+            report['kicad_status']['running'] = self.kicad_running
+            self.detection_report = self.result = MappingProxyType(report)
+            
+            self.logger.info(f"Using cached detection report from {detection_report_path()}")
+            return True
+            
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable detection report cache: {e}")
+            return False
+    
+    def _save_report(self, report):
+        """Cache the report on disk for later runs"""
+        try:
+            path = detection_report_path()
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({**report, '_boot_time': psutil.boot_time(), '_cached_at': time.time()}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.warning(f"Failed to cache detection report: {e}")
+    
     def _initialize_detector(self):
         """Initialize system detector"""
         try:
@@ -80,10 +177,12 @@ class Level1SystemDetection(BaseChallenge):
             
             platform_info = self.detector.get_platform()
             
-            self.logger.info(f"System: {platform_info['system']}")
-            self.logger.info(f"Release: {platform_info['release']}")
-            self.logger.info(f"Version: {platform_info['version']}")
-            self.logger.info(f"Machine: {platform_info['machine']}")
+            # One multi-line record rather than four; formatting is skipped if INFO is filtered out
+            self.logger.info(
+                "Platform information:\n  System: %s\n  Release: %s\n  Version: %s\n  Machine: %s",
+                platform_info['system'], platform_info['release'],
+                platform_info['version'], platform_info['machine']
+            )
             
             # Store platform info for later use
             self.platform_info = platform_info
@@ -102,18 +201,20 @@ class Level1SystemDetection(BaseChallenge):
             system_paths = self.detector.get_system_paths()
             
             important_paths = ['home', 'temp', 'desktop', 'programs', 'downloads']
+            existing = self._existing_paths(
+                system_paths[name] for name in important_paths if system_paths.get(name)
+            )
             
             for path_name in important_paths:
                 if path_name in system_paths:
                     path_value = system_paths[path_name]
                     if path_value:
-                        import os
-                        exists = os.path.exists(path_value)
-                        self.logger.info(f"{path_name.capitalize()} path: {path_value} (exists: {exists})")
+                        exists = path_value in existing
+                        self.logger.info("%s path: %s (exists: %s)", path_name.capitalize(), path_value, exists)
                     else:
-                        self.logger.warning(f"{path_name.capitalize()} path not defined")
+                        self.logger.warning("%s path not defined", path_name.capitalize())
                 else:
-                    self.logger.warning(f"{path_name.capitalize()} path not available on this platform")
+                    self.logger.warning("%s path not available on this platform", path_name.capitalize())
             
             # Store paths for later use
             self.system_paths = system_paths
@@ -124,6 +225,30 @@ class Level1SystemDetection(BaseChallenge):
             self.logger.error(f"Failed to check system paths: {e}")
             return False
     
+    @staticmethod
+    def _existing_paths(paths):
+        """Subset of paths that exist, listing each parent directory once instead of a stat per path"""
+        by_parent = defaultdict(list)
+        existing = set()
+        for path in paths:
+            parent, name = os.path.split(os.path.normpath(path))
+            if name:
+                by_parent[parent].append(path)
+            elif os.path.exists(path):  # a filesystem root has no parent to list
+                existing.add(path)
+        
+        # Parents are listed concurrently, so a slow (e.g. network-mounted) directory doesn't serialize the rest
+        parents = list(by_parent)
+        with ThreadPoolExecutor(max_workers=max(1, len(parents)), thread_name_prefix="path-check") as executor:
+            listings = executor.map(_list_entries, parents)
+            for parent, present in zip(parents, listings):
+                if present is None:
+                    continue
+                for path in by_parent[parent]:
+                    if os.path.normcase(os.path.basename(os.path.normpath(path))) in present:
+                        existing.add(path)
+        return existing
+    
     def _detect_installed_software(self):
         """Detect commonly installed software"""
         try:
@@ -134,10 +259,11 @@ class Level1SystemDetection(BaseChallenge):
             self.logger.info(f"Found {len(installed_software)} installed applications:")
             
             for software in installed_software:
-                self.logger.info(f"  - {software['name']}: {software['details']}")
+                self.logger.info("  - %s: %s", software['name'], software['details'])
             
-            # Store detected software for later use
+            # Store detected software for later use, indexed by lowercase name
             self.installed_software = installed_software
+            self.software_index = {software['name'].lower(): software for software in installed_software}
             
             return True
             
@@ -150,7 +276,12 @@ class Level1SystemDetection(BaseChallenge):
         try:
             self.logger.info("Verifying KiCad installation...")
             
-            is_installed, details = self.detector.is_software_installed('KiCad', 'kicad')
+            # The software scan already covered KiCad when it found it; otherwise check directly
+            kicad = self.software_index.get('kicad')
+            if kicad is not None:
+                is_installed, details = True, kicad['details']
+            else:
+                is_installed, details = self.detector.is_software_installed('KiCad', 'kicad')
             
             if is_installed:
                 self.logger.info(f"✓ KiCad is installed: {details}")
@@ -189,14 +320,18 @@ class Level1SystemDetection(BaseChallenge):
                 'challenge_result': 'SUCCESS' if self.kicad_installed else 'NEEDS_INSTALLATION'
             }
             
-            # Store report for other challenges to use
-            self.detection_report = report
+            # Store report for other challenges to use, and for later runs. Later challenges get a
+            # read-only view over the same objects, so nothing needs to be copied to share it
+            self.detection_report = self.result = MappingProxyType(report)
+            self._save_report(report)
             
-            self.logger.info("=== SYSTEM DETECTION REPORT ===")
-            self.logger.info(f"Platform: {report['platform']['system']} {report['platform']['release']}")
-            self.logger.info(f"Total software detected: {len(report['installed_software'])}")
-            self.logger.info(f"KiCad installed: {report['kicad_status']['installed']}")
-            self.logger.info(f"Challenge result: {report['challenge_result']}")
+            self.logger.info(
+                "=== SYSTEM DETECTION REPORT ===\n  Platform: %s %s\n  Total software detected: %d\n"
+                "  KiCad installed: %s\n  Challenge result: %s",
+                report['platform']['system'], report['platform']['release'],
+                len(report['installed_software']), report['kicad_status']['installed'],
+                report['challenge_result']
+            )
             
             if not self.kicad_installed:
                 self.logger.warning("KiCad not found - Level 2 (Software Installation) will be required")
@@ -214,7 +349,7 @@ class Level1SystemDetection(BaseChallenge):
         try:
             # Success condition: We successfully detected the system state
             # Whether KiCad is installed or not, the detection itself should succeed
-            return hasattr(self, 'detection_report') and self.detection_report is not None
+            return self.detection_report is not None
             
         except Exception as e:
             self.logger.error(f"Failed to verify success condition: {e}")
@@ -226,7 +361,7 @@ class Level1SystemDetection(BaseChallenge):
             self.logger.info("System detection completed - no cleanup required")
             
             # Log summary for next challenges
-            if hasattr(self, 'kicad_installed'):
+            if self.kicad_installed is not None:
                 if self.kicad_installed:
                     self.logger.info("Next recommended challenge: Level 3 (Application Launch)")
                 else:
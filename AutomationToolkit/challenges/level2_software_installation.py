@@ -3,10 +3,29 @@ Level 2 Challenge: Software Installation
 Automatically download and install applications when not found
 """
 
+import shutil
+import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import config
 from challenges.base_challenge import BaseChallenge
-from system_detector import SystemDetector
+from challenges.level1_system_detection import invalidate_detection_report
+from system_detector import extract_version, get_default_detector
 from software_installer import SoftwareInstaller
+from utils import check_internet_connectivity
+
+@lru_cache(maxsize=8)
+def _cached_disk_usage(path):
+    """Disk usage for path, read once until an installation clears the cache"""
+    return shutil.disk_usage(path)
+
+# Privileges an installer typically needs, keyed by lowercased platform.system()
+_PRIVILEGE_NOTES = {
+    'windows': "Windows platform detected - may require administrator privileges",
+    'linux': "Linux platform detected - may require sudo privileges",
+    'darwin': "macOS platform detected - may require administrator privileges",
+}
 
 class Level2SoftwareInstallation(BaseChallenge):
     def __init__(self):
@@ -16,11 +35,34 @@ class Level2SoftwareInstallation(BaseChallenge):
             description="Automatically install KiCad if it's not already present on the system"
         )
         
-        self.detector = SystemDetector()
+        self.detector = get_default_detector()
         self.installer = SoftwareInstaller()
         
         # Prerequisites: Level 1 must be completed
         self.prerequisites = [1]
+        
+        # Set by the status check; when KiCad is already present only the final verification runs
+        self.kicad_already_installed = False
+        
+        # Post-install detection results; None until the verification step has run
+        self.final_kicad_status = None
+        self.final_kicad_details = None
+        
+        # Absolute path of the kicad executable, resolved from PATH once KiCad is verified
+        self.kicad_exe = None
+        
+        # Lowercased platform name, set once system detection has been verified
+        self._sysname = ''
+        
+        # One method per entry in get_steps()
+        self._step_methods = (
+            self._verify_system_detection,
+            self._check_kicad_status,
+            self._prepare_installation,
+            self._install_kicad,
+            self._verify_installation,
+            self._test_kicad_functionality
+        )
     
     def get_steps(self):
         """Return list of steps for software installation challenge"""
@@ -36,21 +78,15 @@ class Level2SoftwareInstallation(BaseChallenge):
     def execute_step(self, step_number):
         """Execute a specific step of the software installation challenge"""
         try:
-            if step_number == 0:
-                return self._verify_system_detection()
-            elif step_number == 1:
-                return self._check_kicad_status()
-            elif step_number == 2:
-                return self._prepare_installation()
-            elif step_number == 3:
-                return self._install_kicad()
-            elif step_number == 4:
-                return self._verify_installation()
-            elif step_number == 5:
-                return self._test_kicad_functionality()
-            else:
-                self.logger.error(f"Unknown step number: {step_number}")
-                return False
+            if self.kicad_already_installed and step_number in (2, 3, 5):
+                self.logger.info(f"KiCad already installed - skipping step: {self.steps[step_number]}")
+                return True
+            
+            if 0 <= step_number < len(self._step_methods):
+                return self._step_methods[step_number]()
+            
+            self.logger.error(f"Unknown step number: {step_number}")
+            return False
                 
         except Exception as e:
             self.logger.error(f"Step {step_number} failed: {e}")
@@ -67,12 +103,10 @@ class Level2SoftwareInstallation(BaseChallenge):
             self.logger.info(f"Platform confirmed: {platform_info['system']} {platform_info['release']}")
             
             # Check if we have necessary permissions for installation
-            if platform_info['system'].lower() == 'windows':
-                self.logger.info("Windows platform detected - may require administrator privileges")
-            elif platform_info['system'].lower() == 'linux':
-                self.logger.info("Linux platform detected - may require sudo privileges")
-            elif platform_info['system'].lower() == 'darwin':
-                self.logger.info("macOS platform detected - may require administrator privileges")
+            self._sysname = platform_info['system'].lower()
+            note = _PRIVILEGE_NOTES.get(self._sysname)
+            if note:
+                self.logger.info(note)
             
             self.platform_info = platform_info
             return True
@@ -86,7 +120,13 @@ class Level2SoftwareInstallation(BaseChallenge):
         try:
             self.logger.info("Checking current KiCad installation status...")
             
-            is_installed, details = self.detector.is_software_installed('KiCad', 'kicad')
+            # Level 1's report is reused when it already found KiCad; otherwise check again
+            report = self.prerequisite_results.get(1)
+            if report and report['kicad_status']['installed']:
+                is_installed, details = True, report['kicad_status']['details']
+                self.logger.info("Using KiCad status from the Level 1 detection report")
+            else:
+                is_installed, details = self.detector.is_software_installed('KiCad', 'kicad')
             
             self.logger.info(f"KiCad installation status: {is_installed}")
             self.logger.info(f"Details: {details}")
@@ -112,32 +152,32 @@ class Level2SoftwareInstallation(BaseChallenge):
         try:
             self.logger.info("Preparing installation environment...")
             
-            import config
-            
-            # Ensure necessary directories exist
-            config.ensure_directories()
-            
-            # Check available disk space
-            import shutil
-            free_space = shutil.disk_usage(config.TEMP_DIR).free
-            free_space_gb = free_space / (1024**3)
-            
-            self.logger.info(f"Available disk space: {free_space_gb:.2f} GB")
-            
-            if free_space_gb < 2.0:  # KiCad typically needs ~1GB
-                self.logger.warning("Low disk space - installation might fail")
-                return False
+            # Check internet connectivity (basic test: a TCP connect to a public DNS server)
+            # in the background while the directory and disk checks run here
+            net_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="net-check")
+            connectivity = net_executor.submit(check_internet_connectivity, host="1.1.1.1", timeout=2, max_age=60)
             
-            # Check internet connectivity (basic test)
             try:
-                import requests
-                response = requests.get("https://www.google.com", timeout=10)
-                if response.status_code == 200:
+                # Ensure necessary directories exist
+                config.ensure_directories()
+                
+                # Check available disk space
+                free_space = _cached_disk_usage(str(config.TEMP_DIR)).free
+                free_space_gb = free_space / (1024**3)
+                
+                self.logger.info(f"Available disk space: {free_space_gb:.2f} GB")
+                
+                if free_space_gb < 2.0:  # KiCad typically needs ~1GB
+                    self.logger.warning("Low disk space - installation might fail")
+                    return False
+                
+                if connectivity.result():
                     self.logger.info("Internet connectivity confirmed")
                 else:
-                    self.logger.warning("Internet connectivity issues detected")
-            except Exception as e:
-                self.logger.warning(f"Could not verify internet connectivity: {e}")
+                    self.logger.warning("Could not verify internet connectivity")
+            finally:
+                # Don't wait on the connectivity check when returning early
+                net_executor.shutdown(wait=False)
             
             return True
             
@@ -164,6 +204,9 @@ class Level2SoftwareInstallation(BaseChallenge):
             self.logger.info(f"Installation details: {details}")
             
             if success:
+                # Level 1's cached report and the disk usage no longer reflect the system
+                invalidate_detection_report()
+                _cached_disk_usage.cache_clear()
                 self.logger.info("✓ KiCad installation successful")
                 self.installation_successful = True
                 self.installation_details = details
@@ -177,9 +220,7 @@ class Level2SoftwareInstallation(BaseChallenge):
                 
                 return False
             
-            # Wait a moment for installation to complete
-            self.wait_with_progress(5, "Waiting for installation to finalize")
-            
+            # _verify_installation polls until the installation is registered
             return True
             
         except Exception as e:
@@ -192,11 +233,19 @@ class Level2SoftwareInstallation(BaseChallenge):
         try:
             self.logger.info("Verifying KiCad installation...")
             
-            # Wait a bit for system to register the new installation
-            self.wait_with_progress(10, "Waiting for system to register installation")
+            # Re-check until the system registers the new installation. The installer already
+            # cleared the detector cache, so the first check may use (and fill) it; only
+            # retries bypass it
+            check = {}
+            
+            def kicad_registered():
+                if check:
+                    self.detector.clear_cache()
+                check['result'] = self.detector.is_software_installed('KiCad', 'kicad')
+                return check['result'][0]
             
-            # Re-check KiCad installation status
-            is_installed, details = self.detector.is_software_installed('KiCad', 'kicad')
+            self.poll_until(kicad_registered, max_wait=15, description="Waiting for system to register installation")
+            is_installed, details = check['result']
             
             self.logger.info(f"Post-installation KiCad status: {is_installed}")
             self.logger.info(f"Post-installation details: {details}")
@@ -205,6 +254,12 @@ class Level2SoftwareInstallation(BaseChallenge):
                 self.logger.info("✓ KiCad installation verified successfully")
                 self.final_kicad_status = True
                 self.final_kicad_details = details
+                self.kicad_exe = shutil.which('kicad')
+                self.result = {
+                    'kicad_installed': True,
+                    'kicad_details': details,
+                    'kicad_exe': self.kicad_exe
+                }
                 
                 # Compare with initial status
                 if not self.initial_kicad_status:
@@ -222,7 +277,7 @@ class Level2SoftwareInstallation(BaseChallenge):
                 self.logger.error("Installation verification failed - checking for common issues:")
                 
                 # Check if installation is pending reboot
-                if 'windows' in self.platform_info['system'].lower():
+                if self._sysname == 'windows':
                     self.logger.info("Windows installation may require system reboot")
                 
                 return False
@@ -240,38 +295,43 @@ class Level2SoftwareInstallation(BaseChallenge):
                 self.logger.error("Cannot test functionality - KiCad not installed")
                 return False
             
+            # The detector already read a version (e.g. from the registry), so KiCad needn't be launched
+            version = extract_version(self.final_kicad_details)
+            if version:
+                self.logger.info(f"✓ KiCad {version} reported by detection - skipping version command")
+                self.kicad_functional = True
+                return True
+            
             # Try to run KiCad with version flag to test if it works
-            try:
-                import subprocess
-                
-                # Try different command variations based on platform
-                if 'windows' in self.platform_info['system'].lower():
-                    cmd = ['kicad', '--version']
-                else:
-                    cmd = ['kicad', '--version']
-                
-                self.logger.info(f"Testing KiCad with command: {' '.join(cmd)}")
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.returncode == 0:
-                    self.logger.info("✓ KiCad responds to version command")
-                    self.logger.info(f"KiCad version output: {result.stdout.strip()[:100]}")
-                    self.kicad_functional = True
-                else:
-                    self.logger.warning(f"KiCad version command failed: {result.stderr}")
-                    self.kicad_functional = False
-                    # This might not be critical - some installations don't support --version
-                    
-            except subprocess.TimeoutExpired:
-                self.logger.warning("KiCad version command timed out")
-                self.kicad_functional = False
-            except FileNotFoundError:
+            if not self.kicad_exe:
                 self.logger.warning("KiCad executable not found in PATH")
                 self.kicad_functional = False
-            except Exception as e:
-                self.logger.warning(f"KiCad functionality test failed: {e}")
-                self.kicad_functional = False
+            else:
+                try:
+                    cmd = [self.kicad_exe, '--version']
+                    
+                    self.logger.info(f"Testing KiCad with command: {' '.join(cmd)}")
+                    
+                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                    
+                    if result.returncode == 0:
+                        self.logger.info("✓ KiCad responds to version command")
+                        self.logger.info(f"KiCad version output: {result.stdout.strip()[:100]}")
+                        self.kicad_functional = True
+                    else:
+                        self.logger.warning(f"KiCad version command failed: {result.stderr}")
+                        self.kicad_functional = False
+                        # This might not be critical - some installations don't support --version
+                    
+                except subprocess.TimeoutExpired:
+                    self.logger.warning("KiCad version command timed out")
+                    self.kicad_functional = False
+                except FileNotFoundError:
+                    self.logger.warning(f"KiCad executable not found: {self.kicad_exe}")
+                    self.kicad_functional = False
+                except Exception as e:
+                    self.logger.warning(f"KiCad functionality test failed: {e}")
+                    self.kicad_functional = False
             
             # Even if version test fails, consider installation successful if KiCad is detected
             if self.final_kicad_status:
@@ -288,7 +348,7 @@ class Level2SoftwareInstallation(BaseChallenge):
         """Verify that software installation was successful"""
         try:
             # Success condition: KiCad is now installed (either was already installed or newly installed)
-            return hasattr(self, 'final_kicad_status') and self.final_kicad_status
+            return bool(self.final_kicad_status)
             
         except Exception as e:
             self.logger.error(f"Failed to verify success condition: {e}")
@@ -300,16 +360,15 @@ class Level2SoftwareInstallation(BaseChallenge):
             self.logger.info("Software installation challenge completed")
             
             # Log final status
-            if hasattr(self, 'final_kicad_status') and self.final_kicad_status:
+            if self.final_kicad_status:
                 self.logger.info("✓ KiCad is now available on the system")
                 self.logger.info("Next recommended challenge: Level 3 (Application Launch)")
                 
                 # Log installation summary
-                if hasattr(self, 'kicad_already_installed'):
-                    if self.kicad_already_installed:
-                        self.logger.info("Installation summary: KiCad was already present")
-                    else:
-                        self.logger.info("Installation summary: KiCad was successfully installed")
+                if self.kicad_already_installed:
+                    self.logger.info("Installation summary: KiCad was already present")
+                else:
+                    self.logger.info("Installation summary: KiCad was successfully installed")
             else:
                 self.logger.error("✗ KiCad installation failed")
                 self.logger.error("Manual installation may be required before proceeding")
@@ -3,12 +3,79 @@ Level 3 Challenge: Application Launch
 Start applications and wait for them to fully load
 """
 
+import os
+import shutil
 import time
 import subprocess
 import psutil
 from challenges.base_challenge import BaseChallenge
 from automation_engine import AutomationEngine
-from system_detector import SystemDetector
+from system_detector import get_default_detector
+
+# Native window/application listings answer "is KiCad's window up?" far faster than a vision call.
+# pygetwindow (Windows) and AppKit (macOS, via pyobjc) are optional; xdotool is used on Linux if installed
+try:
+    import pygetwindow
+    PYGETWINDOW_AVAILABLE = True
+except (ImportError, NotImplementedError):  # pygetwindow raises NotImplementedError off Windows
+    PYGETWINDOW_AVAILABLE = False
+
+try:
+    from AppKit import NSWorkspace
+    APPKIT_AVAILABLE = True
+except ImportError:
+    APPKIT_AVAILABLE = False
+
+XDOTOOL_PATH = shutil.which('xdotool')
+
+# How long a freshly launched KiCad must stay alive to count as started; failing launchers
+# (notably on Windows) can take well over a second to exit
+LAUNCH_CHECK_TIMEOUT = 1.5
+
+# Back-to-back "is KiCad running" checks within this many seconds share one process scan
+PROCESS_CHECK_TTL = 0.5
+
+# BaseChallenge.execute calls post_challenge_cleanup straight after the last step, with nothing in
+# between, so cleanup accepts that step's process scan up to this many seconds old
+CLEANUP_CHECK_MAX_AGE = 2.0
+
+# Commands that may start KiCad, in order of preference, by lowercased platform name
+_KICAD_COMMANDS = {
+    'windows': (
+        ('kicad',),
+        ('kicad.exe',),
+        (r'C:\Program Files\KiCad\bin\kicad.exe',),
+        (r'C:\Program Files (x86)\KiCad\bin\kicad.exe',)
+    ),
+    'linux': (
+        ('kicad',),
+        ('/usr/bin/kicad',),
+        ('/usr/local/bin/kicad',)
+    ),
+    'darwin': (
+        ('kicad',),
+        ('open', '-a', 'KiCad'),
+        ('/Applications/KiCad/KiCad.app/Contents/MacOS/kicad',)
+    )
+}
+
+# Platform name -> launch commands found on this system; only non-empty results are kept,
+# so a KiCad installed later in the session (e.g. by Level 2) is still picked up
+_resolved_commands = {}
+
+def _resolve_kicad_commands(sysname):
+    """KiCad launch commands whose executable exists, with PATH lookups resolved to absolute paths"""
+    commands = _resolved_commands.get(sysname)
+    if commands is None:
+        found = {}
+        for cmd in _KICAD_COMMANDS.get(sysname, (('kicad',),)):
+            executable = cmd[0] if os.path.isabs(cmd[0]) else shutil.which(cmd[0])
+            if executable and os.path.exists(executable):
+                found.setdefault((executable, *cmd[1:]), None)
+        commands = tuple(found)
+        if commands:
+            _resolved_commands[sysname] = commands
+    return commands
 
 class Level3ApplicationLaunch(BaseChallenge):
     def __init__(self):
@@ -19,10 +86,19 @@ class Level3ApplicationLaunch(BaseChallenge):
         )
         
         self.automation = AutomationEngine()
-        self.detector = SystemDetector()
+        self.detector = get_default_detector()
         
         # Prerequisites: Levels 1 and 2 must be completed
         self.prerequisites = [1, 2]
+        
+        # Lowercased platform name; it can't change while the process runs
+        self._sysname = self.detector.get_platform()['system'].lower()
+        
+        # The process started by _launch_kicad, if it was launched directly
+        self.kicad_process = None
+        
+        # (monotonic time, result) of the last KiCad process scan
+        self._process_check = (float('-inf'), False)
     
     def get_steps(self):
         """Return list of steps for application launch challenge"""
@@ -85,13 +161,7 @@ class Level3ApplicationLaunch(BaseChallenge):
             self.logger.info("Checking for existing KiCad instances...")
             
             # Get list of KiCad processes
-            kicad_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'exe']):
-                try:
-                    if proc.info['name'] and 'kicad' in proc.info['name'].lower():
-                        kicad_processes.append(proc)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            kicad_processes = self.detector.find_processes('kicad')
             
             if not kicad_processes:
                 self.logger.info("No existing KiCad instances found")
@@ -107,19 +177,22 @@ class Level3ApplicationLaunch(BaseChallenge):
                 except Exception as e:
                     self.logger.warning(f"Failed to terminate process {proc.pid}: {e}")
             
-            # Wait for processes to close
-            self.wait_with_progress(5, "Waiting for processes to close")
+            # Wait for processes to close; returns as soon as they have all exited
+            _, alive = psutil.wait_procs(
+                kicad_processes, timeout=5,
+                callback=lambda proc: self.logger.info(f"KiCad process {proc.pid} exited")
+            )
             
             # Force kill any remaining processes
-            for proc in kicad_processes:
+            for proc in alive:
                 try:
-                    if proc.is_running():
-                        self.logger.warning(f"Force killing KiCad process {proc.pid}")
-                        proc.kill()
+                    self.logger.warning(f"Force killing KiCad process {proc.pid}")
+                    proc.kill()
                 except Exception as e:
                     self.logger.warning(f"Failed to kill process {proc.pid}: {e}")
             
-            self.wait_with_progress(2, "Waiting after process cleanup")
+            if alive:
+                psutil.wait_procs(alive, timeout=2)
             
             return True
             
@@ -132,31 +205,13 @@ class Level3ApplicationLaunch(BaseChallenge):
         try:
             self.logger.info("Launching KiCad application...")
             
-            # Determine the correct command to launch KiCad
-            platform = self.detector.get_platform()['system'].lower()
+            # Launch commands that exist on this system, resolved on first use
+            possible_commands = list(_resolve_kicad_commands(self._sysname))
             
-            if platform == 'windows':
-                # Try different possible commands for Windows
-                possible_commands = [
-                    ['kicad'],
-                    ['kicad.exe'],
-                    [r'C:\Program Files\KiCad\bin\kicad.exe'],
-                    [r'C:\Program Files (x86)\KiCad\bin\kicad.exe']
-                ]
-            elif platform == 'linux':
-                possible_commands = [
-                    ['kicad'],
-                    ['/usr/bin/kicad'],
-                    ['/usr/local/bin/kicad']
-                ]
-            elif platform == 'darwin':  # macOS
-                possible_commands = [
-                    ['kicad'],
-                    ['open', '-a', 'KiCad'],
-                    ['/Applications/KiCad/KiCad.app/Contents/MacOS/kicad']
-                ]
-            else:
-                possible_commands = [['kicad']]
+            # Level 2 resolved the executable from PATH; try it first
+            kicad_exe = (self.prerequisite_results.get(2) or {}).get('kicad_exe')
+            if kicad_exe and (kicad_exe,) not in possible_commands:
+                possible_commands.insert(0, (kicad_exe,))
             
             # Try each command until one works
             self.kicad_process = None
@@ -165,34 +220,34 @@ class Level3ApplicationLaunch(BaseChallenge):
                 try:
                     self.logger.info(f"Trying to launch with command: {' '.join(cmd)}")
                     
+                    # Output is never read, so it is discarded rather than piped (a full pipe would block KiCad);
+                    # a new session keeps KiCad running if the automation process is interrupted
                     self.kicad_process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        stdin=subprocess.PIPE
+                        list(cmd),
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        stdin=subprocess.DEVNULL,
+                        start_new_session=True
                     )
                     
-                    # Wait a moment to see if process starts successfully
-                    time.sleep(2)
-                    
-                    if self.kicad_process.poll() is None:
+                    # A process that survives a short wait has started; one that fails to start exits at once
+                    try:
+                        self.kicad_process.wait(timeout=LAUNCH_CHECK_TIMEOUT)
+                    except subprocess.TimeoutExpired:
                         self.logger.info(f"✓ KiCad launched successfully with PID {self.kicad_process.pid}")
                         break
-                    else:
-                        self.logger.warning(f"Process exited immediately with code {self.kicad_process.returncode}")
-                        self.kicad_process = None
+                    
+                    self.logger.warning(f"Process exited immediately with code {self.kicad_process.returncode}")
+                    self.kicad_process = None
                         
                 except FileNotFoundError:
                     self.logger.debug(f"Command not found: {' '.join(cmd)}")
                 except Exception as e:
                     self.logger.warning(f"Failed to launch with {' '.join(cmd)}: {e}")
             
-            if self.kicad_process is None:
-                self.logger.error("Failed to launch KiCad with any available command")
-                return False
-            
             # Alternative: Use automation to click on KiCad icon if direct launch fails
             if self.kicad_process is None:
+                self.logger.warning("Failed to launch KiCad with any available command")
                 self.logger.info("Trying to launch KiCad via desktop automation...")
                 return self._launch_via_automation()
             
@@ -207,9 +262,7 @@ class Level3ApplicationLaunch(BaseChallenge):
         try:
             self.logger.info("Attempting to launch KiCad via automation...")
             
-            platform = self.detector.get_platform()['system'].lower()
-            
-            if platform == 'windows':
+            if self._sysname == 'windows':
                 # Try to find and click KiCad in Start menu
                 self.logger.info("Looking for KiCad in Windows Start menu...")
                 
@@ -226,7 +279,7 @@ class Level3ApplicationLaunch(BaseChallenge):
                             self.wait_with_progress(3, "Waiting for application to start")
                             return True
                 
-            elif platform == 'linux':
+            elif self._sysname == 'linux':
                 # Try to find KiCad in application launcher
                 self.logger.info("Looking for KiCad in application launcher...")
                 
@@ -264,35 +317,53 @@ class Level3ApplicationLaunch(BaseChallenge):
             import config
             max_wait_time = config.KICAD_WAIT_TIME
             
-            for i in range(max_wait_time):
-                self.logger.debug(f"Waiting for KiCad to load... ({i+1}/{max_wait_time})")
+            # The vision model is only consulted once the native check has had half the wait to succeed
+            # (or straight away when there is no native check on this system)
+            vision_after = time.monotonic() + max_wait_time / 2
+            
+            def kicad_loaded():
+                # Nothing is worth checking until a KiCad process exists
+                if not self._kicad_alive():
+                    self.logger.debug("No KiCad process yet")
+                    return False
                 
-                # Take screenshot and check for KiCad window
-                screenshot = self.automation.take_screenshot()
-                screenshot_b64 = self.automation.screenshot_to_base64(screenshot)
+                visible = self._kicad_window_visible()
+                if visible:
+                    self.logger.info("✓ KiCad main window is visible")
+                    return True
+                if visible is not None and time.monotonic() < vision_after:
+                    return False
                 
-                # Use AI to detect if KiCad main window is visible
+                # Take screenshot and use AI to detect if KiCad main window is visible
+                screenshot_b64 = self.automation.screenshot_to_base64(self.automation.take_screenshot())
                 application_state = self.automation.vision.detect_application_state(screenshot_b64, "KiCad")
                 
                 if application_state.get('application_running', False):
                     state = application_state.get('application_state', 'unknown')
                     
-                    if state in ['main_window', 'loading']:
-                        self.logger.info(f"✓ KiCad detected in state: {state}")
-                        
-                        if state == 'main_window':
-                            self.logger.info("KiCad main window is visible")
-                            return True
-                        elif state == 'loading':
-                            self.logger.info("KiCad is still loading...")
-                
-                time.sleep(1)
+                    if state == 'main_window':
+                        self.logger.info("✓ KiCad main window is visible")
+                        return True
+                    elif state == 'loading':
+                        self.logger.info("KiCad is still loading...")
+                return False
+            
+            # Native checks are cheap enough to repeat every 0.25-1 s; vision-only checks back off to 4 s
+            native_check = {
+                'windows': PYGETWINDOW_AVAILABLE,
+                'linux': XDOTOOL_PATH is not None,
+                'darwin': APPKIT_AVAILABLE
+            }.get(self._sysname, False)
+            initial, max_interval = (0.25, 1) if native_check else (0.5, 4)
+            if self.poll_until(kicad_loaded, max_wait=max_wait_time, initial=initial, max_interval=max_interval,
+                               description="Waiting for KiCad to load"):
+                return True
             
             self.logger.warning(f"KiCad did not fully load within {max_wait_time} seconds")
             self.take_error_screenshot("kicad_load_timeout")
             
             # Check if any KiCad processes are running
-            is_running = self.detector.is_process_running('kicad')
+            is_running = self._kicad_running()
             if is_running:
                 self.logger.info("KiCad process is running - may have loaded but not detected")
                 return True  # Continue anyway
@@ -304,13 +375,44 @@ class Level3ApplicationLaunch(BaseChallenge):
             self.logger.error(f"Failed while waiting for application load: {e}")
             return False
     
+    def _kicad_alive(self):
+        """Whether the launched KiCad, or failing that any KiCad process, is running"""
+        if self.kicad_process is not None and self.kicad_process.poll() is None:
+            return True
+        return self._kicad_running()
+    
+    def _kicad_window_visible(self):
+        """Whether a KiCad window is open per the platform's window list, or None if that can't be checked"""
+        try:
+            if self._sysname == 'windows' and PYGETWINDOW_AVAILABLE:
+                return bool(pygetwindow.getWindowsWithTitle('KiCad'))
+            if self._sysname == 'linux' and XDOTOOL_PATH:
+                result = subprocess.run([XDOTOOL_PATH, 'search', '--onlyvisible', '--name', 'KiCad'],
+                                        capture_output=True, timeout=2)
+                return result.returncode == 0
+            if self._sysname == 'darwin' and APPKIT_AVAILABLE:
+                return any('kicad' in (app.localizedName() or '').lower() and not app.isHidden()
+                           for app in NSWorkspace.sharedWorkspace().runningApplications())
+        except Exception as e:
+            self.logger.debug(f"Native window check failed: {e}")
+        return None
+    
+    def _kicad_running(self, max_age=PROCESS_CHECK_TTL):
+        """Whether any KiCad process is running, reusing an answer up to max_age seconds old"""
+        now = time.monotonic()
+        checked_at, running = self._process_check
+        if now - checked_at < max_age:
+            return running
+        running = self.detector.is_process_running('kicad')
+        self._process_check = (now, running)
+        return running
+    
     def _verify_main_window(self):
         """Verify that KiCad main window is visible and accessible"""
         try:
             self.logger.info("Verifying KiCad main window...")
             
             screenshot = self.automation.take_screenshot()
-            screenshot_b64 = self.automation.screenshot_to_base64(screenshot)
             
             # Check for main KiCad window elements
             window_elements = [
@@ -323,8 +425,9 @@ class Level3ApplicationLaunch(BaseChallenge):
             
             window_detected = False
             
-            for element in window_elements:
-                x, y = self.automation.find_element_coordinates(element, screenshot)
+            # All candidates are looked up in one vision call on the same screenshot
+            coordinates = self.automation.find_elements_coordinates(window_elements, screenshot)
+            for element, (x, y) in zip(window_elements, coordinates):
                 if x is not None and y is not None:
                     self.logger.info(f"✓ Found {element} at ({x}, {y})")
                     window_detected = True
@@ -334,7 +437,9 @@ class Level3ApplicationLaunch(BaseChallenge):
                 self.logger.warning("Could not detect specific KiCad window elements")
                 
                 # Use general AI analysis
-                matches, confidence = self.automation.verify_screen_state("KiCad application is open and visible")
+                matches, confidence = self.automation.verify_screen_state(
+                    "KiCad application is open and visible", screenshot
+                )
                 
                 if matches and confidence > 0.6:
                     self.logger.info(f"✓ AI confirms KiCad is visible (confidence: {confidence:.2f})")
@@ -355,6 +460,14 @@ class Level3ApplicationLaunch(BaseChallenge):
             return False
     
     def _verify_responsiveness(self):
+        """Verify that KiCad is responsive, then record the run's final process check"""
+        responsive = self._check_responsiveness()
+        
+        # Only recorded for post_challenge_cleanup to reuse; it doesn't affect this step's result
+        self._kicad_running()
+        return responsive
+    
+    def _check_responsiveness(self):
         """Verify that KiCad application is responsive"""
         try:
             self.logger.info("Verifying KiCad responsiveness...")
@@ -381,8 +494,11 @@ class Level3ApplicationLaunch(BaseChallenge):
             else:
                 self.logger.warning("Could not find title bar for responsiveness test")
                 
-                # Alternative: Check if the window is still the active window
-                matches, confidence = self.automation.verify_screen_state("KiCad is the active application window")
+                # Alternative: Check if the window is still the active window, on the same screenshot
+                # (whose encoding the engine has already memoized)
+                matches, confidence = self.automation.verify_screen_state(
+                    "KiCad is the active application window", screenshot
+                )
                 
                 if matches and confidence > 0.5:
                     self.logger.info(f"✓ KiCad appears to be active and responsive (confidence: {confidence:.2f})")
@@ -399,14 +515,16 @@ class Level3ApplicationLaunch(BaseChallenge):
         """Verify that KiCad was successfully launched"""
         try:
             # Success condition: KiCad process is running and main window is visible
-            is_running = self.detector.is_process_running('kicad')
+            is_running = self._kicad_running()
             
             if is_running:
                 self.logger.info("✓ KiCad process is running")
                 
                 # Additional check: verify window is still visible
                 screenshot = self.automation.take_screenshot()
-                matches, confidence = self.automation.verify_screen_state("KiCad application window is visible")
+                matches, confidence = self.automation.verify_screen_state(
+                    "KiCad application window is visible", screenshot
+                )
                 
                 if matches and confidence > 0.5:
                     self.logger.info(f"✓ KiCad window is visible (confidence: {confidence:.2f})")
@@ -427,8 +545,8 @@ class Level3ApplicationLaunch(BaseChallenge):
         try:
             self.logger.info("Application launch challenge completed")
             
-            # Check final status
-            is_running = self.detector.is_process_running('kicad')
+            # Check final status; the check at the end of the last step is reused
+            is_running = self._kicad_running(max_age=CLEANUP_CHECK_MAX_AGE)
             
             if is_running:
                 self.logger.info("✓ KiCad is running and ready for use")
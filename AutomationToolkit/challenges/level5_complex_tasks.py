@@ -6,7 +6,7 @@ Perform multi-step workflows like creating PCB circuits in KiCad
 import time
 from challenges.base_challenge import BaseChallenge
 from automation_engine import AutomationEngine
-from system_detector import SystemDetector
+from system_detector import get_default_detector
 
 class Level5ComplexTasks(BaseChallenge):
     def __init__(self):
@@ -17,7 +17,7 @@ class Level5ComplexTasks(BaseChallenge):
         )
         
         self.automation = AutomationEngine()
-        self.detector = SystemDetector()
+        self.detector = get_default_detector()
         
         # Prerequisites: Levels 1-4 must be completed
         self.prerequisites = [1, 2, 3, 4]
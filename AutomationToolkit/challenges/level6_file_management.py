@@ -8,7 +8,7 @@ import os
 from pathlib import Path
 from challenges.base_challenge import BaseChallenge
 from automation_engine import AutomationEngine
-from system_detector import SystemDetector
+from system_detector import get_default_detector
 
 class Level6FileManagement(BaseChallenge):
     def __init__(self):
@@ -19,7 +19,7 @@ class Level6FileManagement(BaseChallenge):
         )
         
         self.automation = AutomationEngine()
-        self.detector = SystemDetector()
+        self.detector = get_default_detector()
         
         # Prerequisites: Levels 1-5 must be completed
         self.prerequisites = [1, 2, 3, 4, 5]
@@ -7,7 +7,7 @@ import time
 import random
 from challenges.base_challenge import BaseChallenge
 from automation_engine import AutomationEngine
-from system_detector import SystemDetector
+from system_detector import get_default_detector
 
 class Level7AdvancedOperations(BaseChallenge):
     def __init__(self):
@@ -18,7 +18,7 @@ class Level7AdvancedOperations(BaseChallenge):
         )
         
         self.automation = AutomationEngine()
-        self.detector = SystemDetector()
+        self.detector = get_default_detector()
         
         # Prerequisites: All previous levels must be completed
         self.prerequisites = [1, 2, 3, 4, 5, 6]
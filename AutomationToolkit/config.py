@@ -4,7 +4,62 @@ Configuration management for the Progressive Desktop Automation System
 import json
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, NamedTuple, FrozenSet, List
+
+class ConfigField(NamedTuple):
+    """Validation rule for one configuration value"""
+    types: tuple
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    choices: Optional[FrozenSet[str]] = None
+
+_NUMBER = (int, float)
+
+# Declarative schema for user-editable settings; keys not listed are accepted as-is
+CONFIG_SCHEMA: Dict[str, ConfigField] = {
+    "openai_api_key": ConfigField((str,)),
+    "automation_speed": ConfigField(_NUMBER, 0.1, 10.0),
+    "screenshot_delay": ConfigField(_NUMBER, 0.0, 60.0),
+    "click_delay": ConfigField(_NUMBER, 0.0, 10.0),
+    "typing_speed": ConfigField(_NUMBER, 0.0, 5.0),
+    "max_retries": ConfigField((int,), 0, 100),
+    "log_level": ConfigField((str,), choices=frozenset({"DEBUG", "INFO", "WARNING", "ERROR"})),
+    "auto_save_screenshots": ConfigField((bool,)),
+    "screenshot_dir": ConfigField((str,)),
+    "error_screenshot_dir": ConfigField((str,)),
+    "max_screenshot_history": ConfigField((int,), 0, 10000),
+    "vision_model": ConfigField((str,)),
+    "vision_timeout": ConfigField(_NUMBER, 1, 600),
+    "failsafe_enabled": ConfigField((bool,)),
+    "failsafe_corner": ConfigField((str,), choices=frozenset({"top-left", "top-right", "bottom-left", "bottom-right"}))
+}
+
+def validate_values(values: Dict[str, Any]) -> List[str]:
+    """Check configuration values against CONFIG_SCHEMA and return a list of issues"""
+    issues = []
+    
+    for key, value in values.items():
+        rule = CONFIG_SCHEMA.get(key)
+        if rule is None:
+            continue
+        
+        label = key.replace('_', ' ').capitalize()
+        
+        # bool is a subclass of int, so only accept it where it is explicitly allowed
+        if not isinstance(value, rule.types) or (isinstance(value, bool) and bool not in rule.types):
+            issues.append(f"{label} has an invalid type")
+            continue
+        
+        if rule.minimum is not None and not (rule.minimum <= value <= rule.maximum):
+            issues.append(f"{label} must be between {rule.minimum} and {rule.maximum}")
+        elif rule.choices is not None and value not in rule.choices:
+            issues.append(f"{label} must be one of: {', '.join(sorted(rule.choices))}")
+    
+    api_key = values.get("openai_api_key")
+    if isinstance(api_key, str) and api_key and not api_key.startswith('sk-'):
+        issues.append('OpenAI API key must start with "sk-"')
+    
+    return issues
 
 class Config:
     """Configuration manager for the automation system"""
@@ -97,10 +152,8 @@ class Config:
         if not self.get_openai_api_key():
             issues.append("OpenAI API key not configured")
         
-        # Check speed settings
-        speed = self.get("automation_speed", 1.0)
-        if not isinstance(speed, (int, float)) or speed <= 0 or speed > 10:
-            issues.append("Automation speed must be between 0.1 and 10.0")
+        # Check value types and ranges
+        issues.extend(validate_values(self.config))
         
         # Check directories exist
         screenshot_dir = Path(self.get("screenshot_dir"))
@@ -0,0 +1,60 @@
+"""
+JSON helpers backed by orjson when it is installed
+Falls back to the standard library json module otherwise
+"""
+
+import json
+from functools import lru_cache
+from typing import Any
+
+# orjson is optional; it is several times faster on large nested payloads
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def loads(data: Any) -> Any:
+    """Parse JSON from str or bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string, optionally indented by two spaces"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+@lru_cache(maxsize=1)
+def orjson_provider_class():
+    """Flask JSON provider class backed by orjson; Flask is only imported by the web apps that ask for it"""
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonProvider(DefaultJSONProvider):
+        """Flask JSON provider that serializes with orjson"""
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            option = orjson.OPT_NON_STR_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode()
+            except TypeError:
+                # Anything orjson can't handle goes through Flask's own encoder
+                return super().dumps(obj, **kwargs)
+
+        def loads(self, s: Any, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+
+    return OrjsonProvider
+
+def install_json_provider(app):
+    """Use orjson for jsonify and request parsing in a Flask app when available"""
+    if ORJSON_AVAILABLE:
+        app.json = orjson_provider_class()(app)
+    return app
@@ -62,8 +62,8 @@ class SoftwareInstaller:
     def install_software(self, software_name, force_reinstall=False):
         """Install software if not already installed"""
         try:
-            from system_detector import SystemDetector
-            detector = SystemDetector()
+            from system_detector import get_default_detector
+            detector = get_default_detector()
             
             # Check if already installed (unless force reinstall)
             if not force_reinstall:
@@ -88,13 +88,17 @@ class SoftwareInstaller:
             
             # Platform-specific installation
             if platform_key == 'windows':
-                return self._install_windows(software_name, config)
+                result = self._install_windows(software_name, config)
             elif platform_key == 'linux':
-                return self._install_linux(software_name, config)
+                result = self._install_linux(software_name, config)
             elif platform_key == 'darwin':
-                return self._install_macos(software_name, config)
+                result = self._install_macos(software_name, config)
             else:
                 raise ValueError(f"Unsupported platform: {platform_key}")
+            
+            # Cached detection results may be out of date now
+            detector.clear_cache()
+            return result
                 
         except Exception as e:
             self.logger.error(f"Failed to install {software_name}: {e}")
@@ -4,7 +4,11 @@ System detection utilities for identifying installed software and system capabil
 
 import os
 import platform
+import re
 import subprocess
+import threading
+import time
+from functools import lru_cache
 import psutil
 from pathlib import Path
 from logger_config import setup_logger
@@ -16,21 +20,42 @@ try:
 except ImportError:
     WINDOWS_REGISTRY_AVAILABLE = False
 
+# Installation results are reused for this long, so software added or removed outside the app is noticed
+INSTALLED_CACHE_TTL = 30
+
+# On Linux a process name can be read from /proc/<pid>/comm without psutil's per-process setup
+PROC_COMM_AVAILABLE = os.path.exists('/proc/self/comm')
+
+# Dotted version numbers such as 7.0 or 8.0.4, not glued to other words or numbers
+_VERSION_RE = re.compile(r'(?<![\w.])(\d+\.\d+(?:\.\d+)*)(?![\w.]*\w)')
+
+def extract_version(details):
+    """Version number embedded in an is_software_installed details string, or None"""
+    match = _VERSION_RE.search(details or '')
+    return match.group(1) if match else None
+
+@lru_cache(maxsize=1)
+def _platform_info():
+    """Platform details; they cannot change while the process runs, so they are read once"""
+    return {
+        'system': platform.system(),
+        'release': platform.release(),
+        'version': platform.version(),
+        'machine': platform.machine(),
+        'processor': platform.processor()
+    }
+
 class SystemDetector:
     def __init__(self):
         self.logger = setup_logger(__name__)
         self.platform = platform.system().lower()
+        self._installed_cache = {}  # (software_name, executable_name) -> (checked_at, (is_installed, details))
+        self.installed_cache_ttl = INSTALLED_CACHE_TTL
         self.logger.info(f"System detector initialized for platform: {self.platform}")
     
     def get_platform(self):
         """Get current platform information"""
-        return {
-            'system': platform.system(),
-            'release': platform.release(),
-            'version': platform.version(),
-            'machine': platform.machine(),
-            'processor': platform.processor()
-        }
+        return dict(_platform_info())
     
     def get_system_paths(self):
         """Get important system paths"""
@@ -70,12 +95,29 @@ class SystemDetector:
         
         return paths
     
+    def clear_cache(self):
+        """Forget installation results, e.g. after software was installed or removed"""
+        self._installed_cache.clear()
+    
     def is_software_installed(self, software_name, executable_name=None):
-        """Check if specific software is installed"""
+        """Check if specific software is installed; results are reused for installed_cache_ttl seconds or until clear_cache()"""
+        if executable_name is None:
+            executable_name = software_name.lower()
+        
+        key = (software_name, executable_name)
+        now = time.monotonic()
+        cached = self._installed_cache.get(key)
+        if cached is not None and now - cached[0] < self.installed_cache_ttl:
+            return cached[1]
+        
+        result = self._detect_software(software_name, executable_name)
+        if not result[1].startswith("error"):
+            self._installed_cache[key] = (now, result)
+        return result
+    
+    def _detect_software(self, software_name, executable_name):
+        """Search PATH and platform-specific locations for installed software"""
         try:
-            if executable_name is None:
-                executable_name = software_name.lower()
-            
             # Method 1: Check if executable is in PATH
             if self._check_executable_in_path(executable_name):
                 self.logger.info(f"{software_name} found in PATH")
@@ -141,14 +183,15 @@ class SystemDetector:
         
         # Check Windows registry if available
         if WINDOWS_REGISTRY_AVAILABLE:
-            if self._check_windows_registry(software_name):
-                return True, "found_in_registry"
+            version = self._check_windows_registry(software_name)
+            if version is not None:
+                return True, f"found_in_registry (version {version})" if version else "found_in_registry"
             methods_checked.append("registry_search")
         
         return False, f"not_found (checked: {', '.join(methods_checked)})"
     
     def _check_windows_registry(self, software_name):
-        """Check Windows registry for installed software"""
+        """Check Windows registry for installed software; returns its DisplayVersion ('' if unset) or None"""
         try:
             registry_paths = [
                 (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
@@ -167,7 +210,10 @@ class SystemDetector:
                                         display_name = winreg.QueryValueEx(subkey_handle, "DisplayName")[0]
                                         if software_name.lower() in display_name.lower():
                                             self.logger.info(f"Found {software_name} in registry: {display_name}")
-                                            return True
+                                            try:
+                                                return str(winreg.QueryValueEx(subkey_handle, "DisplayVersion")[0])
+                                            except FileNotFoundError:
+                                                return ""
                                     except FileNotFoundError:
                                         continue
                             except Exception:
@@ -175,10 +221,10 @@ class SystemDetector:
                 except Exception:
                     continue
             
-            return False
+            return None
         except Exception as e:
             self.logger.error(f"Error checking Windows registry: {e}")
-            return False
+            return None
     
     def _check_linux_software(self, software_name, executable_name):
         """Linux-specific software detection"""
@@ -304,10 +350,40 @@ class SystemDetector:
     def is_process_running(self, process_name):
         """Check if a specific process is running"""
         try:
-            for proc in psutil.process_iter(['name']):
-                if proc.info['name'] and process_name.lower() in proc.info['name'].lower():
-                    return True
-            return False
+            return bool(self.find_processes(process_name))
         except Exception as e:
             self.logger.error(f"Error checking if process {process_name} is running: {e}")
             return False
+    
+    def find_processes(self, process_name):
+        """Running processes whose name contains process_name (case-insensitive)"""
+        needle = process_name.lower()
+        if not PROC_COMM_AVAILABLE:
+            return [proc for proc in psutil.process_iter(['name'])
+                    if proc.info['name'] and needle in proc.info['name'].lower()]
+        
+        # Only the short comm name is read for each PID, compared as bytes without decoding;
+        # Process objects are built for matches only
+        needle_bytes = needle.encode('utf-8')
+        processes = []
+        for pid in psutil.pids():
+            try:
+                with open(f'/proc/{pid}/comm', 'rb') as f:
+                    name = f.read(64)
+                if needle_bytes in name.lower():
+                    processes.append(psutil.Process(pid))
+            except (OSError, psutil.NoSuchProcess):
+                continue
+        return processes
+
+_default_detector = None
+_default_detector_lock = threading.Lock()
+
+def get_default_detector():
+    """Shared SystemDetector, so installation scans are reused across challenges"""
+    global _default_detector
+    if _default_detector is None:
+        with _default_detector_lock:
+            if _default_detector is None:
+                _default_detector = SystemDetector()
+    return _default_detector
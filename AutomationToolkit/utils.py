@@ -3,18 +3,49 @@ Utility functions for the Progressive Desktop Automation Challenge System
 Common helpers and shared functionality
 """
 
+import io
 import os
 import time
 import json
+import base64
 import hashlib
+import signal
+import socket
+import threading
+import uuid
 import subprocess
 import platform
 from typing import Dict, List, Any, Optional, Union, Tuple
 from pathlib import Path
 from datetime import datetime, timedelta
 
+import psutil
+from PIL import Image
+
 from logger_config import setup_logger
 
+# ImageGrab is imported once at load; it can be missing on headless or minimal Pillow builds
+try:
+    from PIL import ImageGrab
+    IMAGEGRAB_AVAILABLE = True
+except ImportError:
+    IMAGEGRAB_AVAILABLE = False
+
+# NumPy is optional; it vectorises the difference hash when available
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# pybase64 is optional; its SIMD codec is a drop-in for base64 on large screenshots
+try:
+    import pybase64 as _base64_codec
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    _base64_codec = base64
+    PYBASE64_AVAILABLE = False
+
 logger = setup_logger(__name__)
 
 def get_timestamp() -> float:
@@ -63,7 +94,6 @@ def safe_filename(filename: str) -> str:
 
 def generate_unique_id() -> str:
     """Generate unique ID based on timestamp and random data"""
-    import uuid
     return str(uuid.uuid4())
 
 def hash_string(text: str) -> str:
@@ -130,8 +160,6 @@ def run_command(command: List[str], timeout: int = 30, cwd: Optional[str] = None
 def get_system_info() -> Dict[str, Any]:
     """Get comprehensive system information"""
     try:
-        import psutil
-        
         # Basic system info
         system_info = {
             'platform': {
@@ -275,8 +303,6 @@ def timeout_handler(timeout_seconds: int):
     """
     def decorator(func):
         def wrapper(*args, **kwargs):
-            import signal
-            
             def timeout_signal_handler(signum, frame):
                 raise TimeoutError(f"Function {func.__name__} timed out after {timeout_seconds}s")
             
@@ -301,10 +327,10 @@ def debounce(wait_time: float):
     Debounce decorator - only execute function if it hasn't been called in wait_time seconds
     """
     def decorator(func):
-        last_called = [0.0]
+        last_called = [float('-inf')]
         
         def wrapper(*args, **kwargs):
-            now = time.time()
+            now = time.monotonic()
             if now - last_called[0] >= wait_time:
                 last_called[0] = now
                 return func(*args, **kwargs)
@@ -317,8 +343,6 @@ def debounce(wait_time: float):
 
 def find_available_port(start_port: int = 5000, max_attempts: int = 100) -> int:
     """Find an available port starting from start_port"""
-    import socket
-    
     for port in range(start_port, start_port + max_attempts):
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -349,22 +373,27 @@ def create_backup_filename(original_path: Union[str, Path], suffix: str = "backu
     
     return original_path.parent / backup_name
 
-def check_internet_connectivity(host: str = "8.8.8.8", port: int = 53, timeout: int = 3) -> bool:
-    """Check if internet connectivity is available"""
-    import socket
+# (host, port) -> monotonic time of the last successful connectivity check
+_connectivity_ok: Dict[Tuple[str, int], float] = {}
+
+def check_internet_connectivity(host: str = "8.8.8.8", port: int = 53, timeout: int = 3,
+                                max_age: float = 0) -> bool:
+    """Check if internet connectivity is available; a success within max_age seconds is reused"""
+    key = (host, port)
+    now = time.monotonic()
+    if max_age and now - _connectivity_ok.get(key, float('-inf')) < max_age:
+        return True
     
     try:
-        socket.setdefaulttimeout(timeout)
-        socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
-        return True
-    except Exception:
+        with socket.create_connection((host, port), timeout=timeout):
+            _connectivity_ok[key] = now
+            return True
+    except OSError:
         return False
 
 def get_process_by_name(process_name: str) -> List[Dict[str, Any]]:
     """Get processes by name"""
     try:
-        import psutil
-        
         processes = []
         for proc in psutil.process_iter(['pid', 'name', 'exe', 'create_time', 'memory_info']):
             try:
@@ -388,8 +417,6 @@ def get_process_by_name(process_name: str) -> List[Dict[str, Any]]:
 def kill_process_tree(pid: int, timeout: int = 5) -> bool:
     """Kill process and all its children"""
     try:
-        import psutil
-        
         parent = psutil.Process(pid)
         children = parent.children(recursive=True)
         
@@ -419,6 +446,217 @@ def kill_process_tree(pid: int, timeout: int = 5) -> bool:
         logger.error(f"Failed to kill process tree {pid}: {e}")
         return False
 
+class EncodedImage:
+    """
+    Encoded image bytes with a lazily computed base64 form (or vice versa)
+    Lets internal code work on raw bytes while only API boundaries pay for base64
+    """
+    
+    def __init__(self, data: Optional[bytes] = None, b64: Optional[str] = None,
+                 mime_type: str = 'image/png'):
+        if data is None and b64 is None:
+            raise ValueError("EncodedImage requires data or b64")
+        self._data = data
+        self._b64 = b64
+        self.mime_type = mime_type
+    
+    @classmethod
+    def coerce(cls, value: Union['EncodedImage', bytes, str]) -> 'EncodedImage':
+        """Wrap raw bytes or a base64 string, passing existing instances through"""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return cls(data=bytes(value))
+        return cls(b64=value)
+    
+    @property
+    def data(self) -> bytes:
+        """Raw encoded image bytes"""
+        if self._data is None:
+            self._data = _base64_codec.b64decode(self._b64)
+        return self._data
+    
+    @property
+    def b64(self) -> str:
+        """Base64 representation, computed on first access"""
+        if self._b64 is None:
+            self._b64 = _base64_codec.b64encode(self._data).decode('ascii')
+        return self._b64
+    
+    def ensure_decoded(self) -> 'EncodedImage':
+        """Compute both the raw and base64 forms now, e.g. before threads share the image"""
+        if self._data is None:
+            self._data = _base64_codec.b64decode(self._b64)
+        if self._b64 is None:
+            self._b64 = _base64_codec.b64encode(self._data).decode('ascii')
+        return self
+    
+    @property
+    def data_url(self) -> str:
+        """data: URL suitable for browsers and vision APIs"""
+        return f"data:{self.mime_type};base64,{self.b64}"
+
+def encode_screenshot(image, image_format: str = 'PNG', quality: int = 75,
+                      buffer=None) -> EncodedImage:
+    """
+    Encode a PIL image for transport
+    PNG uses the fastest deflate level; JPEG is available for lossy previews
+    Pass a BytesIO as buffer to reuse it across calls
+    """
+    if buffer is None:
+        buffer = io.BytesIO()
+    else:
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if image_format.upper() in ('JPEG', 'JPG'):
+        image.convert('RGB').save(buffer, format='JPEG', quality=quality)
+        mime_type = 'image/jpeg'
+    else:
+        image.save(buffer, format='PNG', compress_level=1, optimize=False)
+        mime_type = 'image/png'
+    
+    # getbuffer() exposes the encoded bytes without the copy getvalue() makes
+    with buffer.getbuffer() as view:
+        b64 = _base64_codec.b64encode(view).decode('ascii')
+    return EncodedImage(b64=b64, mime_type=mime_type)
+
+# Per-thread scratch buffer so repeated vision uploads don't reallocate
+_vlm_buffers = threading.local()
+
+# Uploads larger than this are re-encoded at the next lower JPEG quality
+_PROACTIVE_COMPRESS_BYTES = 1024 * 1024
+_VLM_QUALITY_STEPS = (85, 70, 55, 40)
+
+def encode_for_vlm(image, max_bytes: int = _PROACTIVE_COMPRESS_BYTES) -> EncodedImage:
+    """
+    Encode a screenshot for upload to the vision model
+    High-quality JPEG is several times smaller than PNG for UI screenshots;
+    large monitors step down in quality until the upload fits max_bytes
+    """
+    buffer = getattr(_vlm_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _vlm_buffers.buffer = io.BytesIO()
+    
+    for quality in _VLM_QUALITY_STEPS:
+        encoded = encode_screenshot(image, image_format='JPEG', quality=quality, buffer=buffer)
+        if len(encoded.b64) * 3 // 4 <= max_bytes:
+            break
+    return encoded
+
+def dhash(image) -> int:
+    """64-bit difference hash of a PIL image (9x8 greyscale, adjacent pixel compare)"""
+    small = image.convert('L').resize((9, 8), Image.BILINEAR)
+    
+    if NUMPY_AVAILABLE:
+        arr = np.asarray(small, dtype=np.int16)
+        bits = np.packbits(arr[:, 1:] > arr[:, :-1])
+        return int.from_bytes(bits.tobytes(), 'big')
+    
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (right > left)
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+class ScreenshotGrabber:
+    """
+    Captures desktop screenshots on a background thread
+    Requests within min_interval of the last capture share its encoded result,
+    so concurrent dashboard polls cost one grab and one encode
+    """
+    
+    def __init__(self, grab_func=None, min_interval: float = 0.2):
+        self._grab_func = grab_func
+        self.min_interval = min_interval
+        
+        self._condition = threading.Condition()
+        self._pending = set()
+        self._latest = {}  # (format, quality) -> (EncodedImage, captured_at)
+        self._last_error = None  # (exception, failed_at)
+        self._last_grab = 0.0
+        self._worker = None
+    
+    def get(self, image_format: str = 'PNG', quality: int = 75, timeout: float = 10.0) -> EncodedImage:
+        """Return a screenshot no older than min_interval, capturing one if needed"""
+        key = (image_format.upper(), quality)
+        requested_at = time.monotonic()
+        
+        with self._condition:
+            entry = self._latest.get(key)
+            if entry is not None and requested_at - entry[1] < self.min_interval:
+                return entry[0]
+            
+            self._pending.add(key)
+            self._ensure_worker()
+            self._condition.notify_all()
+            
+            deadline = requested_at + timeout
+            while True:
+                entry = self._latest.get(key)
+                if entry is not None and entry[1] >= requested_at:
+                    return entry[0]
+                if self._last_error is not None and self._last_error[1] >= requested_at:
+                    raise self._last_error[0]
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Screenshot not captured within {timeout}s")
+                self._condition.wait(remaining)
+    
+    def _ensure_worker(self):
+        """Start the capture thread on first use (caller holds the condition)"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="ScreenshotGrabber", daemon=True)
+            self._worker.start()
+    
+    def _grab(self):
+        if self._grab_func is None:
+            if not IMAGEGRAB_AVAILABLE:
+                raise RuntimeError("PIL.ImageGrab is not available on this system")
+            self._grab_func = ImageGrab.grab
+        return self._grab_func()
+    
+    def _run(self):
+        """Capture loop: wait for requests, grab once, encode each requested format"""
+        
+        buffer = io.BytesIO()
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                keys, self._pending = self._pending, set()
+            
+            delay = self.min_interval - (time.monotonic() - self._last_grab)
+            if delay > 0:
+                time.sleep(delay)
+            
+            results = {}
+            error = None
+            captured_at = time.monotonic()
+            try:
+                image = self._grab()
+                self._last_grab = captured_at
+                for image_format, quality in keys:
+                    encoded = encode_screenshot(image, image_format, quality, buffer=buffer)
+                    results[(image_format, quality)] = (encoded, captured_at)
+            except Exception as e:
+                logger.error(f"Screenshot capture failed: {e}")
+                error = (e, captured_at)
+            
+            with self._condition:
+                self._latest.update(results)
+                if error is not None:
+                    self._last_error = error
+                self._condition.notify_all()
+
 class PerformanceMonitor:
     """Simple performance monitoring utility"""
     
@@ -428,7 +666,7 @@ class PerformanceMonitor:
     
     def start(self):
         """Start performance monitoring"""
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         self.checkpoints = []
     
     def checkpoint(self, name: str):
@@ -436,12 +674,11 @@ class PerformanceMonitor:
         if self.start_time is None:
             self.start()
         
-        current_time = time.time()
-        elapsed = current_time - self.start_time
+        elapsed = time.perf_counter() - self.start_time
         
         self.checkpoints.append({
             'name': name,
-            'timestamp': current_time,
+            'timestamp': time.time(),
             'elapsed': elapsed
         })
     
@@ -450,7 +687,7 @@ class PerformanceMonitor:
         if self.start_time is None:
             return {'error': 'Monitoring not started'}
         
-        total_time = time.time() - self.start_time
+        total_time = time.perf_counter() - self.start_time
         
         return {
             'total_time': total_time,
@@ -461,3 +698,6 @@ class PerformanceMonitor:
 # Global performance monitor instance
 perf_monitor = PerformanceMonitor()
 
+# Shared screenshot source for the web endpoints
+screenshot_grabber = ScreenshotGrabber()
+
@@ -2,12 +2,36 @@
 AI Vision analyzer using OpenAI's GPT-4o for screenshot analysis
 """
 
-import json
+import io
 import os
-from openai import OpenAI
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from openai import OpenAI, APITimeoutError
+from PIL import Image
 from logger_config import setup_logger
+from utils import EncodedImage, encode_screenshot, encode_for_vlm
+import fast_json
+
+# Quality used when a timed-out request is retried with a smaller upload
+_RETRY_JPEG_QUALITY = 50
+
+def image_data_url(screenshot_b64):
+    """Build a data: URL, detecting JPEG vs PNG from the base64 signature"""
+    mime_type = 'image/jpeg' if screenshot_b64.startswith('/9j/') else 'image/png'
+    return f"data:{mime_type};base64,{screenshot_b64}"
+
+def recompress_b64(screenshot_b64, quality=_RETRY_JPEG_QUALITY):
+    """Re-encode a base64 screenshot as a lower-quality JPEG"""
+    with Image.open(io.BytesIO(EncodedImage(b64=screenshot_b64).data)) as img:
+        return encode_screenshot(img, image_format='JPEG', quality=quality).b64
 
 class VisionAnalyzer:
+    # Remote APIs need an encoded upload; a local-model subclass sets this and
+    # overrides analyze_screenshot_image to consume pixels directly
+    is_local = False
+    
     def __init__(self):
         self.logger = setup_logger(__name__)
         
@@ -15,34 +39,56 @@ class VisionAnalyzer:
         # do not change this unless explicitly requested by the user
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.model = "gpt-4o"
+        self.timeout = 30.0  # seconds; doubled for the single retry after a timeout
         
         self.logger.info("Vision analyzer initialized with GPT-4o")
     
-    def analyze_screenshot_for_coordinates(self, screenshot_b64, prompt):
-        """Analyze screenshot to find specific element coordinates"""
+    def _create_completion(self, content, max_tokens):
+        """
+        Send a JSON-mode chat request
+        On timeout, retry once with recompressed images and double the timeout
+        """
         try:
-            response = self.client.chat.completions.create(
+            return self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"}
-                            }
-                        ]
-                    }
-                ],
+                messages=[{"role": "user", "content": content}],
                 response_format={"type": "json_object"},
-                max_tokens=500
+                max_tokens=max_tokens,
+                timeout=self.timeout
             )
+        except (APITimeoutError, TimeoutError) as e:
+            self.logger.warning(f"Vision request timed out, retrying with smaller images: {e}")
+        
+        smaller = []
+        for part in content:
+            if part.get("type") == "image_url":
+                screenshot_b64 = part["image_url"]["url"].split(",", 1)[1]
+                part = {"type": "image_url", "image_url": {"url": image_data_url(recompress_b64(screenshot_b64))}}
+            smaller.append(part)
+        
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": smaller}],
+            response_format={"type": "json_object"},
+            max_tokens=max_tokens,
+            timeout=self.timeout * 2
+        )
+    
+    def analyze_screenshot_for_coordinates(self, screenshot_b64, prompt):
+        """Analyze screenshot to find specific element coordinates"""
+        try:
+            response = self._create_completion([
+                {
+                    "type": "text",
+                    "text": prompt
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {"url": image_data_url(screenshot_b64)}
+                }
+            ], max_tokens=500)
             
-            result = json.loads(response.choices[0].message.content)
+            result = fast_json.loads(response.choices[0].message.content)
             self.logger.debug(f"Vision API coordinate response: {result}")
             return result
             
@@ -50,31 +96,25 @@ class VisionAnalyzer:
             self.logger.error(f"Error analyzing screenshot for coordinates: {e}")
             return {"found": False, "confidence": 0.0}
     
+    def analyze_screenshot_image(self, image, prompt):
+        """Find element coordinates from a PIL image (encodes it for the remote API)"""
+        return self.analyze_screenshot_for_coordinates(encode_for_vlm(image).b64, prompt)
+    
     def analyze_screenshot_general(self, screenshot_b64, prompt):
         """General screenshot analysis"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"}
-                            }
-                        ]
-                    }
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=1000
-            )
+            response = self._create_completion([
+                {
+                    "type": "text",
+                    "text": prompt
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {"url": image_data_url(screenshot_b64)}
+                }
+            ], max_tokens=1000)
             
-            result = json.loads(response.choices[0].message.content)
+            result = fast_json.loads(response.choices[0].message.content)
             self.logger.debug(f"Vision API general response: {result}")
             return result
             
@@ -82,6 +122,46 @@ class VisionAnalyzer:
             self.logger.error(f"Error in general screenshot analysis: {e}")
             return {"error": str(e)}
     
+    def analyze_screenshots_batch(self, requests):
+        """
+        Analyze several (screenshot_b64, prompt) pairs in a single multi-image request
+        Returns one result dict per request, in order
+        """
+        if len(requests) == 1:
+            screenshot_b64, prompt = requests[0]
+            return [self.analyze_screenshot_general(screenshot_b64, prompt)]
+        
+        content = [{
+            "type": "text",
+            "text": (
+                f"You will be given {len(requests)} independent tasks, each followed by its own screenshot. "
+                "Answer every task separately using only its screenshot. "
+                'Return JSON: {"results": [<task 0 JSON>, <task 1 JSON>, ...]} in task order.'
+            )
+        }]
+        for index, (screenshot_b64, prompt) in enumerate(requests):
+            content.append({"type": "text", "text": f"Task {index}:\n{prompt}"})
+            content.append({
+                "type": "image_url",
+                "image_url": {"url": image_data_url(screenshot_b64)}
+            })
+        
+        try:
+            response = self._create_completion(content, max_tokens=1000 * len(requests))
+            
+            results = fast_json.loads(response.choices[0].message.content).get('results')
+            if isinstance(results, list) and len(results) == len(requests):
+                self.logger.debug(f"Vision API batch response for {len(requests)} requests")
+                return [r if isinstance(r, dict) else {"error": "invalid batch result"} for r in results]
+            
+            self.logger.warning("Malformed batch response - falling back to individual requests")
+            
+        except Exception as e:
+            self.logger.error(f"Error in batched screenshot analysis: {e}")
+        
+        return [self.analyze_screenshot_general(screenshot_b64, prompt)
+                for screenshot_b64, prompt in requests]
+    
     def identify_ui_elements(self, screenshot_b64):
         """Identify all interactive UI elements in a screenshot"""
         prompt = """
@@ -138,3 +218,84 @@ class VisionAnalyzer:
         """
         
         return self.analyze_screenshot_general(screenshot_b64, prompt)
+
+
+class InferenceServer:
+    """
+    Coalesces concurrent vision requests into micro-batches
+    A background thread drains up to max_batch_size queued requests, waiting at most
+    batch_timeout seconds for stragglers, and hands them to a pool of max_concurrent_batches
+    workers as one multi-image request per analyzer, so batches don't wait on each other's
+    round-trips; each request names its analyzer, so one rebuilt after a settings change
+    (new API key or model) is used straight away
+    """
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, max_batch_size=8, batch_timeout=0.05, max_concurrent_batches=4):
+        self.logger = setup_logger(__name__)
+        self.max_batch_size = max_batch_size
+        self.batch_timeout = batch_timeout
+        
+        self._queue = queue.Queue()
+        self._dispatch_pool = ThreadPoolExecutor(max_workers=max_concurrent_batches,
+                                                 thread_name_prefix="InferenceBatch")
+        self._worker = threading.Thread(target=self._run, name="InferenceServer", daemon=True)
+        self._worker.start()
+    
+    @classmethod
+    def get_instance(cls):
+        """Get the shared inference server, creating it on first use"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+    
+    def submit(self, screenshot_b64, prompt, analyzer):
+        """Queue a request for analyzer and return a Future resolving to the result"""
+        future = Future()
+        self._queue.put((screenshot_b64, prompt, analyzer, future))
+        return future
+    
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the batch is full or times out"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_timeout
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        return batch
+    
+    def _run(self):
+        """Dispatch loop executed on the background thread"""
+        while True:
+            # Requests are batched per analyzer, since each one has its own client and model
+            batches = {}
+            for screenshot_b64, prompt, analyzer, future in self._collect_batch():
+                if future.set_running_or_notify_cancel():
+                    batches.setdefault(analyzer, []).append((screenshot_b64, prompt, future))
+            
+            for analyzer, batch in batches.items():
+                self._dispatch_pool.submit(self._dispatch, analyzer, batch)
+    
+    def _dispatch(self, analyzer, batch):
+        """Send one analyzer's requests as a single batch and resolve their futures"""
+        try:
+            results = analyzer.analyze_screenshots_batch(
+                [(screenshot_b64, prompt) for screenshot_b64, prompt, _ in batch]
+            )
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            self.logger.error(f"Inference batch failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
@@ -11,6 +11,8 @@ from pathlib import Path
 
 from challenge_system import ChallengeSystem, SystemEvent
 from logger_config import setup_logger
+from fast_json import install_json_provider
+from utils import screenshot_grabber
 
 class WebInterface:
     """
@@ -23,10 +25,11 @@ class WebInterface:
         
         # Initialize Flask app
         self.app = Flask(__name__)
+        install_json_provider(self.app)
         self.app.secret_key = os.urandom(24)
         
         # Add event listener to challenge system
-        self.challenge_system.add_event_listener(self._handle_system_event)
+        self.challenge_system.add_event_listener(self._handle_system_event, safe=True)
         
         # Setup routes
         self._setup_routes()
@@ -297,21 +300,16 @@ class WebInterface:
         def get_screenshot():
             """Get current desktop screenshot"""
             try:
-                from PIL import ImageGrab
-                import base64
-                import io
-                
-                # Take screenshot
-                screenshot = ImageGrab.grab()
-                
-                # Convert to base64
-                buffer = io.BytesIO()
-                screenshot.save(buffer, format='PNG')
-                screenshot_b64 = base64.b64encode(buffer.getvalue()).decode()
+                # Captured on a background thread and shared by requests within 200ms;
+                # PNG by default, ?format=jpeg&quality=N gives a smaller preview
+                image = screenshot_grabber.get(
+                    image_format=request.args.get('format', 'PNG'),
+                    quality=request.args.get('quality', 75, type=int)
+                )
                 
                 return jsonify({
                     'success': True,
-                    'screenshot': f'data:image/png;base64,{screenshot_b64}',
+                    'screenshot': image.data_url,
                     'timestamp': time.time()
                 })
                 
@@ -354,7 +352,7 @@ class WebInterface:
             try:
                 count = request.args.get('count', 20, type=int)
                 status = self.challenge_system.get_system_status()
-                events = status.get('recent_events', [])[-count:]
+                events = status.get('recent_events', [])[:count]
                 
                 return jsonify({
                     'success': True,
@@ -434,6 +432,15 @@ class WebInterface:
                 log = logging.getLogger('werkzeug')
                 log.setLevel(logging.WARNING)
             
+            # Production WSGI server unless debugging
+            if not debug:
+                try:
+                    from waitress import serve
+                    serve(self.app, host=host, port=port, threads=8)
+                    return
+                except ImportError:
+                    self.logger.warning("waitress not installed - falling back to threaded Flask server")
+            
             # Run Flask app
             self.app.run(
                 host=host,
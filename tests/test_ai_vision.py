@@ -0,0 +1,255 @@
+# ruff: noqa: E402
+import base64
+import io
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+from PIL import Image
+import pytest
+
+import ai_vision
+import utils
+from ai_vision import AIVision
+
+
+class FakeServer:
+    def __init__(self, response=None):
+        self.calls = []
+        self.response = response if response is not None else {"ok": True}
+
+    def submit(self, screenshot_b64, prompt, analyzer):
+        self.calls.append((screenshot_b64, prompt))
+        future = Future()
+        future.set_result(self.response)
+        return future
+
+
+@pytest.fixture
+def vision(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr(ai_vision, "VisionAnalyzer", lambda: None)
+    monkeypatch.setattr(ai_vision.InferenceServer, "get_instance", lambda: server)
+    instance = AIVision()
+    instance.server = server
+    return instance
+
+
+def make_png_b64(color, size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_analyze_caches_same_screenshot_and_prompt(vision):
+    screenshot = make_png_b64((10, 20, 30))
+
+    vision._analyze(screenshot, "prompt")
+    vision._analyze(screenshot, "prompt")
+    vision._analyze(screenshot, "other prompt")
+
+    assert len(vision.server.calls) == 2
+
+
+def test_static_prompts_use_integer_cache_keys(vision):
+    screenshot = make_png_b64((10, 20, 30))
+
+    vision._analyze(screenshot, ai_vision._PROMPT_ERRORS)
+    vision._analyze(screenshot, "dynamic prompt")
+
+    prompt_keys = [key[1] for key in vision._response_cache]
+    assert prompt_keys[0] == ai_vision.PROMPT_IDS[ai_vision._PROMPT_ERRORS]
+    assert isinstance(prompt_keys[1], bytes)
+
+
+def test_analyze_does_not_cache_errors(vision):
+    vision.server.response = {"error": "boom"}
+    screenshot = make_png_b64((10, 20, 30))
+
+    vision._analyze(screenshot, "prompt")
+    vision._analyze(screenshot, "prompt")
+
+    assert len(vision.server.calls) == 2
+
+
+def test_perceptual_cache_only_serves_static_prompts(vision):
+    # Two PNGs that differ in one pixel share a dHash but not a content hash
+    first = make_png_b64((10, 20, 30))
+    image = Image.new("RGB", (64, 48), (10, 20, 30))
+    image.putpixel((5, 5), (11, 20, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    second = base64.b64encode(buffer.getvalue()).decode()
+
+    vision._analyze(first, ai_vision._PROMPT_ERRORS)
+    vision._analyze(second, ai_vision._PROMPT_ERRORS)
+    assert len(vision.server.calls) == 1
+
+    vision._analyze(first, "dynamic prompt")
+    vision._analyze(second, "dynamic prompt")
+    assert len(vision.server.calls) == 3
+
+
+def make_gradient_png():
+    buffer = io.BytesIO()
+    Image.linear_gradient("L").resize((64, 48)).rotate(90).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_phash_is_stable_and_distinguishes_images():
+    flat = base64.b64decode(make_png_b64((0, 0, 0)))
+    gradient = make_gradient_png()
+
+    assert AIVision._phash(flat) == AIVision._phash(flat)
+    assert AIVision._phash(flat) != AIVision._phash(gradient)
+
+
+def test_phash_numpy_matches_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    gradient = make_gradient_png()
+
+    vectorised = AIVision._phash(gradient)
+    monkeypatch.setattr(utils, "NUMPY_AVAILABLE", False)
+
+    assert AIVision._phash(gradient) == vectorised
+
+
+def test_find_element_smart_cache_key_uses_full_screenshot(vision):
+    vision.server.response = {"found": True, "element": {"x": 5, "y": 6}}
+    first = make_png_b64((255, 0, 0))
+    second = make_png_b64((0, 0, 255))
+
+    vision.find_element_smart(first, "button")
+    vision.find_element_smart(second, "button")
+
+    assert len(vision.element_cache) == 2
+
+
+def test_cache_store_evicts_least_recently_used(vision):
+    vision.cache_max_size = 2
+    vision._cache_store(vision.element_cache, "a", 1)
+    vision._cache_store(vision.element_cache, "b", 2)
+    vision._cache_lookup(vision.element_cache, "a")
+    vision._cache_store(vision.element_cache, "c", 3)
+
+    assert list(vision.element_cache) == ["a", "c"]
+
+
+def test_cache_sweep_drops_expired_entries(vision):
+    vision._cache_store(vision.element_cache, "old", 1)
+    vision.element_cache["old"] = (1, 0.0)
+    vision._last_sweep = 0.0
+    vision._cache_store(vision.element_cache, "new", 2)
+
+    assert list(vision.element_cache) == ["new"]
+
+
+def test_analyze_all_runs_every_analysis(vision):
+    screenshot = make_png_b64((1, 2, 3))
+
+    results = vision.analyze_all(screenshot, goal="open menu")
+
+    assert set(results) == {
+        "desktop_state", "errors", "loading", "form_fields", "text_content", "next_action"
+    }
+    assert len(vision.server.calls) == 6
+
+
+def test_analyze_all_async_matches_sync(vision):
+    import asyncio
+
+    screenshot = make_png_b64((1, 2, 3))
+    results = asyncio.run(vision.analyze_all_async(screenshot))
+
+    assert "next_action" not in results
+    assert results["errors"] == {"ok": True}
+
+
+def test_verify_action_result_skips_vlm_when_unchanged(vision):
+    before = make_png_b64((9, 9, 9))
+    # Same pixels, different encoding
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (9, 9, 9)).save(buffer, format="PNG", compress_level=1)
+
+    result = vision.verify_action_result(before, buffer.getvalue(), "click OK")
+
+    assert result["changes_detected"] is False
+    assert result["needs_retry"] is True
+    assert vision.server.calls == []
+
+
+def test_verify_action_result_calls_vlm_when_changed(vision):
+    vision.verify_action_result(make_png_b64((9, 9, 9)), make_png_b64((9, 9, 10)), "click OK")
+
+    assert len(vision.server.calls) == 1
+
+
+def test_extract_text_content_crops_region_and_offsets_coordinates(vision):
+    vision.server.response = {"text_elements": [{"text": "OK", "x": 5, "y": 7}]}
+    screenshot = make_png_b64((200, 200, 200), size=(100, 80))
+
+    result = vision.extract_text_content(screenshot, region=(10, 20, 30, 40))
+
+    sent_b64 = vision.server.calls[0][0]
+    with Image.open(io.BytesIO(base64.b64decode(sent_b64))) as sent:
+        assert sent.size == (30, 40)
+    assert result["text_elements"][0]["x"] == 15
+    assert result["text_elements"][0]["y"] == 27
+    sent_prompt = vision.server.calls[0][1]
+    assert "{{" not in sent_prompt
+    assert "this screenshot.\n    \n    Return JSON" in sent_prompt
+
+    # A cached repeat must not be offset twice
+    again = vision.extract_text_content(screenshot, region=(10, 20, 30, 40))
+    assert again["text_elements"][0]["x"] == 15
+
+
+def test_detected_element_from_dict_fills_defaults_and_ignores_extras():
+    element = ai_vision.DetectedElement.from_dict(
+        {"x": 4, "y": 8, "label": "extra"}, description="fallback", clickable=True
+    )
+
+    assert (element.x, element.y) == (4, 8)
+    assert element.description == "fallback"
+    assert element.clickable is True
+    assert element.element_type == "unknown"
+
+
+def test_analyze_desktop_state_returns_immutable_state(vision):
+    import dataclasses
+
+    vision.server.response = {"application_name": "KiCad", "elements": [{"x": 1}, {"x": 2}]}
+    state = vision.analyze_desktop_state(make_png_b64((3, 3, 3)))
+
+    assert isinstance(state.elements, tuple)
+    assert [e.x for e in state.elements] == [1, 2]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        state.elements[0].x = 5
+
+
+def test_find_element_smart_uses_template_match_on_repeat(vision, monkeypatch):
+    pytest.importorskip("cv2")
+
+    def screen_with_button(left, top):
+        img = Image.new("RGB", (200, 150), (255, 255, 255))
+        button = Image.linear_gradient("L").resize((40, 20)).convert("RGB")
+        img.paste(button, (left, top))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    vision.server.response = {
+        "found": True,
+        "element": {"x": 30, "y": 20, "width": 40, "height": 20, "confidence": 0.8},
+    }
+    first = vision.find_element_smart(screen_with_button(10, 10), "Submit button")
+    assert first.x == 30
+
+    moved = vision.find_element_smart(screen_with_button(110, 90), "Submit button")
+
+    assert len(vision.server.calls) == 1
+    assert (moved.x, moved.y) == (130, 100)
+    assert moved.confidence >= 0.9
@@ -0,0 +1,159 @@
+# ruff: noqa: E402
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+from PIL import Image
+import pytest
+
+import automation_engine
+
+
+class FakeVision:
+    is_local = False
+
+    def __init__(self):
+        self.calls = 0
+        self.responses = []
+
+    def analyze_screenshot_for_coordinates(self, screenshot_b64, prompt):
+        self.calls += 1
+        return self.responses.pop(0) if self.responses else {"found": False}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(automation_engine, "_display_setup_done", True)
+    monkeypatch.setattr(automation_engine, "VisionAnalyzer", FakeVision)
+    return automation_engine.AutomationEngine()
+
+
+def blank_screen():
+    return Image.new("RGB", (800, 600), "white")
+
+
+def test_unchanged_frame_skips_vision_after_miss(engine):
+    screen = blank_screen()
+    assert engine.find_element_coordinates("OK button", screenshot=screen) == (None, None)
+    assert engine.find_element_coordinates("OK button", screenshot=screen.copy()) == (None, None)
+    assert engine.vision.calls == 1
+
+
+def test_small_change_after_miss_calls_vision_again(engine):
+    screen = blank_screen()
+    engine.find_element_coordinates("OK button", screenshot=screen)
+
+    # A button-sized change barely moves a whole-screen perceptual hash
+    changed = screen.copy()
+    changed.paste((0, 0, 0), (385, 290, 415, 305))
+    engine.vision.responses.append({"found": True, "x": 400, "y": 297, "confidence": 0.9})
+
+    assert engine.find_element_coordinates("OK button", screenshot=changed) == (400, 297)
+    assert engine.vision.calls == 2
+
+
+def test_recorded_miss_expires(engine):
+    screen = blank_screen()
+    engine.find_element_coordinates("OK button", screenshot=screen)
+    engine.miss_ttl = 0
+
+    engine.find_element_coordinates("OK button", screenshot=screen)
+    assert engine.vision.calls == 2
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.clicks = []
+
+    def move(self, x, y, duration=0.0):
+        self.position = (x, y)
+
+    def click(self):
+        self.clicks.append(self.position)
+
+
+def test_capture_and_encode_timestamps_before_capture(engine, monkeypatch):
+    def slow_screenshot(save_path=None, region=None):
+        time.sleep(0.3)
+        return blank_screen()
+
+    monkeypatch.setattr(engine, "take_screenshot", slow_screenshot)
+    started = time.monotonic()
+    captured_at, _ = engine._capture_and_encode()
+    assert captured_at - started < 0.1
+
+
+def test_click_retry_uses_frame_prefetched_during_backoff(engine, monkeypatch):
+    shots = []
+
+    def take_screenshot(save_path=None, region=None):
+        shots.append(threading.current_thread().name)
+        return Image.new("RGB", (800, 600), (len(shots), 0, 0))
+
+    monkeypatch.setattr(engine, "take_screenshot", take_screenshot)
+    # Longer than prefetch_max_age, so a frame captured when the miss happened would be stale
+    monkeypatch.setattr(engine, "_backoff", lambda attempt: 0.3)
+    engine._backend = FakeBackend()
+    engine.vision.responses = [{"found": False}, {"found": True, "x": 10, "y": 20, "confidence": 0.9}]
+
+    assert engine.click_element("OK button", max_attempts=2) is True
+    assert engine._backend.clicks == [(10, 20)]
+    assert len(shots) == 2
+    assert shots[1].startswith("screenshot-prefetch")
+
+
+def test_padded_region_stays_on_screen(engine, monkeypatch):
+    monkeypatch.setattr(engine, "_screen_size", lambda: (1920, 1080))
+
+    assert engine._padded_region(10, 10) == (0, 0, 400, 400)
+    assert engine._padded_region(1900, 1070) == (1520, 680, 400, 400)
+
+
+def test_region_miss_forgets_element_region(engine, monkeypatch):
+    regions = []
+
+    def take_screenshot(save_path=None, region=None):
+        regions.append(region)
+        return Image.new("RGB", (800, 600), (len(regions), 0, 0))
+
+    monkeypatch.setattr(engine, "take_screenshot", take_screenshot)
+    monkeypatch.setattr(engine, "_backoff", lambda attempt: 0)
+    engine._element_regions["OK button"] = (0, 0, 400, 400)
+
+    assert engine.click_element("OK button", max_attempts=2) is False
+    assert "OK button" not in engine._element_regions
+    # Only the first attempt searches the stale region before the whole screen
+    assert regions == [(0, 0, 400, 400), None, None]
+    assert engine.vision.calls == 3
+
+
+def test_wait_for_element_returns_at_timeout_while_lookups_are_slow(engine, monkeypatch):
+    def slow_lookup(description, screenshot=None, region=None, abandoned=None):
+        time.sleep(1)
+        return None, None
+
+    monkeypatch.setattr(engine, "take_screenshot", lambda save_path=None, region=None: blank_screen())
+    monkeypatch.setattr(engine, "find_element_coordinates", slow_lookup)
+
+    started = time.monotonic()
+    assert engine.wait_for_element("OK button", timeout=0.3, check_interval=0.05) is False
+    # Every lookup slot is taken, so the wait must not block on the semaphore past the timeout
+    assert time.monotonic() - started < 0.8
+
+
+def test_wait_for_element_works_inside_a_running_loop(engine, monkeypatch):
+    monkeypatch.setattr(engine, "take_screenshot", lambda save_path=None, region=None: blank_screen())
+    monkeypatch.setattr(engine, "find_element_coordinates",
+                        lambda description, screenshot=None, region=None, abandoned=None: (5, 5))
+
+    async def caller():
+        return engine.wait_for_element("OK button", timeout=2)
+
+    assert asyncio.run(caller()) is True
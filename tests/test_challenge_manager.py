@@ -7,6 +7,7 @@ MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
 sys.path.insert(0, str(MODULE_PATH))
 
 from challenge_manager import ChallengeManager
+from challenges.base_challenge import ChallengeStatus
 
 
 def test_log_challenge_event_and_overall_progress(monkeypatch):
@@ -14,10 +15,12 @@ def test_log_challenge_event_and_overall_progress(monkeypatch):
         self.challenges = {}
 
     monkeypatch.setattr(ChallengeManager, "_load_challenges", noop_load)
-    cm = ChallengeManager()
+    cm = ChallengeManager(db_path=":memory:")
 
-    dummy = SimpleNamespace(status="completed")
+    dummy = SimpleNamespace(status=ChallengeStatus.COMPLETED)
     cm.challenges = {1: dummy}
+    cm._refresh_levels()
+    cm._set_completed(1, True)
 
     cm._log_challenge_event(1, "test", "msg")
     assert cm.challenge_logs[0]["event_type"] == "test"
@@ -25,3 +28,90 @@ def test_log_challenge_event_and_overall_progress(monkeypatch):
     progress = cm.get_overall_progress()
     assert progress["total_challenges"] == 1
     assert progress["completed_challenges"] == 1
+    assert progress["current_level"] == 2
+
+    cm._set_completed(1, False)
+    assert cm.get_overall_progress()["current_level"] == 1
+
+
+def test_challenges_are_imported_on_first_use(monkeypatch):
+    monkeypatch.chdir(MODULE_PATH)
+    for name in [m for m in sys.modules if m.startswith("challenges.level")]:
+        monkeypatch.delitem(sys.modules, name)
+
+    cm = ChallengeManager(db_path=":memory:")
+    challenges = cm.get_all_challenges()
+
+    assert [c["level"] for c in challenges] == list(range(1, 8))
+    assert challenges[0]["name"] == "System Detection"
+    assert challenges[2]["prerequisites"] == [1, 2]
+    assert challenges[0]["status"] == "not_started"
+    assert cm.challenges == {}
+    assert "challenges.level1_system_detection" not in sys.modules
+
+    status = cm.get_challenge_status(1)
+
+    assert status["name"] == "System Detection"
+    assert status["status"] == "not_started"
+    assert list(cm.challenges) == [1]
+
+
+def test_challenge_logs_are_bounded(monkeypatch):
+    monkeypatch.setattr(ChallengeManager, "_load_challenges", lambda self: None)
+    cm = ChallengeManager(db_path=":memory:")
+
+    for i in range(1005):
+        cm._log_challenge_event(1, "test", str(i))
+
+    assert len(cm.challenge_logs) == 1000
+    assert cm.challenge_logs[0]["message"] == "5"
+    assert [log["message"] for log in cm.get_recent_logs(3)] == ["1002", "1003", "1004"]
+
+
+def test_state_and_logs_persist_across_managers(monkeypatch, tmp_path):
+    monkeypatch.setattr(ChallengeManager, "_load_challenges", lambda self: None)
+    db_path = tmp_path / "challenges.db"
+
+    cm = ChallengeManager(db_path=str(db_path))
+    cm._log_challenge_event(1, "completed", "done")
+    cm._save_state(1, SimpleNamespace(
+        status=ChallengeStatus.COMPLETED, success_count=1, failure_count=0,
+        last_run=1.0, execution_time=2.0, last_error=None,
+    ))
+
+    reopened = ChallengeManager(db_path=str(db_path))
+
+    assert reopened.get_recent_logs()[0]["message"] == "done"
+    assert reopened._status(1) is ChallengeStatus.COMPLETED
+    assert reopened.get_overall_progress()["completed_challenges"] == 1
+
+
+def test_recent_logs_filter_by_level(monkeypatch):
+    monkeypatch.setattr(ChallengeManager, "_load_challenges", lambda self: None)
+    cm = ChallengeManager(db_path=":memory:")
+    for i in range(6):
+        cm._log_challenge_event(i % 2 + 1, "test", str(i))
+
+    assert [log["message"] for log in cm.get_recent_logs(2, level=2)] == ["3", "5"]
+    assert {log["level"] for log in cm.get_recent_logs(level=1)} == {1}
+    assert len(cm.get_recent_logs()) == 6
+
+
+def test_run_challenge_passes_prerequisite_results(monkeypatch):
+    monkeypatch.setattr(ChallengeManager, "_load_challenges", lambda self: None)
+    cm = ChallengeManager(db_path=":memory:")
+
+    class Dependent(SimpleNamespace):
+        def execute(self):
+            return self.prerequisite_results == {1: {"found": True}}
+
+    cm.challenges = {
+        1: SimpleNamespace(status=ChallengeStatus.COMPLETED, result={"found": True}),
+        2: Dependent(
+            name="dependent", prerequisites=[1], prerequisite_results={}, status=ChallengeStatus.NOT_STARTED,
+            success_count=0, failure_count=0, last_run=None, execution_time=0, last_error=None,
+        ),
+    }
+    cm._refresh_levels()
+
+    assert cm.run_challenge(2) is True
@@ -0,0 +1,77 @@
+# ruff: noqa: E402
+import sys
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+import pytest
+
+import challenge_system
+
+
+class FakeManager:
+    stop_event = None
+
+    def get_all_challenges(self):
+        return []
+
+    def get_overall_progress(self):
+        return {"completed": 0, "total": 0}
+
+    def get_challenge_status(self, level):
+        return None
+
+
+class FakeDetector:
+    def __init__(self):
+        self.scans = 0
+
+    def get_platform(self):
+        return {"system": "Linux"}
+
+    def clear_cache(self):
+        pass
+
+    def get_installed_software(self):
+        self.scans += 1
+        return [{"name": "Git", "executable": "git"}]
+
+
+@pytest.fixture
+def system(monkeypatch):
+    monkeypatch.setattr(challenge_system, "ChallengeManager", FakeManager)
+    monkeypatch.setattr(challenge_system, "AutomationEngine", lambda: None)
+    monkeypatch.setattr(challenge_system, "get_default_detector", FakeDetector)
+    instance = challenge_system.ChallengeSystem()
+    yield instance
+    instance.shutdown()
+
+
+def test_recent_events_are_newest_first(system):
+    for i in range(15):
+        system._emit_event("tick", {"i": i})
+
+    events = system.get_system_status()["recent_events"]
+    assert [event.data["i"] for event in events] == list(range(14, 4, -1))
+
+
+def test_system_metrics_are_empty_until_first_sample(system):
+    assert system.get_system_status()["system_metrics"] == {}
+
+    system._update_system_metrics()
+    metrics = system.get_system_status()["system_metrics"]
+    assert isinstance(metrics, challenge_system.MetricsSnapshot)
+    assert metrics.process_count > 0
+
+
+def test_status_memo_is_not_shared_with_callers(system):
+    first = system.get_system_status()
+    first["extra"] = True
+    first["state"] = "tampered"
+
+    second = system.get_system_status()
+    assert "extra" not in second
+    assert second["state"] == "idle"
+    # Nothing changed in between, so the memo was reused rather than rebuilt
+    assert system.system_detector.scans == 1
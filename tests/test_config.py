@@ -0,0 +1,33 @@
+# ruff: noqa: E402
+import sys
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+from config import validate_values
+
+
+def test_validate_values_accepts_valid_settings():
+    assert validate_values({
+        "openai_api_key": "sk-test",
+        "automation_speed": 1.5,
+        "max_retries": 3,
+        "failsafe_enabled": False,
+        "log_level": "DEBUG",
+        "unknown_key": object(),
+    }) == []
+
+
+def test_validate_values_reports_each_problem():
+    issues = validate_values({
+        "openai_api_key": "bad-key",
+        "automation_speed": 50,
+        "max_retries": True,
+        "log_level": "VERBOSE",
+    })
+
+    assert 'OpenAI API key must start with "sk-"' in issues
+    assert "Automation speed must be between 0.1 and 10.0" in issues
+    assert "Max retries has an invalid type" in issues
+    assert any(issue.startswith("Log level must be one of") for issue in issues)
@@ -0,0 +1,43 @@
+# ruff: noqa: E402
+import sys
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+from flask import Flask, jsonify
+import pytest
+
+import fast_json
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_loads_and_dumps_round_trip(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    monkeypatch.setattr(fast_json, "ORJSON_AVAILABLE", use_orjson)
+
+    data = {"elements": [{"x": 1, "y": 2.5, "clickable": True}], "title": None}
+
+    assert fast_json.loads(fast_json.dumps(data)) == data
+    assert fast_json.loads(fast_json.dumps(data).encode()) == data
+    assert "\n  " in fast_json.dumps(data, indent=True)
+
+
+def test_install_json_provider_serializes_responses():
+    pytest.importorskip("orjson")
+    app = fast_json.install_json_provider(Flask(__name__))
+    assert isinstance(app.json, fast_json.orjson_provider_class())
+
+    with app.app_context():
+        response = jsonify({"b": 1, "a": {2: "x"}})
+
+    assert response.get_json() == {"a": {"2": "x"}, "b": 1}
+
+
+def test_fast_json_does_not_import_flask():
+    import subprocess
+
+    code = f"import sys; sys.path.insert(0, {str(MODULE_PATH)!r}); import fast_json; print('flask' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
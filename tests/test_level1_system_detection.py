@@ -0,0 +1,78 @@
+# ruff: noqa: E402
+import sys
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+from challenges import level1_system_detection as level1
+
+
+class FakeDetector:
+    def __init__(self):
+        self.scans = 0
+        self.kicad_installed = False
+
+    def get_platform(self):
+        return {"system": "Linux", "release": "6", "version": "1", "machine": "x86_64", "processor": ""}
+
+    def get_system_paths(self):
+        return {"home": str(Path.home()), "temp": "/tmp"}
+
+    def get_installed_software(self):
+        self.scans += 1
+        return [{"name": "Git", "executable": "git", "details": "found_in_path"}]
+
+    def is_software_installed(self, name, executable=None):
+        if name == "KiCad":
+            return self.kicad_installed, "found_in_path" if self.kicad_installed else "not_found"
+        return True, "found_in_path"
+
+    def is_process_running(self, name):
+        return False
+
+
+def make_challenge(monkeypatch, tmp_path, detector):
+    monkeypatch.setattr(level1, "detection_report_path", lambda: tmp_path / "detection_report.json")
+    challenge = level1.Level1SystemDetection()
+    challenge.detector = detector
+    return challenge
+
+
+def test_detection_report_is_reused_from_disk(monkeypatch, tmp_path):
+    detector = FakeDetector()
+
+    first = make_challenge(monkeypatch, tmp_path, detector)
+    assert first.execute() is True
+    assert not first.report_from_cache
+
+    second = make_challenge(monkeypatch, tmp_path, detector)
+    assert second.execute() is True
+    assert second.report_from_cache
+    assert second.installed_software == first.installed_software
+    assert detector.scans == 1
+
+
+def test_detection_report_is_ignored_after_kicad_install(monkeypatch, tmp_path):
+    detector = FakeDetector()
+    first = make_challenge(monkeypatch, tmp_path, detector)
+    first.execute()
+    assert first.kicad_installed is False
+
+    detector.kicad_installed = True
+    challenge = make_challenge(monkeypatch, tmp_path, detector)
+    assert challenge.execute() is True
+    assert not challenge.report_from_cache
+    assert challenge.kicad_installed is True
+    assert detector.scans == 2
+
+
+def test_stale_detection_report_is_ignored(monkeypatch, tmp_path):
+    detector = FakeDetector()
+    make_challenge(monkeypatch, tmp_path, detector).execute()
+
+    monkeypatch.setattr(level1, "REPORT_MAX_AGE", -1)
+    challenge = make_challenge(monkeypatch, tmp_path, detector)
+    assert challenge.execute() is True
+    assert not challenge.report_from_cache
+    assert detector.scans == 2
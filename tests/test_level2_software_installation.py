@@ -0,0 +1,95 @@
+# ruff: noqa: E402
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+import pytest
+
+from challenges import level2_software_installation as level2
+
+
+class FakeDetector:
+    def __init__(self, installed_after=1):
+        self.checks = 0
+        self.cache_clears = 0
+        self.installed_after = installed_after
+
+    def is_software_installed(self, name, executable=None):
+        self.checks += 1
+        if self.installed_after is not None and self.checks >= self.installed_after:
+            return True, "found_in_path"
+        return False, "not_found"
+
+    def clear_cache(self):
+        self.cache_clears += 1
+
+
+@pytest.fixture
+def challenge(monkeypatch):
+    detector = FakeDetector()
+    monkeypatch.setattr(level2, "get_default_detector", lambda: detector)
+    monkeypatch.setattr(level2, "SoftwareInstaller", lambda: None)
+    instance = level2.Level2SoftwareInstallation()
+    instance.initial_kicad_status = False
+    return instance
+
+
+def test_verify_installation_polls_until_kicad_is_registered(challenge, monkeypatch):
+    monkeypatch.setattr(level2.shutil, "which", lambda name: "/usr/bin/kicad")
+    challenge.detector.installed_after = 3
+
+    assert challenge._verify_installation() is True
+    assert challenge.detector.checks == 3
+    # Only the retries bypass the detector cache
+    assert challenge.detector.cache_clears == 2
+    assert challenge.result["kicad_exe"] == "/usr/bin/kicad"
+
+
+def test_poll_until_stops_at_first_success_or_at_timeout(challenge):
+    calls = []
+    assert challenge.poll_until(lambda: calls.append(1) or len(calls) == 2, max_wait=5) is True
+    assert len(calls) == 2
+
+    calls.clear()
+    assert challenge.poll_until(lambda: calls.append(1) and False, max_wait=0.2, initial=0.05) is False
+    assert 2 <= len(calls) <= 5
+
+
+def prepare_with(monkeypatch, free_gb, connectivity_delay):
+    """Fake the disk and network checks of _prepare_installation; returns the connectivity calls"""
+    calls = []
+
+    def check_internet_connectivity(**kwargs):
+        calls.append(threading.current_thread().name)
+        time.sleep(connectivity_delay)
+        return True
+
+    monkeypatch.setattr(level2, "check_internet_connectivity", check_internet_connectivity)
+    # The config module in this tree doesn't define these yet
+    monkeypatch.setattr(level2.config, "ensure_directories", lambda: time.sleep(0.2), raising=False)
+    monkeypatch.setattr(level2.config, "TEMP_DIR", "/tmp", raising=False)
+    monkeypatch.setattr(level2, "_cached_disk_usage",
+                        lambda path: SimpleNamespace(free=free_gb * 1024**3))
+    return calls
+
+
+def test_prepare_installation_checks_connectivity_in_background(challenge, monkeypatch):
+    calls = prepare_with(monkeypatch, free_gb=50, connectivity_delay=0.2)
+
+    started = time.monotonic()
+    assert challenge._prepare_installation() is True
+    assert time.monotonic() - started < 0.35
+    assert calls[0].startswith("net-check")
+
+
+def test_prepare_installation_does_not_wait_for_connectivity_on_low_disk(challenge, monkeypatch):
+    prepare_with(monkeypatch, free_gb=1, connectivity_delay=1)
+
+    started = time.monotonic()
+    assert challenge._prepare_installation() is False
+    assert time.monotonic() - started < 0.6
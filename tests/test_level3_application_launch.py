@@ -0,0 +1,321 @@
+# ruff: noqa: E402
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+import pytest
+
+import config
+from challenges import level3_application_launch as level3
+
+
+class FakeDetector:
+    def __init__(self):
+        self.running = True
+        self.running_after = 1  # the scan from which KiCad shows up as running
+        self.process_scans = 0
+        self.processes = []
+
+    def get_platform(self):
+        return {"system": "Linux", "release": "6", "version": "1", "machine": "x86_64", "processor": ""}
+
+    def is_process_running(self, name):
+        self.process_scans += 1
+        return self.running and self.process_scans >= self.running_after
+
+    def find_processes(self, name):
+        return list(self.processes)
+
+
+class FakeVision:
+    def __init__(self):
+        self.states = []
+        self.calls = 0
+
+    def detect_application_state(self, screenshot_b64, application_name):
+        self.calls += 1
+        return self.states.pop(0) if self.states else {"application_running": False}
+
+
+class FakeEngine:
+    def __init__(self):
+        self.vision = FakeVision()
+        self.screenshots = []
+        self.lookups = []
+        self.verifications = []
+        self.coordinates = {}
+        self.screen_state = (False, 0.0)
+
+    def take_screenshot(self):
+        self.screenshots.append(object())
+        return self.screenshots[-1]
+
+    def screenshot_to_base64(self, screenshot):
+        return "b64"
+
+    def find_element_coordinates(self, description, screenshot=None):
+        self.lookups.append((description, screenshot))
+        return self.coordinates.get(description, (None, None))
+
+    def find_elements_coordinates(self, descriptions, screenshot=None):
+        self.lookups.append((tuple(descriptions), screenshot))
+        return [self.coordinates.get(description, (None, None)) for description in descriptions]
+
+    def verify_screen_state(self, expected_description, screenshot=None):
+        self.verifications.append((expected_description, screenshot))
+        return self.screen_state
+
+
+class FakeProcess:
+    """A launched command that exits after exit_after seconds, or keeps running if None"""
+
+    def __init__(self, cmd, exit_after=None):
+        self.cmd = cmd
+        self.exit_after = exit_after
+        self.pid = 4321
+        self.returncode = None
+
+    def wait(self, timeout=None):
+        if self.exit_after is None or self.exit_after > timeout:
+            raise subprocess.TimeoutExpired(self.cmd, timeout)
+        self.returncode = 1
+        return self.returncode
+
+    def poll(self):
+        return self.returncode
+
+
+class FakeLauncher:
+    """Stands in for subprocess.Popen; commands in exit_after exit after that many seconds"""
+
+    def __init__(self):
+        self.calls = []
+        self.exit_after = {}
+
+    def __call__(self, cmd, **kwargs):
+        self.calls.append((tuple(cmd), kwargs))
+        return FakeProcess(cmd, self.exit_after.get(cmd[0]))
+
+
+@pytest.fixture
+def launcher(monkeypatch):
+    fake = FakeLauncher()
+    monkeypatch.setattr(level3.subprocess, "Popen", fake)
+    return fake
+
+
+@pytest.fixture
+def challenge(monkeypatch):
+    detector = FakeDetector()
+    monkeypatch.setattr(level3, "AutomationEngine", FakeEngine)
+    monkeypatch.setattr(level3, "get_default_detector", lambda: detector)
+    return level3.Level3ApplicationLaunch()
+
+
+def test_cleanup_reuses_last_steps_process_check(challenge, monkeypatch):
+    monkeypatch.setattr(challenge, "_check_responsiveness", lambda: True)
+    run_step = challenge.execute_step
+    monkeypatch.setattr(challenge, "execute_step", lambda n: run_step(n) if n == len(challenge.steps) - 1 else True)
+
+    # execute() runs post_challenge_cleanup straight after the last step
+    assert challenge.execute() is True
+    assert challenge.detector.process_scans == 1
+
+
+def test_responsiveness_step_does_not_fail_on_process_check(challenge, monkeypatch):
+    monkeypatch.setattr(challenge, "_check_responsiveness", lambda: True)
+    challenge.detector.running = False
+
+    assert challenge.execute_step(5) is True
+    assert challenge.detector.process_scans == 1
+
+
+def test_launcher_that_fails_slowly_falls_through_to_next_command(challenge, launcher, monkeypatch):
+    monkeypatch.setattr(level3, "_resolve_kicad_commands", lambda sysname: (("/opt/broken",), ("/opt/kicad",)))
+    # Failing launchers can take around a second to exit
+    launcher.exit_after["/opt/broken"] = 1.0
+
+    assert challenge._launch_kicad() is True
+    assert [cmd for cmd, _ in launcher.calls] == [("/opt/broken",), ("/opt/kicad",)]
+    assert challenge.kicad_process.cmd == ["/opt/kicad"]
+
+
+def test_load_wait_skips_vision_until_kicad_process_exists(challenge, monkeypatch):
+    # The config module in this tree doesn't define the wait time yet
+    monkeypatch.setattr(config, "KICAD_WAIT_TIME", 5, raising=False)
+    monkeypatch.setattr(challenge, "_kicad_window_visible", lambda: None)
+    challenge.detector.running_after = 2
+    challenge.automation.vision.states = [{"application_running": True, "application_state": "main_window"}]
+
+    assert challenge._wait_for_application_load() is True
+    assert challenge.detector.process_scans == 2
+    assert challenge.automation.vision.calls == 1
+
+
+def test_main_window_elements_are_found_in_one_vision_call(challenge):
+    challenge.automation.coordinates["KiCad title bar"] = (100, 10)
+
+    assert challenge._verify_main_window() is True
+    assert len(challenge.automation.screenshots) == 1
+    [(descriptions, screenshot)] = challenge.automation.lookups
+    assert "KiCad title bar" in descriptions and len(descriptions) == 5
+    assert screenshot is challenge.automation.screenshots[0]
+    assert challenge.automation.verifications == []
+
+
+class FakeKicadProcess:
+    def __init__(self, pid):
+        self.pid = pid
+        self.signals = []
+
+    def terminate(self):
+        self.signals.append("terminate")
+
+    def kill(self):
+        self.signals.append("kill")
+
+
+def test_close_existing_instances_kills_only_survivors(challenge, monkeypatch):
+    exiting, stuck = FakeKicadProcess(1), FakeKicadProcess(2)
+    challenge.detector.processes = [exiting, stuck]
+    waits = []
+
+    def wait_procs(procs, timeout=None, callback=None):
+        waits.append(([proc.pid for proc in procs], timeout))
+        return ([exiting], [stuck]) if len(waits) == 1 else (list(procs), [])
+
+    monkeypatch.setattr(level3.psutil, "wait_procs", wait_procs)
+
+    assert challenge._close_existing_instances() is True
+    assert exiting.signals == ["terminate"]
+    assert stuck.signals == ["terminate", "kill"]
+    assert waits == [([1, 2], 5), ([2], 2)]
+
+
+def test_launch_falls_back_to_desktop_automation(challenge, launcher, monkeypatch):
+    monkeypatch.setattr(level3, "_resolve_kicad_commands", lambda sysname: (("/opt/kicad",),))
+    launcher.exit_after["/opt/kicad"] = 0
+    fallbacks = []
+    monkeypatch.setattr(challenge, "_launch_via_automation", lambda: fallbacks.append(True) or True)
+
+    assert challenge._launch_kicad() is True
+    assert fallbacks == [True]
+    assert challenge.kicad_process is None
+
+
+def test_process_checks_within_ttl_share_one_scan(challenge):
+    assert challenge._kicad_running() is True
+    challenge.detector.running = False
+    assert challenge._kicad_running() is True
+    assert challenge.detector.process_scans == 1
+
+    # An answer older than max_age is not reused
+    assert challenge._kicad_running(max_age=0) is False
+    assert challenge.detector.process_scans == 2
+
+
+def test_kicad_is_launched_detached_with_output_discarded(challenge, launcher, monkeypatch):
+    monkeypatch.setattr(level3, "_resolve_kicad_commands", lambda sysname: (("/opt/kicad",),))
+
+    assert challenge._launch_kicad() is True
+    [(cmd, kwargs)] = launcher.calls
+    assert kwargs["stdout"] is subprocess.DEVNULL
+    assert kwargs["stderr"] is subprocess.DEVNULL
+    assert kwargs["stdin"] is subprocess.DEVNULL
+    assert kwargs["start_new_session"] is True
+
+
+def test_responsiveness_fallback_reuses_the_screenshot(challenge):
+    challenge.automation.screen_state = (True, 0.8)
+
+    assert challenge._check_responsiveness() is True
+    [screenshot] = challenge.automation.screenshots
+    assert challenge.automation.lookups == [("KiCad window title bar", screenshot)]
+    assert challenge.automation.verifications == [("KiCad is the active application window", screenshot)]
+
+
+def test_main_window_fallback_reuses_the_screenshot(challenge):
+    challenge.automation.screen_state = (True, 0.9)
+
+    assert challenge._verify_main_window() is True
+    [screenshot] = challenge.automation.screenshots
+    assert challenge.automation.verifications == [("KiCad application is open and visible", screenshot)]
+
+
+def test_resolve_kicad_commands_prunes_and_resolves(monkeypatch, tmp_path):
+    kicad, opener = tmp_path / "kicad", tmp_path / "open"
+    kicad.touch()
+    opener.touch()
+    monkeypatch.setattr(level3, "_resolved_commands", {})
+    monkeypatch.setattr(level3, "_KICAD_COMMANDS", {"linux": (
+        ("kicad",), (str(kicad),), (str(tmp_path / "missing"),), ("open", "-a", "KiCad"),
+    )})
+    on_path = {"kicad": str(kicad), "open": str(opener)}
+    monkeypatch.setattr(level3.shutil, "which", on_path.get)
+
+    # The PATH lookup and the absolute path are the same executable, so it is tried once
+    assert level3._resolve_kicad_commands("linux") == ((str(kicad),), (str(opener), "-a", "KiCad"))
+
+    on_path.clear()
+    assert level3._resolve_kicad_commands("linux") == ((str(kicad),), (str(opener), "-a", "KiCad"))
+
+
+def test_resolve_kicad_commands_retries_when_nothing_was_found(monkeypatch, tmp_path):
+    monkeypatch.setattr(level3, "_resolved_commands", {})
+    monkeypatch.setattr(level3, "_KICAD_COMMANDS", {"linux": (("kicad",),)})
+    on_path = {}
+    monkeypatch.setattr(level3.shutil, "which", on_path.get)
+    assert level3._resolve_kicad_commands("linux") == ()
+
+    # KiCad installed later in the session (e.g. by Level 2) is still picked up
+    (tmp_path / "kicad").touch()
+    on_path["kicad"] = str(tmp_path / "kicad")
+    assert level3._resolve_kicad_commands("linux") == ((str(tmp_path / "kicad"),),)
+
+
+def test_window_check_uses_xdotool_on_linux(challenge, monkeypatch):
+    runs = []
+
+    def run(cmd, **kwargs):
+        runs.append(cmd)
+        return SimpleNamespace(returncode=0 if len(runs) == 1 else 1)
+
+    monkeypatch.setattr(level3, "XDOTOOL_PATH", "/usr/bin/xdotool")
+    monkeypatch.setattr(level3.subprocess, "run", run)
+
+    assert challenge._kicad_window_visible() is True
+    assert challenge._kicad_window_visible() is False
+    assert runs[0] == ["/usr/bin/xdotool", "search", "--onlyvisible", "--name", "KiCad"]
+
+
+def test_window_check_uses_pygetwindow_on_windows(challenge, monkeypatch):
+    challenge._sysname = "windows"
+    monkeypatch.setattr(level3, "PYGETWINDOW_AVAILABLE", True)
+    monkeypatch.setattr(level3, "pygetwindow", SimpleNamespace(getWindowsWithTitle=lambda title: [title]),
+                        raising=False)
+
+    assert challenge._kicad_window_visible() is True
+
+
+def test_window_check_is_unknown_without_a_native_tool(challenge, monkeypatch):
+    monkeypatch.setattr(level3, "XDOTOOL_PATH", None)
+    assert challenge._kicad_window_visible() is None
+
+    def broken_run(cmd, **kwargs):
+        raise OSError("xdotool crashed")
+
+    monkeypatch.setattr(level3, "XDOTOOL_PATH", "/usr/bin/xdotool")
+    monkeypatch.setattr(level3.subprocess, "run", broken_run)
+    assert challenge._kicad_window_visible() is None
+
+
+def test_load_wait_needs_no_vision_when_window_is_listed(challenge, monkeypatch):
+    monkeypatch.setattr(config, "KICAD_WAIT_TIME", 5, raising=False)
+    monkeypatch.setattr(challenge, "_kicad_window_visible", lambda: True)
+
+    assert challenge._wait_for_application_load() is True
+    assert challenge.automation.vision.calls == 0
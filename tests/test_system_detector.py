@@ -5,6 +5,11 @@ import sys
 MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
 sys.path.insert(0, str(MODULE_PATH))
 
+import os
+
+import psutil
+
+import system_detector
 from system_detector import SystemDetector
 
 
@@ -19,3 +24,64 @@ def test_get_system_paths_has_home_and_temp():
 def test_is_process_running_self():
     detector = SystemDetector()
     assert detector.is_process_running("python") is True
+
+
+def test_get_platform_is_read_once_and_copied():
+    detector = SystemDetector()
+    first = detector.get_platform()
+    first["system"] = "changed"
+
+    assert SystemDetector().get_platform()["system"] != "changed"
+    assert system_detector._platform_info.cache_info().currsize == 1
+
+
+def test_is_software_installed_caches_until_cleared(monkeypatch):
+    detector = SystemDetector()
+    calls = []
+
+    def fake_detect(name, executable):
+        calls.append(name)
+        return False, "not_found"
+
+    monkeypatch.setattr(detector, "_detect_software", fake_detect)
+    assert detector.is_software_installed("Foo") == (False, "not_found")
+    assert detector.is_software_installed("Foo") == (False, "not_found")
+    assert calls == ["Foo"]
+
+    detector.clear_cache()
+    detector.is_software_installed("Foo")
+    assert calls == ["Foo", "Foo"]
+
+
+def test_is_software_installed_cache_expires(monkeypatch):
+    detector = SystemDetector()
+    calls = []
+
+    def fake_detect(name, executable):
+        calls.append(name)
+        return False, "not_found"
+
+    monkeypatch.setattr(detector, "_detect_software", fake_detect)
+    detector.installed_cache_ttl = 0
+    detector.is_software_installed("Foo")
+    detector.is_software_installed("Foo")
+    assert calls == ["Foo", "Foo"]
+
+
+def test_default_detector_is_shared():
+    assert system_detector.get_default_detector() is system_detector.get_default_detector()
+
+
+def test_extract_version_from_details():
+    assert system_detector.extract_version("found_in_registry (version 8.0.4)") == "8.0.4"
+    assert system_detector.extract_version(r"found_in_directory: C:\Program Files\KiCad\7.0\bin") == "7.0"
+    assert system_detector.extract_version("found_in_path") is None
+    assert system_detector.extract_version(None) is None
+
+
+def test_find_processes_matches_by_name():
+    detector = system_detector.SystemDetector()
+    own_name = psutil.Process().name()
+    pids = [proc.pid for proc in detector.find_processes(own_name[:5].upper())]
+    assert os.getpid() in pids
+    assert detector.find_processes("no-such-process-name-xyz") == []
@@ -29,6 +29,13 @@ from utils import (
     find_available_port,
     get_process_by_name,
     kill_process_tree,
+    EncodedImage,
+    encode_screenshot,
+    encode_for_vlm,
+    dhash,
+    hamming_distance,
+    ScreenshotGrabber,
+    check_internet_connectivity,
 )
 
 import time
@@ -193,3 +200,123 @@ def test_kill_process_tree():
     proc = subprocess.Popen(["sleep", "1"])
     assert kill_process_tree(proc.pid)
     assert not psutil.pid_exists(proc.pid)
+
+
+def test_encoded_image_round_trip():
+    from_bytes = EncodedImage(b"\x89PNG data")
+    from_b64 = EncodedImage.coerce(from_bytes.b64)
+
+    assert from_b64.data == b"\x89PNG data"
+    assert EncodedImage.coerce(from_bytes) is from_bytes
+    assert from_bytes.data_url.startswith("data:image/png;base64,")
+
+
+def test_encode_screenshot_png_and_jpeg():
+    from PIL import Image
+
+    image = Image.new("RGBA", (32, 32), (1, 2, 3, 255))
+
+    png = encode_screenshot(image)
+    assert png.data.startswith(b"\x89PNG")
+    assert png.data_url.startswith("data:image/png;base64,")
+
+    jpeg = encode_screenshot(image, image_format="jpeg", quality=50)
+    assert jpeg.data.startswith(b"\xff\xd8")
+    assert jpeg.mime_type == "image/jpeg"
+
+
+def test_encode_for_vlm_reuses_buffer_without_mixing_results():
+    from PIL import Image
+
+    small = encode_for_vlm(Image.new("RGB", (8, 8), (0, 0, 0)))
+    large = encode_for_vlm(Image.linear_gradient("L").convert("RGB"))
+    again = encode_for_vlm(Image.new("RGB", (8, 8), (0, 0, 0)))
+
+    assert small.data == again.data
+    assert small.data.startswith(b"\xff\xd8")
+    assert large.data != small.data
+
+
+def test_encode_for_vlm_steps_down_quality_for_large_uploads():
+    from PIL import Image
+
+    image = Image.effect_noise((256, 256), 64).convert("RGB")
+
+    full = encode_for_vlm(image)
+    capped = encode_for_vlm(image, max_bytes=len(full.data) // 2)
+
+    assert len(capped.data) < len(full.data)
+
+
+def test_screenshot_grabber_shares_recent_capture():
+    from PIL import Image
+
+    grabs = []
+
+    def grab():
+        grabs.append(1)
+        return Image.new("RGB", (8, 8))
+
+    grabber = ScreenshotGrabber(grab_func=grab, min_interval=0.5)
+    first = grabber.get()
+    second = grabber.get()
+
+    assert first is second
+    assert len(grabs) == 1
+    assert first.data.startswith(b"\x89PNG")
+
+
+def test_screenshot_grabber_propagates_errors():
+    def grab():
+        raise OSError("no display")
+
+    grabber = ScreenshotGrabber(grab_func=grab, min_interval=0.0)
+    with pytest.raises(OSError):
+        grabber.get(timeout=2)
+
+
+def test_dhash_numpy_matches_pure_python(monkeypatch):
+    from PIL import Image
+    import utils
+
+    gradient = Image.linear_gradient("L").resize((64, 48)).rotate(90)
+    flat = Image.new("RGB", (64, 48), (0, 0, 0))
+
+    hashed = dhash(gradient)
+    monkeypatch.setattr(utils, "NUMPY_AVAILABLE", False)
+
+    assert dhash(gradient) == hashed
+    assert hamming_distance(dhash(flat), hashed) > 3
+
+
+def test_check_internet_connectivity_reuses_recent_success(monkeypatch):
+    calls = []
+
+    class FakeConnection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    def fake_connect(address, timeout=None):
+        calls.append(address)
+        return FakeConnection()
+
+    monkeypatch.setattr(socket, "create_connection", fake_connect)
+    assert check_internet_connectivity("192.0.2.1", 53, max_age=60)
+    assert check_internet_connectivity("192.0.2.1", 53, max_age=60)
+    assert calls == [("192.0.2.1", 53)]
+
+    # Without max_age every call probes
+    assert check_internet_connectivity("192.0.2.1", 53)
+    assert len(calls) == 2
+
+
+def test_encoded_image_ensure_decoded_fills_both_forms():
+    image = EncodedImage(b64="aGVsbG8=")
+    assert image.ensure_decoded() is image
+    assert image._data == b"hello"
+
+    image = EncodedImage(data=b"hello")
+    assert image.ensure_decoded()._b64 == "aGVsbG8="
@@ -0,0 +1,120 @@
+# ruff: noqa: E402
+import sys
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+import logging
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+
+from utils import encode_screenshot
+from vision_analyzer import InferenceServer, VisionAnalyzer, image_data_url
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def analyze_screenshots_batch(self, requests):
+        self.batch_sizes.append(len(requests))
+        return [{"prompt": prompt} for _, prompt in requests]
+
+
+def test_inference_server_coalesces_requests():
+    analyzer = FakeAnalyzer()
+    server = InferenceServer(max_batch_size=8, batch_timeout=0.2)
+
+    futures = [server.submit("b64", f"prompt {i}", analyzer) for i in range(3)]
+    results = [future.result(timeout=2) for future in futures]
+
+    assert results == [{"prompt": f"prompt {i}"} for i in range(3)]
+    assert analyzer.batch_sizes == [3]
+
+
+def test_inference_server_respects_max_batch_size():
+    analyzer = FakeAnalyzer()
+    server = InferenceServer(max_batch_size=2, batch_timeout=0.2)
+
+    futures = [server.submit("b64", str(i), analyzer) for i in range(5)]
+    for future in futures:
+        future.result(timeout=2)
+
+    assert max(analyzer.batch_sizes) <= 2
+    assert sum(analyzer.batch_sizes) == 5
+
+
+def test_inference_server_uses_each_requests_analyzer():
+    old, replacement = FakeAnalyzer(), FakeAnalyzer()
+    server = InferenceServer(max_batch_size=8, batch_timeout=0.2)
+
+    futures = [server.submit("b64", "old", old), server.submit("b64", "new", replacement)]
+    for future in futures:
+        future.result(timeout=2)
+
+    assert old.batch_sizes == [1]
+    assert replacement.batch_sizes == [1]
+
+
+class SlowAnalyzer(FakeAnalyzer):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def analyze_screenshots_batch(self, requests):
+        time.sleep(self.delay)
+        return super().analyze_screenshots_batch(requests)
+
+
+def test_inference_server_runs_batches_concurrently():
+    server = InferenceServer(max_batch_size=1, batch_timeout=0, max_concurrent_batches=4)
+    analyzer = SlowAnalyzer(0.3)
+
+    started = time.monotonic()
+    futures = [server.submit("b64", str(i), analyzer) for i in range(4)]
+    for future in futures:
+        future.result(timeout=2)
+
+    # Run one after another, the four round-trips would take 1.2 s
+    assert time.monotonic() - started < 0.9
+
+
+def test_image_data_url_detects_jpeg_and_png():
+    assert image_data_url("/9j/4AAQ").startswith("data:image/jpeg;base64,")
+    assert image_data_url("iVBORw0KGgo").startswith("data:image/png;base64,")
+
+
+class TimeoutOnceCompletions:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if len(self.calls) == 1:
+            raise TimeoutError("request timed out")
+        message = SimpleNamespace(content='{"found": true, "x": 1, "y": 2}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_timeout_is_retried_once_with_smaller_image_and_longer_timeout():
+    completions = TimeoutOnceCompletions()
+    analyzer = VisionAnalyzer.__new__(VisionAnalyzer)
+    analyzer.logger = logging.getLogger("test")
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    analyzer.model = "test-model"
+    analyzer.timeout = 5.0
+
+    image = Image.linear_gradient("L").convert("RGB")
+    screenshot_b64 = encode_screenshot(image, image_format="JPEG", quality=95).b64
+
+    result = analyzer.analyze_screenshot_for_coordinates(screenshot_b64, "find it")
+
+    assert result["found"] is True
+    first, retry = completions.calls
+    assert retry["timeout"] == 10.0
+    sent = [part["image_url"]["url"] for call in (first, retry)
+            for part in call["messages"][0]["content"] if part["type"] == "image_url"]
+    assert len(sent[1]) < len(sent[0])
@@ -0,0 +1,37 @@
+# ruff: noqa: E402
+import sys
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "AutomationToolkit"
+sys.path.insert(0, str(MODULE_PATH))
+
+import pytest
+
+from web_interface import WebInterface
+
+
+class FakeChallengeSystem:
+    def __init__(self, status):
+        self.status = status
+
+    def add_event_listener(self, callback, safe=False):
+        pass
+
+    def get_system_status(self):
+        return self.status
+
+
+@pytest.fixture
+def make_client():
+    def make(status):
+        return WebInterface(FakeChallengeSystem(status)).app.test_client()
+    return make
+
+
+def test_events_endpoint_returns_newest_events(make_client):
+    # get_system_status lists recent events newest first
+    events = [{"event_type": "tick", "data": {"i": i}} for i in range(9, -1, -1)]
+    client = make_client({"recent_events": events})
+
+    body = client.get("/api/events?count=3").get_json()
+    assert [event["data"]["i"] for event in body["events"]] == [9, 8, 7]